@@ -1,5 +1,5 @@
 from anno.interact import select_class_by_keyboard, init_frame_counters
-from anno.frames import init_frame, show_frame
+from anno.frames import init_frame, show_frame, FrameCompositor
 from anno.boxes import BBox, init_boxes, modify_active_box, activate_box, get_cursor_to_abox_status
 from anno.utils import to_ordered_xyxy, xyxy_to_yolo
 from anno.tracker import setup_tracker
@@ -2,6 +2,10 @@ import cv2
 import cfg
 
 import anno
+from asone.utils.frame_copy import copy_frame
+
+# area covered by the "Annotation Mode" banner of `show_frame`, x1, y1, x2, y2
+ANNOTATE_BANNER_RECT = (0, 0, 160, 30)
 
 
 def init_frame(frame, boxes):
@@ -37,6 +41,88 @@ def init_frame(frame, boxes):
                 cv2.LINE_4)
 
 
+class FrameCompositor:
+    """Draws the annotation window from a cached static layer.
+
+    The static layer is the clean frame with every box drawn by `init_frame`,
+    it is only redrawn when the frame or the box set changes (coordinates,
+    class or state of any box). Every `render` starts from a reused canvas
+    where only the rectangles drawn over since the last call (the dragged box
+    and the banner of `show_frame`) are restored from the static layer, so a
+    mouse move costs one rectangle instead of a full frame copy and a redraw
+    of all boxes.
+
+    Args:
+        frame (numpy.ndarray, optional): The clean video frame.
+    """
+
+    def __init__(self, frame=None):
+        self._frame = None
+        self._static = None
+        self._canvas = None
+        self._signature = None
+        # rectangles of the canvas that differ from the static layer
+        self._dirty = []
+        if frame is not None:
+            self.set_frame(frame)
+
+    def set_frame(self, frame):
+        """Use a new clean frame, the static layer is redrawn on the next render.
+
+        Args:
+            frame (numpy.ndarray): The clean video frame, read but never drawn on.
+        """
+        self._frame = frame
+        self.invalidate()
+
+    def invalidate(self):
+        """Redraw the static layer on the next render."""
+        self._signature = None
+
+    @staticmethod
+    def _box_signature(boxes):
+        return tuple((tuple(box.coords), box.class_id, box.state) for box in boxes)
+
+    def _dirty_rect(self, x1, y1, x2, y2, margin):
+        h, w = self._canvas.shape[:2]
+        x1, x2 = sorted((x1, x2))
+        y1, y2 = sorted((y1, y2))
+        return (max(x1 - margin, 0), max(y1 - margin, 0),
+                min(x2 + margin + 1, w), min(y2 + margin + 1, h))
+
+    def render(self, boxes, overlay=None, color=None, thickness=2):
+        """Frame with the boxes and an optional rectangle drawn on top.
+
+        Args:
+            boxes (list[BBox]): Boxes of the static layer.
+            overlay (tuple, optional): x1, y1, x2, y2 of a rectangle drawn over
+                the boxes, e.g. the box being dragged.
+            color (tuple, optional): BGR color of the overlay, red if None.
+            thickness (int, optional): Line thickness of the overlay.
+
+        Returns:
+            numpy.ndarray: The canvas, reused by the next render. `show_frame`
+            may draw its annotate mode banner on it.
+        """
+        signature = self._box_signature(boxes)
+        if signature != self._signature:
+            self._static = copy_frame(self._frame, out=self._static, stage='annotation')
+            init_frame(self._static, boxes)
+            # init_frame rescales boxes drawn for another frame size
+            self._signature = self._box_signature(boxes)
+            self._canvas = copy_frame(self._static, out=self._canvas, stage='annotation')
+        else:
+            for x1, y1, x2, y2 in self._dirty:
+                self._canvas[y1:y2, x1:x2] = self._static[y1:y2, x1:x2]
+
+        self._dirty = [self._dirty_rect(*ANNOTATE_BANNER_RECT, margin=0)]
+        if overlay is not None:
+            x1, y1, x2, y2 = overlay
+            cv2.rectangle(self._canvas, (x1, y1), (x2, y2), color or anno.RED_RGB, thickness)
+            self._dirty.append(self._dirty_rect(x1, y1, x2, y2, margin=thickness + 1))
+        return self._canvas
+
+
 def show_frame(
         frame, window, fps=None,
         current_frame_id=None, total_frames=None,
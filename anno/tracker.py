@@ -11,21 +11,36 @@ def setup_tracker(real_time, video_path):
         track_fn = dt_obj.track_webcam(
             0, output_dir="./temp", save_result=cfg.config["SAVE_ORIGINAL"],
             display=cfg.config["DISPLAY_ORIGINAL"],
-            filter_classes=cfg.config["FILTERED_CLASSES"])
+            filter_classes=cfg.config["FILTERED_CLASSES"],
+            detect_every=cfg.config["DETECT_EVERY"],
+            motion_thres=cfg.config["MOTION_THRES"],
+            rect=cfg.config["RECT_INFERENCE"],
+            debug_copies=cfg.config["DEBUG_COPIES"])
         logger.info("Real time operating mode...")
     else:
         track_fn = dt_obj.track_video(
             video_path, output_dir="./temp", save_result=cfg.config["SAVE_ORIGINAL"],
             display=cfg.config["DISPLAY_ORIGINAL"],
-            filter_classes=cfg.config["FILTERED_CLASSES"])
+            filter_classes=cfg.config["FILTERED_CLASSES"],
+            detect_every=cfg.config["DETECT_EVERY"],
+            motion_thres=cfg.config["MOTION_THRES"],
+            rect=cfg.config["RECT_INFERENCE"],
+            cache_dir=cfg.config["TRACK_CACHE_DIR"],
+            debug_copies=cfg.config["DEBUG_COPIES"])
         logger.info("Video operating mode...")
     return track_fn
 
 
 def setup_detector():
     """return deepsort+yolov7 detector"""
+    int8 = cfg.config["INT8_DETECTOR"]
     detector = ASOne(
         tracker=asone.DEEPSORT,
-        detector=asone.YOLOV7_PYTORCH,
-        use_cuda=True)
+        detector=asone.YOLOV7_INT8 if int8 else asone.YOLOV7_PYTORCH,
+        use_cuda=not int8,
+        tracker_cfg={'ASSIGNMENT': cfg.config["ASSIGNMENT_SOLVER"],
+                     'LAZY_REID': cfg.config["LAZY_REID"],
+                     'REID_BACKEND': cfg.config["REID_BACKEND"]},
+        detector_cfg={'CHANNELS_LAST': cfg.config["CHANNELS_LAST"],
+                      'SCRIPT': cfg.config["TORCHSCRIPT"]})
     return detector
@@ -1,4 +1,3 @@
-import copy
 import os
 import cv2
 import numpy as np
@@ -7,11 +6,12 @@ from datetime import datetime
 
 import cfg
 import asone
+from asone.utils.frame_copy import copy_frame
 
 import anno
 from anno import (select_class_by_keyboard, init_boxes, init_frame, show_frame,
-                  BBox, to_ordered_xyxy, activate_box, modify_active_box,
-                  setup_tracker, get_cursor_to_abox_status)
+                  FrameCompositor, BBox, to_ordered_xyxy, activate_box,
+                  modify_active_box, setup_tracker, get_cursor_to_abox_status)
 
 from network.client import TCPClient
 
@@ -23,8 +23,9 @@ boxes = []  # store all box object belonging to current frame
 pressed = False  # if left mouse clicked
 # flag to raise when the program waits for a keyboard event
 waiting_key = False
-frame_cache = None  # used to store a frame array
 empty_frame = np.array([])  # frame without any boxes drawn
+# draws the boxes over empty_frame in annotation mode
+compositor = FrameCompositor()
 
 # to keep where the cursor lies wrt to active box
 cursor_to_a_box_pos = None
@@ -44,12 +45,11 @@ def mouse_click(event, x, y, flags, param):
     """what to do on mouse click event"""
 
     global boxes, display_frame, ix, iy, \
-        pressed, frame_cache, empty_frame, \
+        pressed, empty_frame, \
         waiting_key, cursor_to_a_box_pos, a_box
 
     if event == cv2.EVENT_LBUTTONDOWN:
         pressed = True
-        boxed_frame = copy.deepcopy(empty_frame)
         a_box, cursor_to_a_box_pos = get_cursor_to_abox_status(x, y, boxes)
         # if cursor_to_a_box_pos is None,
         # there is not any active box yet
@@ -65,27 +65,24 @@ def mouse_click(event, x, y, flags, param):
         # scale active box in one of 8 directions
         else:
             boxes.remove(a_box)
-        # copy frame
-        init_frame(boxed_frame, boxes)
-        frame_cache = copy.deepcopy(boxed_frame)
+        # the box set changed, draw the static layer before the first move
+        compositor.render(boxes)
 
     elif pressed and event == cv2.EVENT_MOUSEMOVE:
+        # only the dragged box is redrawn over the cached boxes
         # draw new bbox
         if not cursor_to_a_box_pos:
-            cv2.rectangle(frame_cache, (ix, iy), (x, y), (0, 0, 255), 1)
+            frame = compositor.render(boxes, (ix, iy, x, y), thickness=1)
         # move bbox
         elif cursor_to_a_box_pos == "mid":
-            x1, y1, x2, y2 = a_box.get_scaled_coords(cursor_to_a_box_pos, x, y, ix, iy)
-            cv2.rectangle(frame_cache, (x1, y1), (x2, y2), (0, 0, 255), 2)
+            frame = compositor.render(
+                boxes, a_box.get_scaled_coords(cursor_to_a_box_pos, x, y, ix, iy))
         # scale in one of 8 directions
         else:
-            x1, y1, x2, y2 = a_box.get_scaled_coords(cursor_to_a_box_pos, x, y)
-            cv2.rectangle(frame_cache, (x1, y1), (x2, y2), (0, 0, 255), 2)
+            frame = compositor.render(
+                boxes, a_box.get_scaled_coords(cursor_to_a_box_pos, x, y))
 
-        show_frame(frame_cache, "window", mode="annotate")
-        boxed_frame = copy.deepcopy(empty_frame)
-        init_frame(boxed_frame, boxes)
-        frame_cache = copy.deepcopy(boxed_frame)
+        show_frame(frame, "window", mode="annotate")
 
     elif event == cv2.EVENT_LBUTTONUP:
         pressed = False
@@ -114,16 +111,14 @@ def mouse_click(event, x, y, flags, param):
             a_box.coords = list(new_coords)
             boxes.append(a_box)
 
-        display_frame = copy.deepcopy(empty_frame)
-        init_frame(display_frame, boxes)
+        display_frame = compositor.render(boxes)
         show_frame(display_frame, "window", mode="annotate")
 
     elif event == cv2.EVENT_RBUTTONDOWN:
         # modifies boxes' states as well
         action = activate_box(boxes, x, y, cfg.config["X_SIZE"], cfg.config["Y_SIZE"])
 
-        display_frame = copy.deepcopy(empty_frame)
-        init_frame(display_frame, boxes)
+        display_frame = compositor.render(boxes)
         show_frame(display_frame, "window", mode="annotate")
         # delete active box if clicked on it twice
         if action == "delete":
@@ -143,8 +138,7 @@ def mouse_click(event, x, y, flags, param):
                         boxes, task="update_label",
                         new_class_id=selected_class_id)
 
-        display_frame = copy.deepcopy(empty_frame)
-        init_frame(display_frame, boxes)
+        display_frame = compositor.render(boxes)
         show_frame(display_frame, "window", mode="annotate")
 
 
@@ -174,8 +168,8 @@ def annotate(video_path=None):
     for bbox_details, frame_details, action in track_fn:
 
         if action == "stream":  # keep reading next frame
-            bboxes, track_ids, _, class_ids = bbox_details
-            display_frame, frame_id, frame_count, fps = frame_details
+            bboxes, track_ids, _, class_ids, _ = bbox_details
+            display_frame, frame_id, frame_count, fps, _ = frame_details
 
         elif action == "annotation":  # stop reading frames and annotate
             cv2.setMouseCallback('window', mouse_click)
@@ -233,7 +227,9 @@ def annotate(video_path=None):
             bboxes, class_ids, track_ids,
             original_width, original_height)
         display_frame = cv2.resize(display_frame, (x_size_window, y_size_window))
-        empty_frame = copy.deepcopy(display_frame)
+        # clean frame, boxes are drawn on display_frame only
+        empty_frame = copy_frame(display_frame, out=empty_frame, stage='annotation')
+        compositor.set_frame(empty_frame)
         init_frame(display_frame, boxes)
         show_frame(
             display_frame, "window", fps, frame_id,
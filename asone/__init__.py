@@ -112,5 +112,14 @@ YOLOV8L_ONNX = 79
 YOLOV8X_PYTORCH = 80
 YOLOV8X_ONNX = 81
 
+# YOLOv7 int8 (statically quantized ONNX, CPU only)
+YOLOV7_TINY_INT8 = 82
+YOLOV7_INT8 = 83
+YOLOV7_X_INT8 = 84
+YOLOV7_W6_INT8 = 85
+YOLOV7_E6_INT8 = 86
+YOLOV7_D6_INT8 = 87
+YOLOV7_E6E_INT8 = 88
+
 
 __all__ = ['ASOne', 'detectors', 'trackers'] 
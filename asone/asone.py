@@ -1,4 +1,3 @@
-import copy
 import cv2
 from loguru import logger
 import numpy as np
@@ -6,10 +5,16 @@ import os
 import time
 
 import asone
-import asone.utils as utils
 from asone.trackers import Tracker
 from asone.detectors import Detector
 from asone.utils.default_cfg import config
+from asone.utils.video_reader import VideoReader
+from asone.utils.video_writer import VideoWriter, draw_tracks
+from asone.utils.motion_gate import MotionGate
+from asone.utils.track_cache import TrackCache
+from asone.utils.frame_copy import copy_counter, copy_frame, readonly
+from asone.detectors.utils.weights_path import get_weight_path
+from asone.trackers.deep_sort import REID_WEIGHTS
 
 
 class ASOne:
@@ -17,38 +22,71 @@ class ASOne:
                  detector: int = 0,
                  tracker: int = -1,
                  weights: str = None,
-                 use_cuda: bool = True) -> None:
+                 use_cuda: bool = True,
+                 tracker_cfg: dict = None,
+                 detector_cfg: dict = None) -> None:
 
         self.use_cuda = use_cuda
+        self.detector_flag = detector
+        self.tracker_flag = tracker
+        self.weights = weights
+        # tracker specific overrides, e.g. {'ASSIGNMENT': 'greedy'}
+        self.tracker_cfg = tracker_cfg
+        # detector runtime options, e.g. {'CHANNELS_LAST': True, 'SCRIPT': True}
+        # for PyTorch weights or {'ONNX_THREADS': 4} for ONNX models
+        self.detector_cfg = detector_cfg or {}
 
-        # get detector object
-        self.detector = self.get_detector(detector, weights)
+        # models are loaded on first use, videos replayed from the track
+        # cache never load them
+        self._detector = None
+        self._tracker = None
 
-        if tracker == -1:
-            self.tracker = None
-            return
-         
-        self.tracker = self.get_tracker(tracker)
+    @property
+    def detector(self):
+        if self._detector is None:
+            self._detector = self.get_detector(self.detector_flag, self.weights)
+        return self._detector
+
+    @property
+    def tracker(self):
+        if self._tracker is None and self.tracker_flag != -1:
+            self._tracker = self.get_tracker(self.tracker_flag)
+        return self._tracker
 
     def get_detector(self, detector: int, weights: str):
+        # keep the Detector wrapper, it adds tiled inference on top of the model
         detector = Detector(detector, weights=weights,
-                            use_cuda=self.use_cuda).get_detector()
+                            use_cuda=self.use_cuda,
+                            channels_last=self.detector_cfg.get('CHANNELS_LAST', False),
+                            script=self.detector_cfg.get('SCRIPT', False),
+                            engine_cfg=self._engine_cfg())
         return detector
 
+    def _engine_cfg(self):
+        cfg = self.detector_cfg
+        return {
+            'intra_op_threads': cfg.get('ONNX_THREADS'),
+            'inter_op_threads': cfg.get('ONNX_INTER_THREADS'),
+            'optimization_level': cfg.get('ONNX_OPT_LEVEL', 'all'),
+            'cache_optimized': cfg.get('ONNX_CACHE_OPTIMIZED', True),
+        }
+
     def get_tracker(self, tracker: int):
 
         tracker = Tracker(tracker, self.detector,
-                          use_cuda=self.use_cuda)
+                          use_cuda=self.use_cuda, cfg=self.tracker_cfg)
         return tracker
 
     def _update_args(self, kwargs):
+        # the tracking loop pops its options, every call gets its own copy
+        args = dict(config)
         for key, value in kwargs.items():
             if key in config.keys():
-                config[key] = value
+                args[key] = value
             else:
                 print(f'"{key}" argument not found! valid args: {list(config.keys())}')
                 exit()
-        return config
+        return args
 
     def track_stream(
             self, stream_url, **kwargs
@@ -65,7 +103,17 @@ class ASOne:
     def track_video(self,
                     video_path,
                     **kwargs
-                    ):            
+                    ):
+        """ Function to track the objects of a video frame by frame
+
+        Args:
+            video_path (str): video to track, the other options override default_cfg
+
+        Returns:
+            generator: `(bbox_details, frame_details, action)` per frame. The frame
+            of frame_details may be read-only and is only valid until the next
+            iteration (its buffer is reused), copy it to keep or draw on it
+        """
         output_filename = os.path.basename(video_path)
         kwargs['filename'] = output_filename
         config = self._update_args(kwargs)
@@ -81,6 +129,9 @@ class ASOne:
 
         kwargs['filename'] = output_filename
         kwargs['fps'] = 29
+        # keep the live feed fresh, frames the tracker is too slow for are dropped
+        kwargs.setdefault('prefetch_size', 1)
+        kwargs.setdefault('drop_stale', True)
         config = self._update_args(kwargs)
 
         for (bbox_details, frame_details, action) in self._start_tracking(cam_id, config):
@@ -100,10 +151,44 @@ class ASOne:
             source = cv2.imread(source)
         return self.detector.detect(source, **kwargs)
 
+    def detect_batch(self, sources: list, **kwargs) -> list:
+        """ Function to perform detection on a batch of imgs in one forward pass
+
+        Args:
+            sources (list): image paths or nd.arrays, paths are read first
+
+        Returns:
+            list: (detections, image_info) for every source
+        """
+        images = [cv2.imread(source) if isinstance(source, str) else source
+                  for source in sources]
+        return self.detector.detect_batch(images, **kwargs)
+
+    def _weights_path(self) -> str:
+        if self.weights:
+            return self.weights
+        return get_weight_path(self.detector_flag)[1]
+
+    def _track_cache(self, cache_dir, stream_path, config, detect_every,
+                     motion_thres) -> TrackCache:
+        """Track cache entry of a video, keyed by everything that changes
+        the tracks: weights, detection config and tracker/detector options."""
+        weights = [self._weights_path()]
+        if self.tracker_flag == asone.DEEPSORT:
+            weights.append(REID_WEIGHTS)
+        return TrackCache(cache_dir, stream_path, weights,
+                          dict(config,
+                               detector=self.detector_flag,
+                               tracker=self.tracker_flag,
+                               detect_every=detect_every,
+                               motion_thres=motion_thres,
+                               tracker_cfg=self.tracker_cfg or {},
+                               detector_cfg=self.detector_cfg))
+
     def _start_tracking(
             self, stream_path: str, config: dict
     ) -> tuple:
-        if not self.tracker:
+        if self.tracker_flag == -1:
             raise RuntimeError('No tracker is selected. use detect()' +
                                ' function perform detection or pass a tracker.')
 
@@ -114,68 +199,142 @@ class ASOne:
         display = config.pop('display')
         draw_trails = config.pop('draw_trails')
         class_names = config.pop('class_names')
+        prefetch_size = config.pop('prefetch_size')
+        drop_stale = config.pop('drop_stale')
+        detect_every = config.pop('detect_every')
+        motion_thres = config.pop('motion_thres')
+        cache_dir = config.pop('cache_dir')
+        if config.pop('debug_copies'):
+            copy_counter.enabled = True
+        copy_counter.reset()
+
+        # replay the outputs of a previous run over the same video, weights
+        # and config instead of running the models
+        cache = None
+        cached = []
+        if cache_dir is not None and isinstance(stream_path, str) \
+                and os.path.isfile(stream_path):
+            cache = self._track_cache(cache_dir, stream_path, config,
+                                      detect_every, motion_thres)
+            if cache.exists():
+                cached = cache.load()
+                if cache.complete:
+                    logger.info(f"replaying tracks from {cache.path}")
+                else:
+                    # a previous run stopped early, the models run from its last frame on
+                    logger.info(f"replaying {len(cached)} frames from {cache.path}")
+                    for outputs in cached:
+                        cache.append(*outputs)
+        replay_only = cache is not None and cache.complete
+        # tracks started after a replayed prefix get ids above the ones it used
+        id_offset = max((int(ids.max()) for _, ids, _, _, _ in cached if len(ids)),
+                        default=0)
 
-        cap = cv2.VideoCapture(stream_path)
-        width = cap.get(cv2.CAP_PROP_FRAME_WIDTH)
-        height = cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
-        frame_count = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+        # scene change test runs on the decoder thread, off the main loop
+        motion_gate = None
+        if motion_thres is not None and not replay_only:
+            motion_gate = MotionGate(motion_thres)
+        cap = VideoReader(stream_path, queue_size=prefetch_size,
+                          motion_gate=motion_gate, drop_stale=drop_stale)
+        width = cap.width
+        height = cap.height
+        frame_count = cap.frame_count
 
         if fps is None:
-            fps = cap.get(cv2.CAP_PROP_FPS)
+            fps = cap.fps
 
         if save_result:
             os.makedirs(output_dir, exist_ok=True)
             save_path = os.path.join(output_dir, filename)
             logger.info(f"video save path is {save_path}")
-            video_writer = cv2.VideoWriter(
-                save_path,
-                cv2.VideoWriter_fourcc(*"mp4v"),
-                fps,
-                (int(width), int(height)),
-            )
+            # drawing and encoding run on the writer thread
+            video_writer = VideoWriter(save_path, fps, (int(width), int(height)),
+                                       draw_trails=draw_trails,
+                                       class_names=class_names)
 
         frame_id = 1
+        ended = False
+        # outputs of the previous frame, reused on static frames
+        last_outputs = None
         tic = time.time()
-        while True:
-            key = cv2.waitKey(1) & 0xFF
-            if key == asone.ESC_KEY:
-                break
-            elif key == asone.SPACE_KEY:
-                yield "", "", "annotation"
-            elif key == asone.ENTER_KEY:
-                yield "", "", "send"
-            elif key == asone.BACKSPACE_KEY:
-                yield "", "", "receive"
-
-            start_time = time.time()
-            ret, frame = cap.read()
-            if not ret:
-                raise RuntimeError("Failed to read video. It either ended or corrupted")
-            bboxes_xyxy, ids, scores, class_ids = self.tracker.detect_and_track(
-                frame, config)
-            elapsed_time = time.time() - start_time
-            fps = 1 / elapsed_time
-            # logger.info(
-            #     f"fps: {fps:.2f} frame: {frame_id}/{int(frame_count)}" +
-            #     f"({elapsed_time * 1000:.2f} ms)"
-            # )
-            if display or save_result:
-                im0 = copy.deepcopy(frame)
-                cv2.line(im0, (20, 25), (127, 25), [85, 45, 255], 30)
-                cv2.putText(im0, f'FPS: {int(fps)}', (11, 35), 0, 1, [
-                    225, 255, 255], thickness=2, lineType=cv2.LINE_AA)
-                im0 = utils.draw_boxes(im0,
-                                       bboxes_xyxy,
-                                       class_ids,
-                                       identities=ids,
-                                       draw_trails=draw_trails,
-                                       class_names=class_names)
-            if display:
-                cv2.imshow('Sample', im0)
+        try:
+            while True:
+                key = cv2.waitKey(1) & 0xFF
+                if key == asone.ESC_KEY:
+                    break
+                elif key == asone.SPACE_KEY:
+                    yield "", "", "annotation"
+                elif key == asone.ENTER_KEY:
+                    yield "", "", "send"
+                elif key == asone.BACKSPACE_KEY:
+                    yield "", "", "receive"
+
+                start_time = time.time()
+                ret, frame = cap.read()
+                if not ret:
+                    ended = True
+                    raise RuntimeError("Failed to read video. It either ended or corrupted")
+                motion = cap.motion
+                if frame_id <= len(cached):
+                    bboxes_xyxy, ids, scores, class_ids, predicted = cached[frame_id - 1]
+                else:
+                    if motion is not None and not motion['moving'] and last_outputs:
+                        # static scene, the last detections are reused as they
+                        # are, the tracker is not stepped so its tracks do not
+                        # drift with their last velocity
+                        bboxes_xyxy, ids, scores, class_ids = last_outputs
+                        predicted = True
+                    else:
+                        # run the detector on every detect_every'th frame only,
+                        # the tracker predicts boxes on the frames in between
+                        predicted = (frame_id - 1 - len(cached)) % detect_every != 0
+                        # the frame is owned by the reader, the detector and the
+                        # tracker get a read-only view of it
+                        if predicted:
+                            bboxes_xyxy, ids, scores, class_ids = self.tracker.predict(
+                                readonly(frame))
+                        else:
+                            bboxes_xyxy, ids, scores, class_ids = self.tracker.detect_and_track(
+                                readonly(frame), config)
+                        if id_offset:
+                            ids = np.asarray(ids) + id_offset
+                    if cache is not None:
+                        cache.append(bboxes_xyxy, ids, scores, class_ids, predicted)
+                last_outputs = bboxes_xyxy, ids, scores, class_ids
+                elapsed_time = time.time() - start_time
+                fps = 1 / elapsed_time
+                # logger.info(
+                #     f"fps: {fps:.2f} frame: {frame_id}/{int(frame_count)}" +
+                #     f"({elapsed_time * 1000:.2f} ms)"
+                # )
+                if display:
+                    # the one copy of the frame, drawn on, shown and handed
+                    # over to the writer
+                    im0 = copy_frame(frame, stage='display')
+                    im0 = draw_tracks(im0, fps, bboxes_xyxy, class_ids,
+                                      identities=ids,
+                                      draw_trails=draw_trails,
+                                      class_names=class_names)
+                    cv2.imshow('Sample', im0)
+                    if save_result:
+                        video_writer.write(im0, copy=False)
+                        # shared with the writer thread from now on
+                        im0 = readonly(im0)
+                elif save_result:
+                    # nothing is displayed, let the writer thread draw
+                    video_writer.write(frame, (fps, bboxes_xyxy, class_ids, ids))
+                copy_counter.next_frame()
+                frame_id += 1
+                # yeild required values in form of (bbox_details, frames_details)
+                yield (bboxes_xyxy, ids, scores, class_ids, predicted), (im0 if display else readonly(frame), frame_id-1, frame_count, fps, motion), "stream"
+        finally:
+            # keep the outputs also when stopped early (ESC, generator closed),
+            # the next run over the video resumes after the last frame
+            if cache is not None and not replay_only and (len(cache) > len(cached) or ended):
+                cache.save(complete=ended)
+            cap.release()
             if save_result:
-                video_writer.write(im0)
-            frame_id += 1
-            # yeild required values in form of (bbox_details, frames_details)
-            yield (bboxes_xyxy, ids, scores, class_ids), (im0 if display else frame, frame_id-1, frame_count, fps), "stream"
+                video_writer.close()
+            copy_counter.log()
         tac = time.time()
         logger.info(f'Total Time Taken: {tac - tic:.2f}')
@@ -1,10 +1,17 @@
-from asone.detectors.yolov5 import YOLOv5Detector
-from asone.detectors.yolov6 import YOLOv6Detector
-from asone.detectors.yolov7 import YOLOv7Detector
-from asone.detectors.yolor import YOLOrDetector
-from asone.detectors.yolox import YOLOxDetector
+import importlib
 
-from .detector import Detector
+from .detector import Detector, DETECTOR_REGISTRY
+
+
+# the families are imported on first access, see DETECTOR_REGISTRY
+_LAZY_DETECTORS = dict(reversed(path.rsplit('.', 1))
+                       for _, path in DETECTOR_REGISTRY)
+
+
+def __getattr__(name):
+    if name in _LAZY_DETECTORS:
+        return getattr(importlib.import_module(_LAZY_DETECTORS[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 __all__ = ['Detector',
@@ -12,4 +19,5 @@ __all__ = ['Detector',
            'YOLOv6Detector',
            'YOLOv7Detector',
            'YOLOrDetector',
-           'YOLOxDetector']
+           'YOLOxDetector',
+           'YOLOv8Detector']
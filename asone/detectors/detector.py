@@ -1,26 +1,52 @@
-import cv2
+import importlib
 
-from asone.detectors.yolov5 import YOLOv5Detector
-from asone.detectors.yolov6 import YOLOv6Detector
-from asone.detectors.yolov7 import YOLOv7Detector
-from asone.detectors.yolor import YOLOrDetector
-from asone.detectors.yolox import YOLOxDetector
+import cv2
 
 from asone.detectors.utils.weights_path import get_weight_path
 from asone.detectors.utils.cfg_path import get_cfg_path
 from asone.detectors.utils.exp_name import get_exp__name
-#from .yolov8 import YOLOv8Detector
+from asone.detectors.utils.tiling import tile_windows, merge_tiles
+
+
+# model flags -> import path of the family, a family (and its dependencies)
+# is only imported once a model flag selects it
+DETECTOR_REGISTRY = [
+    (range(0, 20), 'asone.detectors.yolov5.YOLOv5Detector'),
+    (range(20, 34), 'asone.detectors.yolov6.YOLOv6Detector'),
+    (range(34, 48), 'asone.detectors.yolov7.YOLOv7Detector'),
+    (range(48, 58), 'asone.detectors.yolor.YOLOrDetector'),
+    (range(58, 72), 'asone.detectors.yolox.YOLOxDetector'),
+    (range(72, 82), 'asone.detectors.yolov8.YOLOv8Detector'),
+    (range(82, 89), 'asone.detectors.yolov7.YOLOv7Detector'),
+]
+
+
+def import_detector(model_flag: int):
+    """Import and return the detector class of a model flag."""
+    for flags, path in DETECTOR_REGISTRY:
+        if model_flag in flags:
+            module, name = path.rsplit('.', 1)
+            return getattr(importlib.import_module(module), name)
+    raise ValueError(f'Invalid model_flag: {model_flag}')
 
 
 class Detector:
     def __init__(self,
                  model_flag: int,
                  weights: str = None,
-                 use_cuda: bool = True):
-
-        self.model = self._select_detector(model_flag, weights, use_cuda)
+                 use_cuda: bool = True,
+                 channels_last: bool = False,
+                 script: bool = False,
+                 engine_cfg: dict = None):
+        # PyTorch models are prepared for inference once and cached next to
+        # their weights, optionally in NHWC layout and traced with TorchScript.
+        # ONNX models run on an OnnxEngine configured by engine_cfg
+        self.model = self._select_detector(model_flag, weights, use_cuda,
+                                           channels_last=channels_last,
+                                           script=script,
+                                           engine_cfg=engine_cfg)
 
-    def _select_detector(self, model_flag, weights, cuda):
+    def _select_detector(self, model_flag, weights, cuda, **prepare):
         # Get required weight using model_flag
         if weights and weights.split('.')[-1] == 'onnx':
             onnx = True
@@ -31,28 +57,19 @@ class Detector:
         else:
             onnx, weight = get_weight_path(model_flag)
 
-        if model_flag in range(0, 20):
-            _detector = YOLOv5Detector(weights=weight,
-                                       use_onnx=onnx,
-                                       use_cuda=cuda)
-        elif model_flag in range(20, 34):
-            _detector = YOLOv6Detector(weights=weight,
-                                       use_onnx=onnx,
-                                       use_cuda=cuda)
-        elif model_flag in range(34, 48):
-            _detector = YOLOv7Detector(weights=weight,
-                                       use_onnx=onnx,
-                                       use_cuda=cuda)
-        elif model_flag in range(48, 58):
+        detector_class = import_detector(model_flag)
+
+        if model_flag in range(48, 58):
             # Get Configuration file for Yolor
             if model_flag in range(48, 57, 2):
                 cfg = get_cfg_path(model_flag)
             else:
                 cfg = None
-            _detector = YOLOrDetector(weights=weight,
-                                      cfg=cfg,
-                                      use_onnx=onnx,
-                                      use_cuda=cuda)
+            _detector = detector_class(weights=weight,
+                                       cfg=cfg,
+                                       use_onnx=onnx,
+                                       use_cuda=cuda,
+                                       **prepare)
 
         elif model_flag in range(58, 72):
             # Get exp file and corresponding model for pytorch only
@@ -60,16 +77,24 @@ class Detector:
                 exp, model_name = get_exp__name(model_flag)
             else:
                 exp = model_name = None
-            _detector = YOLOxDetector(model_name=model_name,
-                                      exp_file=exp,
-                                      weights=weight,
-                                      use_onnx=onnx,
-                                      use_cuda=cuda)
-        elif model_flag in range(72, 82):
-            # Get exp file and corresponding model for pytorch only
-            _detector = YOLOv8Detector(weights=weight,
+            _detector = detector_class(model_name=model_name,
+                                       exp_file=exp,
+                                       weights=weight,
+                                       use_onnx=onnx,
+                                       use_cuda=cuda,
+                                       **prepare)
+        elif model_flag in range(82, 89):
+            # int8 quantized ONNX models, quantized from the float weights
+            _detector = detector_class(weights=weight,
+                                       use_onnx=True,
+                                       use_cuda=False,
+                                       int8=True,
+                                       engine_cfg=prepare['engine_cfg'])
+        else:
+            _detector = detector_class(weights=weight,
                                        use_onnx=onnx,
-                                       use_cuda=cuda)
+                                       use_cuda=cuda,
+                                       **prepare)
 
         return _detector
 
@@ -78,8 +103,58 @@ class Detector:
 
     def detect(self,
                image: list,
+               tile_size=None,
+               tile_overlap: float = 0.2,
+               tile_full_frame: bool = True,
                **kwargs: dict):
-        return self.model.detect(image, **kwargs)
+        if tile_size is None:
+            return self.model.detect(image, **kwargs)
+        return self.detect_tiled(image, tile_size, tile_overlap,
+                                 tile_full_frame, **kwargs)
+
+    def detect_tiled(self,
+                     image: list,
+                     tile_size,
+                     tile_overlap: float = 0.2,
+                     tile_full_frame: bool = True,
+                     **kwargs: dict):
+        """Sliced inference for small objects in large frames.
+
+        The frame is split into overlapping tiles that run through the model
+        as one batch together with the optional full frame, then the boxes are
+        shifted back to frame coordinates and merged with a cross tile NMS.
+
+        Args:
+            image (np.ndarray): frame
+            tile_size (int or tuple): tile side or (height, width) in pixels
+            tile_overlap (float): fraction of a tile shared with its neighbour
+            tile_full_frame (bool): also run the whole frame to keep the large
+                objects no single tile contains
+        """
+        height, width = image.shape[:2]
+        windows = tile_windows(height, width, tile_size, tile_overlap)
+        # tiles are views into the frame, the detectors do not modify them
+        images = [image[y1:y2, x1:x2] for x1, y1, x2, y2 in windows]
+        if tile_full_frame and len(windows) > 1:
+            windows.append((0, 0, width, height))
+            images.append(image)
+
+        results = self.model.detect_batch(images, **kwargs)
+        detection = merge_tiles([detection for detection, _ in results],
+                                windows,
+                                kwargs.get('iou_thres', 0.45),
+                                kwargs.get('agnostic_nms', True),
+                                kwargs.get('max_det', 1000))
+        image_info = {
+            'width': width,
+            'height': height,
+        }
+        return detection, image_info
+
+    def detect_batch(self,
+                     images: list,
+                     **kwargs: dict):
+        return self.model.detect_batch(images, **kwargs)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,63 @@
+import warnings
+from functools import lru_cache
+
+import numpy as np
+
+from asone.utils import get_names
+
+
+def as_detections(detections) -> np.ndarray:
+    """Detections of an image in the format every detector returns.
+
+    Args:
+        detections (np.ndarray or None): `[x1, y1, x2, y2, score, class_id]`
+            rows, None or empty when nothing is kept
+
+    Returns:
+        np.ndarray: (N, 6) C contiguous float32
+    """
+    if detections is None:
+        return np.zeros((0, 6), dtype=np.float32)
+    return np.ascontiguousarray(detections, dtype=np.float32).reshape(-1, 6)
+
+
+@lru_cache(maxsize=32)
+def _class_ids(filter_classes: tuple) -> tuple:
+    class_names = get_names()
+    ids = []
+    for _class in filter_classes:
+        if _class.lower() in class_names:
+            ids.append(class_names.index(_class.lower()))
+        else:
+            warnings.warn(f"class {_class} not found in model classes list.")
+    return tuple(ids)
+
+
+def filter_class_ids(filter_classes) -> list:
+    """Class ids of the `filter_classes` names, looked up once per set of
+    names, in the form the `classes` argument of the NMS functions takes.
+
+    Args:
+        filter_classes (list): class names, None or empty keeps every class
+
+    Returns:
+        list or None: class ids, None if every class is kept
+    """
+    if not filter_classes:
+        return None
+    return list(_class_ids(tuple(filter_classes)))
+
+
+def class_mask(class_id: np.ndarray, classes: list) -> np.ndarray:
+    """Boolean mask of the detections whose class is in `classes`.
+
+    Args:
+        class_id (np.ndarray): (N,) class id of every detection
+        classes (list): ids from `filter_class_ids`, None keeps every class
+
+    Returns:
+        np.ndarray: (N,) bool
+    """
+    if classes is None:
+        return np.ones(len(class_id), dtype=bool)
+    return np.isin(class_id.astype(np.int64), classes)
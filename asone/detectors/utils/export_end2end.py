@@ -0,0 +1,200 @@
+"""Export a PyTorch detector to ONNX with the box decoding and NMS in the graph.
+
+The exported model takes the letterboxed NCHW batch the detector already
+feeds and returns the kept boxes of the whole batch as rows of
+`[batch_id, x1, y1, x2, y2, class, score]`, the format of the YOLOv7 and
+YOLOv6 end-to-end models, so the detectors skip their Python NMS. Batch,
+height and width are dynamic unless `--static`.
+
+Usage:
+    python -m asone.detectors.utils.export_end2end --model YOLOV5S_PYTORCH
+    python -m asone.detectors.utils.export_end2end --model YOLOX_S_PYTORCH \
+        --weights yolox_s.pth --conf-thres 0.1
+"""
+import argparse
+import os
+
+import torch
+import torch.nn as nn
+import torchvision
+
+import asone
+from asone.detectors.detector import Detector
+from asone.detectors.utils.weights_path import get_weight_path
+
+# flags of the families whose raw output is (B, N, 4 + 1 + classes)
+# xywh boxes, objectness and class scores
+END2END_FAMILIES = {
+    'yolov5': range(0, 20),
+    'yolov7': range(34, 48),
+    'yolor': range(48, 58),
+    'yolox': range(58, 72),
+}
+
+
+class ORT_NMS(torch.autograd.Function):
+    """ONNX `NonMaxSuppression`, torchvision's NMS when run eagerly (the
+    export traces the eager forward)."""
+
+    @staticmethod
+    def forward(ctx, boxes, scores, max_output_boxes_per_class,
+                iou_threshold, score_threshold):
+        # (num_selected, 3) rows of batch, class, box index, like the onnx op
+        selected = []
+        for i, (image_boxes, image_scores) in enumerate(zip(boxes, scores[:, 0])):
+            idx = torch.nonzero(image_scores > score_threshold).flatten()
+            keep = torchvision.ops.nms(image_boxes[idx], image_scores[idx],
+                                       float(iou_threshold))
+            keep = idx[keep[:int(max_output_boxes_per_class)]]
+            selected.append(torch.stack([torch.full_like(keep, i),
+                                         torch.zeros_like(keep), keep], 1))
+        return torch.cat(selected).to(torch.int64)
+
+    @staticmethod
+    def symbolic(g, boxes, scores, max_output_boxes_per_class,
+                 iou_threshold, score_threshold):
+        return g.op('NonMaxSuppression', boxes, scores,
+                    max_output_boxes_per_class, iou_threshold, score_threshold)
+
+
+class End2End(nn.Module):
+    """Wraps a model returning (B, N, 4 + 1 + classes) with xyxy conversion,
+    class score selection and NMS.
+
+    Class aware NMS offsets the boxes of each class by `max_wh`, so boxes of
+    different classes never overlap.
+    """
+
+    def __init__(self, model, conf_thres=0.25, iou_thres=0.45, max_det=1000,
+                 agnostic=True, max_wh=7680):
+        super().__init__()
+        self.model = model
+        self.max_wh = 0 if agnostic else max_wh
+        self.register_buffer('max_det', torch.tensor([max_det]))
+        self.register_buffer('iou_thres', torch.tensor([iou_thres]))
+        self.register_buffer('conf_thres', torch.tensor([conf_thres]))
+
+    def forward(self, x):
+        x = self.model(x)
+        if isinstance(x, (tuple, list)):
+            x = x[0]
+        xy, half_wh = x[..., :2], x[..., 2:4] / 2
+        boxes = torch.cat([xy - half_wh, xy + half_wh], 2)
+        # objectness is positive, max(cls * obj) == max(cls) * obj
+        score, cls = x[..., 5:].max(2, keepdim=True)
+        score = score * x[..., 4:5]
+        nms_boxes = boxes + cls.float() * self.max_wh
+        selected = ORT_NMS.apply(nms_boxes, score.transpose(1, 2).contiguous(),
+                                 self.max_det, self.iou_thres, self.conf_thres)
+        image_idx, box_idx = selected[:, 0], selected[:, 2]
+        # the reshape keeps the 7 columns in the exported output shape
+        return torch.cat([image_idx.unsqueeze(1).float(),
+                          boxes[image_idx, box_idx],
+                          cls[image_idx, box_idx].float(),
+                          score[image_idx, box_idx]], 1).reshape(-1, 7)
+
+
+def prepare_for_export(model):
+    """Make the detection heads decode with grids built from the traced input
+    shape, so that the graph accepts any height and width."""
+    for m in model.modules():
+        # YOLOv5 Detect
+        if hasattr(m, 'onnx_dynamic'):
+            m.onnx_dynamic = True
+        if hasattr(m, 'inplace'):
+            m.inplace = False
+        # YOLOv5 Detect, YOLOv7 IDetect rebuild an empty grid
+        if isinstance(getattr(m, 'grid', None), list):
+            m.grid = [torch.zeros(1)] * len(m.grid)
+        # YOLOR YOLOLayer rebuilds it when the grid size changes
+        if hasattr(m, 'anchor_wh') and hasattr(m, 'nx'):
+            m.nx = m.ny = 0
+        # YOLOX head returns raw outputs when exported by its own tool
+        if hasattr(m, 'decode_in_inference'):
+            m.decode_in_inference = True
+    return model
+
+
+def end2end_path(weights: str) -> str:
+    root, _ = os.path.splitext(weights)
+    return f'{root}.end2end.onnx'
+
+
+def export_end2end(model_flag: int, weights: str = None, output: str = None,
+                   input_shape: tuple = (640, 640), conf_thres: float = 0.25,
+                   iou_thres: float = 0.45, max_det: int = 1000,
+                   agnostic: bool = True, dynamic: bool = True,
+                   opset: int = 12) -> str:
+    """Export a PyTorch detector with in-graph decoding and NMS.
+
+    The thresholds are part of the graph, the detector's `conf_thres` can
+    only raise the exported one and its `iou_thres` and `agnostic_nms` are
+    not used.
+
+    Args:
+        model_flag (int): PyTorch flag of a YOLOv5, YOLOv7, YOLOR or YOLOX model
+        weights (str): PyTorch weights, the flag's default weights if None
+        output (str): ONNX path, `<weights>.end2end.onnx` if None
+        input_shape (tuple): (height, width) of the traced input, the
+            exported one if not `dynamic`
+        conf_thres (float): minimum score of the kept boxes
+        iou_thres (float): NMS IoU threshold
+        max_det (int): boxes kept per image
+        agnostic (bool): NMS across classes
+        dynamic (bool): dynamic batch, height and width
+        opset (int): ONNX opset, NonMaxSuppression needs 10 or later
+
+    Returns:
+        str: path of the exported model
+    """
+    if not any(model_flag in flags for flags in END2END_FAMILIES.values()):
+        raise ValueError(f'model_flag {model_flag} has no end-to-end export, '
+                         f'supported families: {list(END2END_FAMILIES)}')
+    if model_flag % 2:
+        raise ValueError(f'model_flag {model_flag} is an ONNX model, '
+                         f'use the PyTorch flag of the same model')
+    if weights is None:
+        _, weights = get_weight_path(model_flag)
+    output = output or end2end_path(weights)
+
+    detector = Detector(model_flag, weights, use_cuda=False).get_detector()
+    model = prepare_for_export(detector.model.float().eval())
+    end2end = End2End(model, conf_thres, iou_thres, max_det, agnostic).eval()
+
+    dynamic_axes = {'images': {0: 'batch', 2: 'height', 3: 'width'},
+                    'output': {0: 'detections'}} if dynamic else \
+        {'output': {0: 'detections'}}
+    example = torch.zeros((1, 3) + tuple(input_shape))
+    with torch.no_grad():
+        torch.onnx.export(end2end, example, output,
+                          opset_version=opset,
+                          input_names=['images'],
+                          output_names=['output'],
+                          dynamic_axes=dynamic_axes)
+    return output
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', required=True,
+                        help='PyTorch model flag, e.g. YOLOV5S_PYTORCH')
+    parser.add_argument('--weights', default=None,
+                        help='PyTorch weights, the default weights of the flag if not set')
+    parser.add_argument('--output', default=None, help='<weights>.end2end.onnx if not set')
+    parser.add_argument('--img-size', type=int, nargs=2, default=[640, 640],
+                        help='traced input height and width')
+    parser.add_argument('--conf-thres', type=float, default=0.25)
+    parser.add_argument('--iou-thres', type=float, default=0.45)
+    parser.add_argument('--max-det', type=int, default=1000)
+    parser.add_argument('--class-nms', action='store_true',
+                        help='per class NMS instead of class agnostic')
+    parser.add_argument('--static', action='store_true',
+                        help='fixed batch size 1 and --img-size input')
+    parser.add_argument('--opset', type=int, default=12)
+    args = parser.parse_args()
+
+    path = export_end2end(getattr(asone, args.model.upper()), args.weights,
+                          args.output, tuple(args.img_size), args.conf_thres,
+                          args.iou_thres, args.max_det, not args.class_nms,
+                          not args.static, args.opset)
+    print(f'saved {path}')
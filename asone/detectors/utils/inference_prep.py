@@ -0,0 +1,90 @@
+import os
+import warnings
+
+import torch
+
+from asone.utils.track_cache import file_hash
+
+
+def reparameterize(model):
+    """Collapse the multi-branch Rep blocks (RepVGG style, YOLOv6
+    `RepVGGBlock`, YOLOv7 `RepConv`) into a single 3x3 conv. Blocks that were
+    already collapsed are left alone."""
+    for m in model.modules():
+        if getattr(m, 'rbr_dense', None) is None:
+            continue
+        if hasattr(m, 'fuse_repvgg_block'):
+            m.fuse_repvgg_block()
+        elif hasattr(m, 'switch_to_deploy'):
+            m.switch_to_deploy()
+    return model
+
+
+def prepared_path(weights: str, device: str = 'cpu', channels_last: bool = False,
+                  script: bool = False) -> str:
+    """Where the inference ready version of `weights` is cached, next to them
+    and keyed by their content. TorchScript traces are device specific."""
+    root, _ = os.path.splitext(weights)
+    if not script:
+        return f'{root}.prepared.{file_hash(weights)[:16]}.pt'
+    memory_format = '.cl' if channels_last else ''
+    return f'{root}.prepared.{file_hash(weights)[:16]}.{device}{memory_format}.ts'
+
+
+def load_prepared(weights: str, build, device: str = 'cpu',
+                  channels_last: bool = False, script: bool = False,
+                  example_shape: tuple = (1, 3, 640, 640)):
+    """Load the inference ready model of a PyTorch checkpoint, preparing it
+    the first time.
+
+    Preparing builds the float32 eval model with `build`, which fuses conv +
+    BatchNorm the way its family does, collapses the Rep blocks and saves the
+    result next to the weights. Later calls unpickle the prepared model
+    directly instead of the checkpoint, so nothing is fused again.
+
+    Args:
+        weights (str): checkpoint, its content keys the cache
+        build (callable): returns the fused float32 eval model on `device`
+        device (str): 'cpu' or 'cuda'
+        channels_last (bool): NHWC weights, faster convs on recent CPUs and
+            tensor core GPUs
+        script (bool): trace the model with TorchScript, the trace is only
+            valid for `example_shape` inputs (any batch size)
+        example_shape (tuple): NCHW input the model is traced with
+
+    Returns:
+        torch.nn.Module: eval model, or the `torch.jit.ScriptModule` trace
+    """
+    path = prepared_path(weights, device, channels_last, script)
+    if os.path.isfile(path):
+        if script:
+            return torch.jit.load(path, map_location=device)
+        model = torch.load(path, map_location=device)
+    else:
+        model = reparameterize(build()).float().eval()
+        if script:
+            if channels_last:
+                model = model.to(memory_format=torch.channels_last)
+            with torch.no_grad():
+                model = torch.jit.trace(
+                    model, torch.zeros(example_shape, device=device), strict=False)
+            model = torch.jit.freeze(model)
+        _save(model, path, script)
+        if script:
+            return model
+    if channels_last:
+        model = model.to(memory_format=torch.channels_last)
+    return model
+
+
+def _save(model, path, script):
+    tmp_path = path + '.tmp'
+    try:
+        if script:
+            torch.jit.save(model, tmp_path)
+        else:
+            torch.save(model, tmp_path)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        # e.g. read-only weights dir, the model is prepared again next start
+        warnings.warn(f'could not cache the prepared model at {path}: {e}')
@@ -0,0 +1,64 @@
+import cv2
+
+
+def rect_shape(image_shapes, input_shape, stride=32):
+    """Smallest stride aligned shape every image fits in after letterboxing.
+
+    Each image is scaled to fit `input_shape` keeping its aspect ratio and
+    the scaled size is rounded up to a multiple of `stride`, e.g. a 1920x1080
+    frame with `input_shape` (640, 640) runs at (384, 640) instead of
+    (640, 640).
+
+    Args:
+        image_shapes (list): (height, width) of every image of the batch
+        input_shape (tuple): (height, width) the images are fitted into
+        stride (int): largest stride of the model
+
+    Returns:
+        tuple: (height, width)
+    """
+    height, width = 0, 0
+    for img_height, img_width in image_shapes:
+        r = min(input_shape[0] / img_height, input_shape[1] / img_width)
+        height = max(height, -(-round(img_height * r) // stride) * stride)
+        width = max(width, -(-round(img_width * r) // stride) * stride)
+    return height, width
+
+
+def letterbox(image, new_shape, color=(114, 114, 114)):
+    """Resize keeping aspect ratio and pad both sides evenly to `new_shape`."""
+    shape = image.shape[:2]
+    r = min(new_shape[0] / shape[0], new_shape[1] / shape[1])
+    new_unpad = int(round(shape[1] * r)), int(round(shape[0] * r))
+    dw = (new_shape[1] - new_unpad[0]) / 2
+    dh = (new_shape[0] - new_unpad[1]) / 2
+
+    if shape[::-1] != new_unpad:
+        image = cv2.resize(image, new_unpad, interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+    left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+    return cv2.copyMakeBorder(image, top, bottom, left, right,
+                              cv2.BORDER_CONSTANT, value=color)
+
+
+def scale_boxes(boxes, input_shape, ori_shape):
+    """Map xyxy boxes from a `letterbox` image back to the original image.
+
+    Args:
+        boxes (np.ndarray): (N, 4+) boxes, the first 4 columns are rescaled in place
+        input_shape (tuple): (height, width) of the letterboxed image
+        ori_shape (tuple): (height, width) of the original image
+
+    Returns:
+        np.ndarray: boxes
+    """
+    gain = min(input_shape[0] / ori_shape[0], input_shape[1] / ori_shape[1])
+    pad_w = (input_shape[1] - round(ori_shape[1] * gain)) / 2
+    pad_h = (input_shape[0] - round(ori_shape[0] * gain)) / 2
+
+    boxes[:, [0, 2]] -= pad_w
+    boxes[:, [1, 3]] -= pad_h
+    boxes[:, :4] /= gain
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, ori_shape[1])
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, ori_shape[0])
+    return boxes
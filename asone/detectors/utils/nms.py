@@ -0,0 +1,131 @@
+import numpy as np
+
+
+def nms(boxes, scores, iou_thres):
+    """Single class NMS on numpy arrays.
+
+    Runs torchvision's compiled NMS kernel, the same one the PyTorch
+    postprocessing of every family uses.
+
+    Args:
+        boxes (np.ndarray): (N, 4) xyxy boxes
+        scores (np.ndarray): (N,) scores
+        iou_thres (float): boxes overlapping a kept box by more than this
+            are suppressed
+
+    Returns:
+        np.ndarray: indices of the kept boxes, sorted by decreasing score
+    """
+    # imported on first use, `import asone` does not load torch
+    import torch
+    import torchvision
+
+    keep = torchvision.ops.nms(
+        torch.from_numpy(np.ascontiguousarray(boxes, dtype=np.float32)),
+        torch.from_numpy(np.ascontiguousarray(scores, dtype=np.float32)),
+        iou_thres)
+    return keep.numpy()
+
+
+def batched_nms(boxes, scores, idxs, iou_thres):
+    """NMS applied independently per group, e.g. per class or per image.
+
+    Args:
+        boxes (np.ndarray): (N, 4) xyxy boxes
+        scores (np.ndarray): (N,) scores
+        idxs (np.ndarray): (N,) group of every box, boxes of different
+            groups never suppress each other
+        iou_thres (float): IoU threshold within a group
+
+    Returns:
+        np.ndarray: indices of the kept boxes, sorted by decreasing score
+    """
+    import torch
+    import torchvision
+
+    keep = torchvision.ops.batched_nms(
+        torch.from_numpy(np.ascontiguousarray(boxes, dtype=np.float32)),
+        torch.from_numpy(np.ascontiguousarray(scores, dtype=np.float32)),
+        torch.from_numpy(np.asarray(idxs, dtype=np.int64)),
+        iou_thres)
+    return keep.numpy()
+
+
+def multiclass_nms(boxes, scores, iou_thres, score_thres, class_agnostic=True,
+                   classes=None, multi_label=True):
+    """Multiclass NMS on numpy arrays.
+
+    Args:
+        boxes (np.ndarray): (N, 4) xyxy boxes
+        scores (np.ndarray): (N, C) per class scores
+        iou_thres (float): IoU threshold
+        score_thres (float): minimum score of a candidate
+        class_agnostic (bool): if True every box keeps its best class and
+            boxes of all classes suppress each other, otherwise every class
+            above `score_thres` is a candidate suppressed within its class
+        classes (list): class ids to keep, the others are dropped before
+            the NMS so they suppress nothing. None keeps every class
+        multi_label (bool): with `class_agnostic=False`, False makes every
+            box keep only its best class, still suppressed within its class
+
+    Returns:
+        np.ndarray: (K, 6) float32 [x1, y1, x2, y2, score, class_id]
+    """
+    if class_agnostic or not multi_label:
+        box_inds = np.arange(len(scores))
+        cls_inds = scores.argmax(1)
+        valid = scores[box_inds, cls_inds] > score_thres
+    else:
+        box_inds, cls_inds = np.nonzero(scores > score_thres)
+        valid = np.ones(len(box_inds), dtype=bool)
+    if classes is not None:
+        valid &= np.isin(cls_inds, classes)
+    box_inds, cls_inds = box_inds[valid], cls_inds[valid]
+
+    if class_agnostic:
+        keep = nms(boxes[box_inds], scores[box_inds, cls_inds], iou_thres)
+    else:
+        keep = batched_nms(boxes[box_inds], scores[box_inds, cls_inds],
+                           cls_inds, iou_thres)
+
+    box_inds, cls_inds = box_inds[keep], cls_inds[keep]
+    return np.concatenate(
+        [boxes[box_inds], scores[box_inds, cls_inds, None],
+         cls_inds[:, None]], 1).astype(np.float32)
+
+
+def yolo_nms(prediction, conf_thres, iou_thres, classes=None, agnostic=False,
+             max_det=300, objectness=True):
+    """NMS of the raw output of a YOLO model exported without NMS.
+
+    Same candidates as the `non_max_suppression` of the YOLOv5/v6/v7/R/v8
+    PyTorch postprocessing: objectness above `conf_thres`, score is
+    objectness times class score, and every box keeps its best class.
+
+    Args:
+        prediction (np.ndarray): (B, N, 5 + C) rows of
+            [cx, cy, w, h, objectness, class scores], (B, N, 4 + C) without
+            the objectness for anchor free heads (YOLOv8)
+        conf_thres (float): minimum objectness and score
+        iou_thres (float): IoU threshold
+        classes (list): class ids to keep, None keeps every class
+        agnostic (bool): boxes of all classes suppress each other
+        max_det (int): boxes kept per image
+        objectness (bool): the rows have an objectness column
+
+    Returns:
+        list: (K, 6) float32 [x1, y1, x2, y2, score, class_id] per image
+    """
+    detections = []
+    for x in prediction:
+        if objectness:
+            x = x[x[:, 4] > conf_thres]
+            # single class models only have the objectness
+            scores = x[:, 5:] * x[:, 4:5] if x.shape[1] > 6 else x[:, 4:5]
+        else:
+            scores = x[:, 4:]
+        boxes = np.concatenate([x[:, :2] - x[:, 2:4] / 2, x[:, :2] + x[:, 2:4] / 2], 1)
+        detections.append(multiclass_nms(
+            boxes, scores, iou_thres, conf_thres, class_agnostic=agnostic,
+            classes=classes, multi_label=False)[:max_det])
+    return detections
@@ -0,0 +1,268 @@
+import hashlib
+import os
+import platform
+import time
+import warnings
+
+import numpy as np
+import onnxruntime
+
+from asone.utils.track_cache import file_hash
+
+OPTIMIZATION_LEVELS = {
+    'disable': onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    'basic': onnxruntime.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    'extended': onnxruntime.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    'all': onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+# onnx element types the output buffers can be preallocated for
+ELEMENT_TYPES = {
+    'tensor(float)': np.float32,
+    'tensor(float16)': np.float16,
+    'tensor(double)': np.float64,
+    'tensor(int64)': np.int64,
+    'tensor(int32)': np.int32,
+    'tensor(uint8)': np.uint8,
+    'tensor(bool)': np.bool_,
+}
+
+
+# highest level whose optimized graph is saved, the layout changes of 'all'
+# depend on the CPU and are applied in memory on every start
+CACHED_LEVEL = 'extended'
+
+
+def host_id() -> str:
+    """Short id of the machine an optimized graph is valid on: the CPU model
+    and architecture, and the onnxruntime version that optimized it."""
+    cpu = platform.processor()
+    if os.path.isfile('/proc/cpuinfo'):
+        with open('/proc/cpuinfo') as f:
+            cpu = next((line.split(':', 1)[1].strip() for line in f
+                        if line.startswith('model name')), cpu)
+    key = f'{platform.machine()}|{cpu}|{onnxruntime.__version__}'
+    return hashlib.sha1(key.encode()).hexdigest()[:8]
+
+
+def cached_level(optimization_level: str) -> str:
+    levels = list(OPTIMIZATION_LEVELS)
+    return levels[min(levels.index(optimization_level), levels.index(CACHED_LEVEL))]
+
+
+def optimized_path(model_path: str, provider: str, optimization_level: str) -> str:
+    """Where the graph optimized by onnxruntime is cached, next to the model
+    and keyed by its content, the execution provider the session runs on,
+    the host and the level, capped to `CACHED_LEVEL`."""
+    root, _ = os.path.splitext(model_path)
+    provider = provider.replace('ExecutionProvider', '').lower()
+    level = cached_level(optimization_level)
+    return f'{root}.{file_hash(model_path)[:16]}.{provider}-{host_id()}-{level}.ort.onnx'
+
+
+class OnnxEngine:
+    """onnxruntime session shared by the detectors and the ReID network.
+
+    The input and output metadata is read once at load, the graph optimized
+    up to the 'extended' level is saved next to the model so later starts
+    skip those optimizations (the hardware specific ones of 'all' run again),
+    and `run` binds the inputs without a copy and the outputs to buffers
+    that are reused between calls and only grow with the batch.
+
+    It can be used in place of an `onnxruntime.InferenceSession` by the code
+    that only calls `get_inputs`, `get_outputs` and `run`. Arrays returned by
+    `run` are reused, they are only valid until the next call.
+
+    Args:
+        model_path (str): ONNX model
+        use_cuda (bool): CUDA execution provider, falls back to the CPU
+        intra_op_threads (int): threads of a single operator, None lets
+            onnxruntime pick one per physical core
+        inter_op_threads (int): operators run in parallel, None runs them
+            sequentially
+        optimization_level (str): 'disable', 'basic', 'extended' or 'all'
+        cache_optimized (bool): save the optimized graph and load it on later
+            starts
+        io_binding (bool): bind IO to reused buffers, False uses plain
+            `InferenceSession.run`
+    """
+
+    def __init__(self, model_path: str, use_cuda: bool = False,
+                 intra_op_threads: int = None, inter_op_threads: int = None,
+                 optimization_level: str = 'all', cache_optimized: bool = True,
+                 io_binding: bool = True):
+        if optimization_level not in OPTIMIZATION_LEVELS:
+            raise ValueError(f'Invalid optimization level: {optimization_level}, '
+                             f'valid levels: {list(OPTIMIZATION_LEVELS)}')
+        self.model_path = model_path
+        if use_cuda:
+            providers = ['CUDAExecutionProvider', 'CPUExecutionProvider']
+        else:
+            providers = ['CPUExecutionProvider']
+
+        options = onnxruntime.SessionOptions()
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        if inter_op_threads:
+            options.inter_op_num_threads = inter_op_threads
+            options.execution_mode = onnxruntime.ExecutionMode.ORT_PARALLEL
+        options.graph_optimization_level = OPTIMIZATION_LEVELS[optimization_level]
+
+        # requested providers that are not installed are skipped by the session
+        available = onnxruntime.get_available_providers()
+        providers = [p for p in providers if p in available] or ['CPUExecutionProvider']
+
+        cache_optimized = cache_optimized and optimization_level != 'disable'
+        path = optimized_path(model_path, providers[0], optimization_level) \
+            if cache_optimized else None
+        if path and not os.path.isfile(path):
+            self._save_optimized(model_path, optimization_level, providers, path)
+        self.session = None
+        if path and os.path.isfile(path):
+            # the cached passes only run again if the level is above them
+            if cached_level(optimization_level) == optimization_level:
+                options.graph_optimization_level = OPTIMIZATION_LEVELS['basic']
+            self.session = onnxruntime.InferenceSession(path, options, providers=providers)
+            if self.session.get_providers()[0] != providers[0]:
+                # e.g. CUDA failed to initialize, the graph is not for this provider
+                self.session = None
+                options.graph_optimization_level = OPTIMIZATION_LEVELS[optimization_level]
+        if self.session is None:
+            self.session = onnxruntime.InferenceSession(model_path, options, providers=providers)
+
+        self.inputs = self.session.get_inputs()
+        self.outputs = self.session.get_outputs()
+        self.input_names = [node.name for node in self.inputs]
+        self.output_names = [node.name for node in self.outputs]
+        self._output_index = {name: i for i, name in enumerate(self.output_names)}
+
+        self.io_binding = io_binding
+        self._binding = self.session.io_binding() if io_binding else None
+        # (input shapes, output names) the outputs are currently bound for
+        self._bound_key = None
+        # output name -> buffer, and the views bound for the current key
+        self._buffers = {}
+        self._outputs = []
+
+        self.calls = 0
+        self.last_ms = 0.
+        self.total_ms = 0.
+
+    @staticmethod
+    def _save_optimized(model_path, optimization_level, providers, path):
+        """Optimize the model up to the cached level and save it at `path`,
+        kept only if the session ran on the provider the path is keyed by."""
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = OPTIMIZATION_LEVELS[cached_level(optimization_level)]
+        tmp_path = path + '.tmp'
+        options.optimized_model_filepath = tmp_path
+        try:
+            session = onnxruntime.InferenceSession(model_path, options, providers=providers)
+            if session.get_providers()[0] == providers[0]:
+                os.replace(tmp_path, path)
+        except Exception as e:
+            # e.g. read-only model dir, optimize again on the next start
+            warnings.warn(f'could not cache the optimized model at {path}: {e}')
+        finally:
+            if os.path.isfile(tmp_path):
+                os.remove(tmp_path)
+
+    def get_inputs(self):
+        return self.inputs
+
+    def get_outputs(self):
+        return self.outputs
+
+    def get_providers(self):
+        return self.session.get_providers()
+
+    @property
+    def mean_ms(self) -> float:
+        return self.total_ms / self.calls if self.calls else 0.
+
+    def reset_timing(self):
+        self.calls = 0
+        self.last_ms = self.total_ms = 0.
+
+    def _output_shape(self, node, input_shapes):
+        """Shape of an output for the given inputs, None if the model does
+        not tell (e.g. the number of boxes kept by an in-graph NMS)."""
+        # symbolic dims shared with an input, typically the batch axis
+        symbols = {}
+        for input_node, shape in zip(self.inputs, input_shapes):
+            for dim, size in zip(input_node.shape, shape):
+                if isinstance(dim, str):
+                    symbols[dim] = size
+        shape = []
+        for dim in node.shape:
+            if isinstance(dim, int) and dim >= 0:
+                shape.append(dim)
+            elif isinstance(dim, str) and dim in symbols:
+                shape.append(symbols[dim])
+            else:
+                return None
+        return tuple(shape)
+
+    def _bind_outputs(self, output_names, input_shapes):
+        self._binding.clear_binding_outputs()
+        outputs = []
+        for name in output_names:
+            node = self.outputs[self._output_index[name]]
+            shape = self._output_shape(node, input_shapes)
+            dtype = ELEMENT_TYPES.get(node.type)
+            if not shape or dtype is None:
+                # allocated by onnxruntime on every call
+                self._binding.bind_output(name, 'cpu')
+                outputs.append(None)
+                continue
+            output = self._reserve(name, shape, dtype)
+            self._binding.bind_output(name, 'cpu', 0, dtype, shape, output.ctypes.data)
+            outputs.append(output)
+        self._outputs = outputs
+
+    def _reserve(self, name, shape, dtype):
+        """(shape) view of the reused buffer of an output, the buffer grows
+        along the first axis (the batch) so varying batches share it."""
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.dtype != dtype or buffer.shape[1:] != shape[1:] \
+                or len(buffer) < shape[0]:
+            length = shape[0] if buffer is None or buffer.shape[1:] != shape[1:] \
+                else max(shape[0], 2 * len(buffer))
+            buffer = np.empty((length,) + shape[1:], dtype=dtype)
+            self._buffers[name] = buffer
+        return buffer[:shape[0]]
+
+    def _run_bound(self, output_names, feeds):
+        binding = self._binding
+        binding.clear_binding_inputs()
+        feeds = {name: np.ascontiguousarray(value) for name, value in feeds.items()}
+        for name, value in feeds.items():
+            binding.bind_cpu_input(name, value)
+        key = (tuple(value.shape for value in feeds.values()), tuple(output_names))
+        # outputs allocated by onnxruntime keep their first shape once bound,
+        # they are bound again on every call (e.g. the boxes kept by NMS)
+        if key != self._bound_key or any(output is None for output in self._outputs):
+            self._bind_outputs(output_names,
+                               [feeds[name].shape for name in self.input_names])
+            self._bound_key = key
+
+        self.session.run_with_iobinding(binding)
+        if all(output is not None for output in self._outputs):
+            return list(self._outputs)
+        values = binding.get_outputs()
+        return [value.numpy() if output is None else output
+                for value, output in zip(values, self._outputs)]
+
+    def run(self, output_names, feeds: dict) -> list:
+        """Same as `InferenceSession.run`, timed. The returned arrays are
+        reused buffers, valid until the next call."""
+        output_names = list(output_names or self.output_names)
+        tic = time.perf_counter()
+        if self.io_binding:
+            outputs = self._run_bound(output_names, feeds)
+        else:
+            outputs = self.session.run(output_names, feeds)
+        self.last_ms = (time.perf_counter() - tic) * 1000
+        self.total_ms += self.last_ms
+        self.calls += 1
+        return outputs
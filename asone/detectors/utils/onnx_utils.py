@@ -0,0 +1,72 @@
+import numpy as np
+
+from asone.detectors.utils.detections import class_mask
+
+
+def has_dynamic_batch(model) -> bool:
+    """Return True if the ONNX session accepts any batch size."""
+    batch_dim = model.get_inputs()[0].shape[0]
+    return not isinstance(batch_dim, int)
+
+
+def run_batch(model, output_names, input_name, batch: np.ndarray) -> list:
+    """Run an ONNX session on a batch of images.
+
+    Models exported with a fixed batch size are run once per image, in that
+    case the outputs are returned per image and the caller concatenates them.
+    An `OnnxEngine` reuses its output buffers, so the outputs of every pass
+    are copied then.
+
+    Returns:
+        list: one list of outputs per forward pass
+    """
+    if has_dynamic_batch(model) or len(batch) == 1:
+        return [model.run(output_names, {input_name: batch})]
+    return [[output.copy() for output in model.run(output_names, {input_name: image[None]})]
+            for image in batch]
+
+
+def has_dynamic_shape(model) -> bool:
+    """Return True if the ONNX session accepts any input height and width."""
+    height, width = model.get_inputs()[0].shape[2:4]
+    return not isinstance(height, int) and not isinstance(width, int)
+
+
+def is_end2end(model) -> bool:
+    """Return True if the ONNX model runs NMS in its graph, its output rows
+    are `[batch_id, x1, y1, x2, y2, class, score]`."""
+    shape = model.get_outputs()[0].shape
+    return len(shape) == 2 and shape[1] == 7
+
+
+def end2end_detections(outputs: list, batch_size: int, conf_thres: float = 0.,
+                       max_det: int = None, classes: list = None) -> list:
+    """Split the output rows of an end-to-end model per image.
+
+    Args:
+        outputs (list): outputs of `run_batch`
+        batch_size (int): images in the batch
+        conf_thres (float): minimum score, on top of the exported one
+        max_det (int): boxes kept per image
+        classes (list): class ids to keep, None keeps every class
+
+    Returns:
+        list: (N, 6) float32 `[x1, y1, x2, y2, score, class]` per image,
+            best first
+    """
+    rows = [output[0] for output in outputs]
+    if len(rows) > 1:
+        # one pass per image, every pass numbers its image 0
+        for i, image_rows in enumerate(rows):
+            image_rows[:, 0] = i
+    rows = np.concatenate(rows)
+    rows = rows[(rows[:, 6] > conf_thres) & class_mask(rows[:, 5], classes)]
+    image_ids = rows[:, 0].astype(np.int64)
+    # stable, boxes of an image keep their score order
+    order = np.argsort(image_ids, kind='stable')
+    rows = np.ascontiguousarray(rows[order][:, [1, 2, 3, 4, 6, 5]], dtype=np.float32)
+    counts = np.bincount(image_ids, minlength=batch_size)
+    detections = np.split(rows, np.cumsum(counts)[:-1])
+    if max_det is not None:
+        detections = [detection[:max_det] for detection in detections]
+    return detections
@@ -0,0 +1,61 @@
+import numpy as np
+
+from asone.detectors.utils.nms import batched_nms
+
+
+def tile_windows(height, width, tile_size, overlap=0.2):
+    """Overlapping windows covering a frame.
+
+    All windows have the same size so they letterbox identically, the last
+    row and column are shifted back to end on the frame border.
+
+    Args:
+        height (int): frame height
+        width (int): frame width
+        tile_size (int or tuple): tile side or (height, width)
+        overlap (float): fraction of the tile shared with its neighbour
+
+    Returns:
+        list: (x1, y1, x2, y2) of every window
+    """
+    if isinstance(tile_size, int):
+        tile_size = (tile_size, tile_size)
+    tile_h, tile_w = min(tile_size[0], height), min(tile_size[1], width)
+
+    def starts(size, tile):
+        step = max(int(tile * (1 - overlap)), 1)
+        positions = list(range(0, size - tile, step))
+        return positions + [size - tile]
+
+    return [(x, y, x + tile_w, y + tile_h)
+            for y in starts(height, tile_h)
+            for x in starts(width, tile_w)]
+
+
+def merge_tiles(detections, windows, iou_thres, agnostic_nms=True, max_det=1000):
+    """Shift per tile detections to frame coordinates and merge them.
+
+    Args:
+        detections (list): (N, 6) [x1, y1, x2, y2, score, class_id] per window
+        windows (list): (x1, y1, x2, y2) of every window, the detections of
+            the full frame pass use the window (0, 0, w, h)
+        iou_thres (float): IoU threshold of the cross tile NMS
+        agnostic_nms (bool): if False boxes only suppress their own class
+        max_det (int): maximum number of detections kept
+
+    Returns:
+        np.ndarray: (K, 6) detections in frame coordinates
+    """
+    shifted = []
+    for detection, (x1, y1, _, _) in zip(detections, windows):
+        detection = np.asarray(detection, dtype=np.float32).reshape(-1, 6).copy()
+        detection[:, [0, 2]] += x1
+        detection[:, [1, 3]] += y1
+        shifted.append(detection)
+    detection = np.concatenate(shifted)
+    if len(detection) == 0:
+        return detection
+
+    idxs = np.zeros(len(detection)) if agnostic_nms else detection[:, 5]
+    keep = batched_nms(detection[:, :4], detection[:, 4], idxs, iou_thres)
+    return detection[keep[:max_det]]
@@ -86,7 +86,15 @@ weights = { '0': os.path.join('yolov5','weights','yolov5x6.pt'),
             '78': os.path.join('yolov8','weights','yolov8l.pt'),
             '79': os.path.join('yolov8','weights','yolov8l.onnx'),
             '80': os.path.join('yolov8','weights','yolov8x.pt'),
-            '81': os.path.join('yolov8','weights','yolov8x.onnx')
+            '81': os.path.join('yolov8','weights','yolov8x.onnx'),
+            # int8, quantized from the ONNX weights on first use
+            '82': os.path.join('yolov7','weights','yolov7-tiny.onnx'),
+            '83': os.path.join('yolov7','weights','yolov7.onnx'),
+            '84': os.path.join('yolov7','weights','yolov7x.onnx'),
+            '85': os.path.join('yolov7','weights','yolov7-w6.onnx'),
+            '86': os.path.join('yolov7','weights','yolov7-e6.onnx'),
+            '87': os.path.join('yolov7','weights','yolov7-d6.onnx'),
+            '88': os.path.join('yolov7','weights','yolov7-e6e.onnx')
 }
 
 def get_weight_path(model_flag):
@@ -108,6 +116,9 @@ def get_weight_path(model_flag):
     elif model_flag in range(72, 82):
         onnx = False if (model_flag % 2 == 0) else True
         weight = weights[str(model_flag)]
+    elif model_flag in range(82, 89):
+        onnx = True
+        weight = weights[str(model_flag)]
 
         
     return onnx, weight
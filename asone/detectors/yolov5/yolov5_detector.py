@@ -1,14 +1,18 @@
 import os
 import numpy as np
-import warnings
 import torch
-import onnxruntime
 
-from asone.utils import get_names
 from asone.detectors.yolov5.yolov5.utils.yolov5_utils import (non_max_suppression,
                                                               scale_coords,
                                                               letterbox)
 from asone.detectors.yolov5.yolov5.models.experimental import attempt_load
+from asone.detectors.utils.onnx_engine import OnnxEngine
+from asone.detectors.utils.onnx_utils import (run_batch, has_dynamic_shape,
+                                              is_end2end, end2end_detections)
+from asone.detectors.utils.letterbox import rect_shape
+from asone.detectors.utils.nms import yolo_nms
+from asone.detectors.utils.detections import as_detections, filter_class_ids
+from asone.detectors.utils.inference_prep import load_prepared
 from asone import utils
 
 
@@ -16,30 +20,39 @@ class YOLOv5Detector:
     def __init__(self,
                  weights=None,
                  use_onnx=False,
-                 use_cuda=True):
+                 use_cuda=True,
+                 channels_last=False,
+                 script=False,
+                 engine_cfg=None):
 
         self.use_onnx = use_onnx
         self.device = 'cuda' if use_cuda else 'cpu'
+        # TorchScript traces are only valid for the input shape they were traced with
+        self.script = script and not use_onnx
+        self.channels_last = channels_last
+        # OnnxEngine options, e.g. {'intra_op_threads': 4}
+        self.engine_cfg = engine_cfg or {}
 
         if not os.path.exists(weights):
             utils.download_weights(weights)
         
         # Load Model
         self.model = self.load_model(use_cuda, weights)
+        # exported with NMS in the graph by export_end2end
+        self.end2end = self.use_onnx and is_end2end(self.model)
         
     def load_model(self, use_cuda, weights, fp16=False):
         # Device: CUDA and if fp16=True only then half precision floating point works  
         self.fp16 = fp16 & ((not self.use_onnx or self.use_onnx) and self.device != 'cpu')
         # Load onnx 
         if self.use_onnx:
-            if use_cuda:
-                providers = ['CUDAExecutionProvider','CPUExecutionProvider']
-            else:
-                providers = ['CPUExecutionProvider']
-            model = onnxruntime.InferenceSession(weights, providers=providers)
+            model = OnnxEngine(weights, use_cuda, **self.engine_cfg)
         #Load Pytorch
         else: 
-            model = attempt_load(weights, device=self.device, inplace=True, fuse=True)
+            model = load_prepared(
+                weights,
+                lambda: attempt_load(weights, device=self.device, inplace=True, fuse=True),
+                self.device, self.channels_last, self.script)
             model.half() if self.fp16 else model.float()
         return model
 
@@ -47,7 +60,8 @@ class YOLOv5Detector:
                             image: list,
                             input_shape=(640, 640))-> list:
 
-        original_image = image.copy()
+        # letterbox returns a new image, the caller's frame is only read
+        original_image = image
         image = letterbox(image, input_shape, stride=32, auto=False)[0]
         image = image.transpose((2, 0, 1))[::-1]
         image = np.ascontiguousarray(image, dtype=np.float32)
@@ -63,60 +77,81 @@ class YOLOv5Detector:
                max_det: int = 1000,
                filter_classes: bool = None,
                agnostic_nms: bool = True,
-               with_p6: bool = False) -> list:
-     
-        # Image Preprocessing
-        original_image, processed_image = self.image_preprocessing(image, input_shape)
-        
+               with_p6: bool = False,
+               rect: bool = False) -> list:
+
+        return self.detect_batch([image], input_shape, conf_thres, iou_thres,
+                                 max_det, filter_classes, agnostic_nms,
+                                 with_p6, rect)[0]
+
+    def detect_batch(self, images: list,
+                     input_shape: tuple = (640, 640),
+                     conf_thres: float = 0.25,
+                     iou_thres: float = 0.45,
+                     max_det: int = 1000,
+                     filter_classes: bool = None,
+                     agnostic_nms: bool = True,
+                     with_p6: bool = False,
+                     rect: bool = False) -> list:
+
+        # Rectangular inference letterboxes into the smallest stride aligned
+        # shape instead of padding to the full input_shape
+        if rect and (not self.use_onnx or has_dynamic_shape(self.model)) and not self.script:
+            input_shape = rect_shape([image.shape[:2] for image in images],
+                                     input_shape, 64 if with_p6 else 32)
+
+        # Image Preprocessing, all images are letterboxed into one batch
+        processed_image = np.concatenate(
+            [self.image_preprocessing(image, input_shape)[1] for image in images])
+
+        # Only the filtered classes are NMS candidates
+        classes = filter_class_ids(filter_classes)
+
         # Inference
         if self.use_onnx:
             # Input names of ONNX model on which it is exported   
-            input_name = self.model.get_inputs()[0].name
+            input_name = self.model.input_names[0]
             # Run onnx model 
-            pred = self.model.run([self.model.get_outputs()[0].name], {input_name: processed_image})[0]
+            outputs = run_batch(self.model, self.model.output_names[:1],
+                                input_name, processed_image)
+            if self.end2end:
+                # NMS ran in the graph
+                predictions = [torch.from_numpy(detection) for detection in
+                               end2end_detections(outputs, len(images), conf_thres,
+                                                  max_det, classes)]
+            else:
+                predictions = [torch.from_numpy(detection) for detection in
+                               yolo_nms(np.concatenate([output[0] for output in outputs]),
+                                        conf_thres, iou_thres, classes=classes,
+                                        agnostic=agnostic_nms, max_det=max_det)]
             # Run Pytorch model        
         else:
             processed_image = torch.from_numpy(processed_image).to(self.device)
             # Change image floating point precision if fp16 set to true
             processed_image = processed_image.half() if self.fp16 else processed_image.float() 
-            pred = self.model(processed_image, augment=False, visualize=False)[0]
-       
-        # Post Processing
-        if isinstance(pred, np.ndarray):
-            pred = torch.tensor(pred, device=self.device)
-        predictions = non_max_suppression(pred, conf_thres, 
-                                          iou_thres, 
-                                          agnostic=agnostic_nms, 
-                                          max_det=max_det)
-        
-        for i, prediction in enumerate(predictions):  # per image
+            pred = self.model(processed_image)[0]
+            # Post Processing
+            predictions = non_max_suppression(pred, conf_thres, 
+                                              iou_thres, 
+                                              classes=classes,
+                                              agnostic=agnostic_nms, 
+                                              max_det=max_det)
+
+        results = []
+        for image, prediction in zip(images, predictions):  # per image
             if len(prediction):
                 prediction[:, :4] = scale_coords(
-                    processed_image.shape[2:], prediction[:, :4], original_image.shape).round()
-                predictions[i] = prediction
-        detections = predictions[0].cpu().numpy()
-        image_info = {
-            'width': original_image.shape[1],
-            'height': original_image.shape[0],
-        }
-
-        self.boxes = detections[:, :4]
-        self.scores = detections[:, 4:5]
-        self.class_ids = detections[:, 5:6]
-
-        if filter_classes:
-            class_names = get_names()
-
-            filter_class_idx = []
-            if filter_classes:
-                for _class in filter_classes:
-                    if _class.lower() in class_names:
-                        filter_class_idx.append(class_names.index(_class.lower()))
-                    else:
-                        warnings.warn(f"class {_class} not found in model classes list.")
-
-            detections = detections[np.in1d(detections[:,5].astype(int), filter_class_idx)]
-
-        return detections, image_info
-
- 
\ No newline at end of file
+                    processed_image.shape[2:], prediction[:, :4], image.shape).round()
+            detections = as_detections(prediction.detach().cpu().numpy())
+            image_info = {
+                'width': image.shape[1],
+                'height': image.shape[0],
+            }
+
+            self.boxes = detections[:, :4]
+            self.scores = detections[:, 4:5]
+            self.class_ids = detections[:, 5:6]
+
+            results.append((detections, image_info))
+
+        return results
@@ -1,24 +1,36 @@
 import os
 import sys
-from asone.utils import get_names
 import numpy as np
-import warnings
 import torch
-import onnxruntime
 
 from asone import utils
+from asone.detectors.utils.onnx_engine import OnnxEngine
+from asone.detectors.utils.onnx_utils import (run_batch, has_dynamic_shape,
+                                              is_end2end, end2end_detections)
+from asone.detectors.utils.letterbox import rect_shape, scale_boxes
+from asone.detectors.utils.nms import yolo_nms
+from asone.detectors.utils.inference_prep import load_prepared
+from asone.detectors.utils.detections import as_detections, filter_class_ids
 from asone.detectors.yolov6.yolov6.utils.yolov6_utils import (prepare_input, load_pytorch,
-                                                              non_max_suppression, process_and_scale_boxes) 
+                                                              non_max_suppression) 
 sys.path.append(os.path.dirname(__file__))  
 
 class YOLOv6Detector:
     def __init__(self,
                  weights=None,
                  use_onnx=False,
-                 use_cuda=True):
+                 use_cuda=True,
+                 channels_last=False,
+                 script=False,
+                 engine_cfg=None):
 
         self.use_onnx = use_onnx
         self.device = 'cuda' if use_cuda else 'cpu'
+        # TorchScript traces are only valid for the input shape they were traced with
+        self.script = script and not use_onnx
+        self.channels_last = channels_last
+        # OnnxEngine options, e.g. {'intra_op_threads': 4}
+        self.engine_cfg = engine_cfg or {}
 
         if not os.path.exists(weights):
             utils.download_weights(weights)
@@ -32,6 +44,8 @@ class YOLOv6Detector:
             # Get Some ONNX model details 
             self.input_shape, self.input_height, self.input_width = self.ONNXModel_detail(self.model)
             self.input_names, self.output_names = self.ONNXModel_names(self.model)
+        # exported with NMS in the graph by export_end2end
+        self.end2end = self.use_onnx and is_end2end(self.model)
 
 
     def load_model(self, use_cuda, weights, fp16=False):
@@ -39,14 +53,14 @@ class YOLOv6Detector:
         self.fp16 = fp16 & ((not self.use_onnx or self.use_onnx) and self.device != 'cpu')
         # Load onnx 
         if self.use_onnx:
-            if use_cuda:
-                providers = ['CUDAExecutionProvider','CPUExecutionProvider']
-            else:
-                providers = ['CPUExecutionProvider']
-            model = onnxruntime.InferenceSession(weights, providers=providers)
+            model = OnnxEngine(weights, use_cuda, **self.engine_cfg)
         #Load Pytorch
         else:
-            model = load_pytorch(weights, map_location=self.device)
+            # Rep blocks are collapsed by load_prepared
+            model = load_prepared(
+                weights,
+                lambda: load_pytorch(weights, map_location=self.device, fuse=True),
+                self.device, self.channels_last, self.script)
             model.half() if self.fp16 else model.float()
         return model
 
@@ -77,63 +91,82 @@ class YOLOv6Detector:
                max_det: int = 1000,
                filter_classes: bool = None,
                agnostic_nms: bool = True,
-               with_p6: bool = False) -> list:
-        
-        # Prepare Input
-        img_height, img_width = image.shape[:2]
-        processed_image = prepare_input(image, input_shape[0], input_shape[1])
+               with_p6: bool = False,
+               rect: bool = False) -> list:
+
+        return self.detect_batch([image], input_shape, conf_thres, iou_thres,
+                                 max_det, filter_classes, agnostic_nms,
+                                 with_p6, rect)[0]
+
+    def detect_batch(self, images: list,
+                     input_shape: tuple = (640, 640),
+                     conf_thres: float = 0.25,
+                     iou_thres: float = 0.45,
+                     max_det: int = 1000,
+                     filter_classes: bool = None,
+                     agnostic_nms: bool = True,
+                     with_p6: bool = False,
+                     rect: bool = False) -> list:
+
+        # Rectangular inference letterboxes into the smallest stride aligned
+        # shape instead of stretching to input_shape
+        rect = rect and (not self.use_onnx or has_dynamic_shape(self.model)) and not self.script
+        if rect:
+            input_shape = rect_shape([image.shape[:2] for image in images],
+                                     input_shape, 64 if with_p6 else 32)
+
+        # Prepare Input, all images are resized into one batch
+        processed_image = np.concatenate(
+            [prepare_input(image, input_shape[1], input_shape[0], rect) for image in images])
         
+        # Only the filtered classes are NMS candidates
+        classes = filter_class_ids(filter_classes)
+
         # Perform Inference on the Image
         if self.use_onnx:
         # Run ONNX model 
-            prediction = self.model.run(self.output_names,
-                                    {self.input_names[0]: processed_image})[0] 
+            outputs = run_batch(self.model, self.output_names[:1],
+                                self.input_names[0], processed_image)
+            if self.end2end:
+                # NMS ran in the graph
+                prediction = end2end_detections(outputs, len(images), conf_thres,
+                                                max_det, classes)
+            else:
+                prediction = yolo_nms(np.concatenate([output[0] for output in outputs]),
+                                      conf_thres, iou_thres, classes=classes,
+                                      agnostic=agnostic_nms, max_det=max_det)
         # Run Pytorch model
         else:
             processed_image = torch.from_numpy(processed_image).to(self.device)
             # Change image floating point precision if fp16 set to true
             processed_image = processed_image.half() if self.fp16 else processed_image.float() 
             prediction = self.model(processed_image)[0]
-
-        # Post Procesing, non-max-suppression and rescaling
-        if self.use_onnx:
-            # Process ONNX Output
-            
-            boxes, scores, class_ids = process_and_scale_boxes(prediction, img_height, img_width,
-                                                   input_shape[1], input_shape[0])
-            detection = []
-            for box in range(len(boxes)):
-                pred = np.append(boxes[box], scores[box])
-                pred = np.append(pred, class_ids[box])
-                detection.append(pred)
-            detection = np.array(detection)
-        else:
-            detection = non_max_suppression(prediction,
+            prediction = non_max_suppression(prediction,
                                     conf_thres,
                                     iou_thres,
+                                    classes=classes,
                                     agnostic=agnostic_nms, 
-                                    max_det=max_det)[0]
-            
-            detection = detection.detach().cpu().numpy()
-            detection[:, :4] /= np.array([input_shape[1], input_shape[0], input_shape[1], input_shape[0]])
-            detection[:, :4] *= np.array([img_width, img_height, img_width, img_height])
-            
-        if filter_classes:
-            class_names = get_names()
-
-            filter_class_idx = []
-            if filter_classes:
-                for _class in filter_classes:
-                    if _class.lower() in class_names:
-                        filter_class_idx.append(class_names.index(_class.lower()))
-                    else:
-                        warnings.warn(f"class {_class} not found in model classes list.")
-
-            detection = detection[np.in1d(detection[:,5].astype(int), filter_class_idx)]
-    
-        image_info = {
-            'width': image.shape[1],
-            'height': image.shape[0],
-        }
-
-        return detection, image_info
\ No newline at end of file
+                                    max_det=max_det)
+
+        results = []
+        for i, image in enumerate(images):
+            img_height, img_width = image.shape[:2]
+            # Post Procesing, rescaling
+            if self.use_onnx:
+                detection = prediction[i]
+            else:
+                detection = as_detections(prediction[i].detach().cpu().numpy())
+            if rect:
+                detection = scale_boxes(detection, input_shape, image.shape[:2])
+            else:
+                detection[:, :4] /= np.array([input_shape[1], input_shape[0], input_shape[1], input_shape[0]])
+                detection[:, :4] *= np.array([img_width, img_height, img_width, img_height])
+
+            image_info = {
+                'width': image.shape[1],
+                'height': image.shape[0],
+            }
+
+            results.append((detection, image_info))
+
+        return results
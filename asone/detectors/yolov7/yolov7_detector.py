@@ -2,13 +2,18 @@ import os
 import sys
 import onnxruntime
 import torch
-from asone.utils import get_names
 import numpy as np
-import warnings
 from asone.detectors.yolov7.yolov7.utils.yolov7_utils import (prepare_input,
-                                 process_output,
                                  non_max_suppression)
 from asone.detectors.yolov7.yolov7.models.experimental import attempt_load
+from asone.detectors.utils.onnx_engine import OnnxEngine
+from asone.detectors.utils.onnx_utils import (run_batch, has_dynamic_shape,
+                                              is_end2end, end2end_detections)
+from asone.detectors.utils.letterbox import rect_shape, scale_boxes
+from asone.detectors.utils.nms import yolo_nms
+from asone.detectors.utils.detections import as_detections, filter_class_ids
+from asone.detectors.utils.inference_prep import load_prepared
+from asone.utils.quantize import calibration_images, int8_path, quantize_onnx
 from asone import utils
 
 sys.path.append(os.path.join(os.path.dirname(__file__), 'yolov7'))
@@ -16,9 +21,21 @@ class YOLOv7Detector:
     def __init__(self,
                  weights=None,
                  use_onnx=False,
-                 use_cuda=True):
-        self.use_onnx = use_onnx
+                 use_cuda=True,
+                 int8=False,
+                 calib_dir=os.path.join('data', 'images'),
+                 channels_last=False,
+                 script=False,
+                 engine_cfg=None):
+        self.use_onnx = use_onnx or int8
+        # int8 models run on the CPU
+        use_cuda = use_cuda and not int8
         self.device = 'cuda' if use_cuda else 'cpu'
+        # TorchScript traces are only valid for the input shape they were traced with
+        self.script = script and not self.use_onnx
+        self.channels_last = channels_last
+        # OnnxEngine options, e.g. {'intra_op_threads': 4}
+        self.engine_cfg = engine_cfg or {}
 
         #If incase weighst is a list of paths then select path at first index
 
@@ -26,28 +43,42 @@ class YOLOv7Detector:
 
         if not os.path.exists(weights):
             utils.download_weights(weights)
-            
+        if int8:
+            weights = self.quantize(weights, calib_dir)
 
         # Load Model
         self.model = self.load_model(use_cuda, weights)
+        # exported with NMS in the graph by export_end2end
+        self.end2end = self.use_onnx and is_end2end(self.model)
     
     def load_model(self, use_cuda, weights, fp16=False):
         # Device: CUDA and if fp16=True only then half precision floating point works  
         self.fp16 = fp16 & ((not self.use_onnx or self.use_onnx) and self.device != 'cpu')
         # Load onnx 
         if self.use_onnx:            
-            if use_cuda:
-                providers = ['CUDAExecutionProvider','CPUExecutionProvider']
-            else:
-                providers = ['CPUExecutionProvider']
-
-            model = onnxruntime.InferenceSession(weights, providers=providers)
+            model = OnnxEngine(weights, use_cuda, **self.engine_cfg)
         #Load Pytorch
         else: 
-            model = attempt_load(weights, map_location=self.device)
+            model = load_prepared(
+                weights, lambda: attempt_load(weights, map_location=self.device),
+                self.device, self.channels_last, self.script)
             model.half() if self.fp16 else model.float()
         return model
 
+    def quantize(self, weights, calib_dir, limit=100):
+        """int8 version of an ONNX model, statically calibrated once on the
+        frames of `calib_dir` and cached next to it."""
+        path = int8_path(weights)
+        if os.path.isfile(path):
+            return path
+        input_shape = onnxruntime.InferenceSession(
+            weights, providers=['CPUExecutionProvider']).get_inputs()[0].shape[2:]
+        if not all(isinstance(side, int) for side in input_shape):
+            input_shape = (640, 640)
+        batches = (prepare_input(image, input_shape)
+                   for image in calibration_images(calib_dir, limit))
+        return quantize_onnx(weights, batches)
+
     def detect(self, image: list,
                input_shape: tuple = (640, 640),
                conf_thres: float = 0.01,
@@ -55,19 +86,51 @@ class YOLOv7Detector:
                max_det: int = 1000,
                filter_classes: bool = None,
                agnostic_nms: bool = True,
-               with_p6: bool = False) -> list:
+               with_p6: bool = False,
+               rect: bool = False) -> list:
+
+        return self.detect_batch([image], input_shape, conf_thres, iou_thres,
+                                 max_det, filter_classes, agnostic_nms,
+                                 with_p6, rect)[0]
 
-        # Preprocess input image and also copying original image for later use
-        original_image = image.copy()
-        img_height, img_width = original_image.shape[:2]
-        processed_image = prepare_input(image, input_shape)
+    def detect_batch(self, images: list,
+                     input_shape: tuple = (640, 640),
+                     conf_thres: float = 0.01,
+                     iou_thres: float = 0.45,
+                     max_det: int = 1000,
+                     filter_classes: bool = None,
+                     agnostic_nms: bool = True,
+                     with_p6: bool = False,
+                     rect: bool = False) -> list:
+
+        # Rectangular inference letterboxes into the smallest stride aligned
+        # shape instead of stretching to input_shape
+        rect = rect and (not self.use_onnx or has_dynamic_shape(self.model)) and not self.script
+        if rect:
+            input_shape = rect_shape([image.shape[:2] for image in images],
+                                     input_shape, 64 if with_p6 else 32)
+
+        # Preprocess input images into a single batch
+        processed_image = np.concatenate(
+            [prepare_input(image, input_shape, rect) for image in images])
         
+        # Only the filtered classes are NMS candidates
+        classes = filter_class_ids(filter_classes)
+
         # Perform Inference on the Image
         if self.use_onnx:
         # Run ONNX model 
-            input_name = self.model.get_inputs()[0].name
-            prediction = self.model.run([self.model.get_outputs()[0].name], {
-                                 input_name: processed_image})
+            input_name = self.model.input_names[0]
+            outputs = run_batch(self.model, self.model.output_names[:1],
+                                input_name, processed_image)
+            if self.end2end:
+                # NMS ran in the graph
+                prediction = end2end_detections(outputs, len(images), conf_thres,
+                                                max_det, classes)
+            else:
+                prediction = yolo_nms(np.concatenate([output[0] for output in outputs]),
+                                      conf_thres, iou_thres, classes=classes,
+                                      agnostic=agnostic_nms, max_det=max_det)
         # Run Pytorch model
         else:
             processed_image = torch.from_numpy(processed_image).to(self.device)
@@ -75,48 +138,38 @@ class YOLOv7Detector:
             processed_image = processed_image.half() if self.fp16 else processed_image.float() 
 
             with torch.no_grad():
-                prediction = self.model(processed_image, augment=False)[0]
-                
-        detection = []
-        # Postprocess prediction
-        if self.use_onnx:
-            detection = process_output(prediction,
-                                       original_image.shape[:2],
-                                       input_shape,
-                                       conf_thres,
-                                       iou_thres)
-        else:
-            detection = non_max_suppression(prediction,
-                                            conf_thres,
-                                            iou_thres,
-                                            agnostic=agnostic_nms)[0]
-            
-            detection = detection.detach().cpu().numpy()
-            # Rescaling Bounding Boxes
-            detection[:, :4] /= np.array([input_shape[1], input_shape[0], input_shape[1], input_shape[0]])
-            detection[:, :4] *= np.array([img_width, img_height, img_width, img_height])
-
-        image_info = {
-            'width': original_image.shape[1],
-            'height': original_image.shape[0],
-        }
+                prediction = self.model(processed_image)[0]
+            prediction = non_max_suppression(prediction,
+                                             conf_thres,
+                                             iou_thres,
+                                             classes=classes,
+                                             agnostic=agnostic_nms)
 
-        if len(detection) > 0:
-            self.boxes = detection[:, :4]
-            self.scores = detection[:, 4:5]
-            self.class_ids = detection[:, 5:6]
+        results = []
+        for i, image in enumerate(images):
+            img_height, img_width = image.shape[:2]
+            # Postprocess prediction
+            if self.use_onnx:
+                detection = prediction[i]
+            else:
+                detection = as_detections(prediction[i].detach().cpu().numpy())
+            # Rescaling Bounding Boxes
+            if rect:
+                detection = scale_boxes(detection, input_shape, image.shape[:2])
+            else:
+                detection[:, :4] /= np.array([input_shape[1], input_shape[0], input_shape[1], input_shape[0]])
+                detection[:, :4] *= np.array([img_width, img_height, img_width, img_height])
 
-        if filter_classes:
-            class_names = get_names()
+            image_info = {
+                'width': image.shape[1],
+                'height': image.shape[0],
+            }
 
-            filter_class_idx = []
-            if filter_classes:
-                for _class in filter_classes:
-                    if _class.lower() in class_names:
-                        filter_class_idx.append(class_names.index(_class.lower()))
-                    else:
-                        warnings.warn(f"class {_class} not found in model classes list.")
+            if len(detection) > 0:
+                self.boxes = detection[:, :4]
+                self.scores = detection[:, 4:5]
+                self.class_ids = detection[:, 5:6]
 
-            detection = detection[np.in1d(detection[:,5].astype(int), filter_class_idx)]
+            results.append((detection, image_info))
 
-        return detection, image_info
+        return results
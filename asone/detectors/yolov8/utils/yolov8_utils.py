@@ -14,7 +14,7 @@ def prepare_input(image, input_shape, stride, pt):
 
 
 def process_output(detections, 
-                   ori_shape, 
+                   ori_shapes, 
                    input_shape, 
                    conf_threshold, 
                    iou_threshold,
@@ -29,13 +29,17 @@ def process_output(detections,
                                           agnostic=agnostic,
                                           max_det=max_det,
                                           )
+    return scale_detections(detections, ori_shapes, input_shape)
 
+
+def scale_detections(detections, ori_shapes, input_shape):
+    """Boxes of the per image (N, 6) tensors from the letterboxed input back
+    to the original images, returned as numpy arrays."""
     for i in range(len(detections)): 
         # Extract boxes from predictions
-        detections[i][:, :4] = ops.scale_boxes(input_shape, detections[i][:, :4], ori_shape).round()
+        detections[i][:, :4] = ops.scale_boxes(input_shape, detections[i][:, :4], ori_shapes[i]).round()
 
-    
-    return detections[0].cpu().numpy()
+    return [detection.cpu().numpy() for detection in detections]
 
 
 def rescale_boxes(boxes, ori_shape, input_shape):
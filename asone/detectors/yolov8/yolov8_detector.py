@@ -1,11 +1,14 @@
 import os
 from asone import utils
-from asone.utils import get_names
-import onnxruntime
 import torch
-from .utils.yolov8_utils import prepare_input, process_output
+from .utils.yolov8_utils import prepare_input, process_output, scale_detections
+from asone.detectors.utils.onnx_engine import OnnxEngine
+from asone.detectors.utils.onnx_utils import run_batch, has_dynamic_shape
+from asone.detectors.utils.letterbox import rect_shape
+from asone.detectors.utils.nms import yolo_nms
+from asone.detectors.utils.inference_prep import load_prepared
+from asone.detectors.utils.detections import as_detections, filter_class_ids
 import numpy as np
-import warnings
 from ultralytics.nn.autobackend import AutoBackend
 from ultralytics.nn.tasks import DetectionModel, attempt_load_one_weight
 
@@ -14,10 +17,18 @@ class YOLOv8Detector:
     def __init__(self,
                  weights=None,
                  use_onnx=False,
-                 use_cuda=True):
+                 use_cuda=True,
+                 channels_last=False,
+                 script=False,
+                 engine_cfg=None):
 
         self.use_onnx = use_onnx
         self.device = 'cuda' if use_cuda else 'cpu'
+        # TorchScript traces are only valid for the input shape they were traced with
+        self.script = script and not use_onnx
+        self.channels_last = channels_last
+        # OnnxEngine options, e.g. {'intra_op_threads': 4}
+        self.engine_cfg = engine_cfg or {}
 
         # If incase weighst is a list of paths then select path at first index
         weights = str(weights[0] if isinstance(weights, list) else weights)
@@ -36,16 +47,14 @@ class YOLOv8Detector:
 
         # Load onnx
         if self.use_onnx:
-            if use_cuda:
-                providers = ['CUDAExecutionProvider', 'CPUExecutionProvider']
-            else:
-                providers = ['CPUExecutionProvider']
-
-            model = onnxruntime.InferenceSession(weights, providers=providers)
+            model = OnnxEngine(weights, use_cuda, **self.engine_cfg)
         # Load Pytorch
         else:
-            model, ckpt = attempt_load_one_weight(weights)
-            model = AutoBackend(model, fp16=False, dnn=False).to(self.device)
+            model = load_prepared(
+                weights,
+                lambda: AutoBackend(attempt_load_one_weight(weights)[0],
+                                    fp16=False, dnn=False).to(self.device),
+                self.device, self.channels_last, self.script)
             model.half() if self.fp16 else model.float()
         return model
 
@@ -56,21 +65,53 @@ class YOLOv8Detector:
                max_det: int = 1000,
                filter_classes: bool = None,
                agnostic_nms: bool = True,
-               with_p6: bool = False
+               with_p6: bool = False,
+               rect: bool = False
                ) -> list:
 
-        # Preprocess input image and also copying original image for later use
-        original_image = image.copy()
-        processed_image = prepare_input(
-            image, input_shape, 32, False if self.use_onnx else True)
+        return self.detect_batch([image], input_shape, conf_thres, iou_thres,
+                                 max_det, filter_classes, agnostic_nms,
+                                 with_p6, rect)[0]
+
+    def detect_batch(self, images: list,
+                     input_shape: tuple = (640, 640),
+                     conf_thres: float = 0.25,
+                     iou_thres: float = 0.45,
+                     max_det: int = 1000,
+                     filter_classes: bool = None,
+                     agnostic_nms: bool = True,
+                     with_p6: bool = False,
+                     rect: bool = False
+                     ) -> list:
+
+        # Rectangular inference letterboxes into the smallest stride aligned
+        # shape shared by the whole batch, also for dynamic shape ONNX models
+        if rect and (not self.use_onnx or has_dynamic_shape(self.model)) and not self.script:
+            input_shape = rect_shape([image.shape[:2] for image in images],
+                                     input_shape)
+            auto = False
+        else:
+            # Minimal padding only keeps letterboxed shapes equal
+            # when every image in the batch has the same size
+            auto = not self.use_onnx and len({image.shape for image in images}) == 1
+        # Preprocess input images into a single batch
+        processed_image = np.concatenate(
+            [prepare_input(image, input_shape, 32, auto) for image in images])
 
         # Perform Inference on the Image
         if self.use_onnx:
             # Run ONNX model
-            input_name = self.model.get_inputs()[0].name
-            prediction = self.model.run([self.model.get_outputs()[0].name], {
-                input_name: processed_image})[0]
-            prediction = torch.from_numpy(prediction)
+            input_name = self.model.input_names[0]
+            outputs = run_batch(self.model, self.model.output_names[:1],
+                                input_name, processed_image)
+            prediction = np.concatenate([output[0] for output in outputs])
+            # (B, 4 + C, N) anchor free output, rows have no objectness
+            detections = scale_detections(
+                [torch.from_numpy(detection) for detection in
+                 yolo_nms(prediction.transpose(0, 2, 1), conf_thres, iou_thres,
+                          classes=filter_class_ids(filter_classes),
+                          agnostic=agnostic_nms, max_det=max_det, objectness=False)],
+                [image.shape[:2] for image in images], processed_image.shape[2:])
         # Run Pytorch model
         else:
             processed_image = torch.from_numpy(processed_image).to(self.device)
@@ -78,37 +119,25 @@ class YOLOv8Detector:
             processed_image = processed_image.half() if self.fp16 else processed_image.float()
 
             with torch.no_grad():
-                prediction = self.model(processed_image, augment=False)
-
-        detection = []
-        # Postprocess prediction
-        detection = process_output(prediction,
-                                   original_image.shape[:2],
-                                   processed_image.shape[2:],
-                                   conf_thres,
-                                   iou_thres,
-                                   agnostic=agnostic_nms,
-                                   max_det=max_det)
-
-        image_info = {
-            'width': original_image.shape[1],
-            'height': original_image.shape[0],
-        }
-
-        if filter_classes:
-            class_names = get_names()
-
-            filter_class_idx = []
-            if filter_classes:
-                for _class in filter_classes:
-                    if _class.lower() in class_names:
-                        filter_class_idx.append(
-                            class_names.index(_class.lower()))
-                    else:
-                        warnings.warn(
-                            f"class {_class} not found in model classes list.")
-
-            detection = detection[np.in1d(
-                detection[:, 5].astype(int), filter_class_idx)]
-
-        return detection, image_info
+                prediction = self.model(processed_image)
+
+            # Postprocess prediction
+            detections = process_output(prediction,
+                                        [image.shape[:2] for image in images],
+                                        processed_image.shape[2:],
+                                        conf_thres,
+                                        iou_thres,
+                                        classes=filter_class_ids(filter_classes),
+                                        agnostic=agnostic_nms,
+                                        max_det=max_det)
+
+        results = []
+        for image, detection in zip(images, detections):
+            image_info = {
+                'width': image.shape[1],
+                'height': image.shape[0],
+            }
+
+            results.append((as_detections(detection), image_info))
+
+        return results
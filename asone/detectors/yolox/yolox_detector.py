@@ -1,16 +1,20 @@
 
 import os
-from asone.utils import get_names
 import numpy as np
-import warnings
 
 import torch
-import onnxruntime
 
 from asone import utils
 from asone.detectors.yolox.yolox.utils import fuse_model, postprocess
 from asone.detectors.yolox.yolox.exp import get_exp
-from asone.detectors.yolox.yolox_utils import preprocess, multiclass_nms, demo_postprocess
+from asone.detectors.yolox.yolox_utils import preprocess, demo_postprocess
+from asone.detectors.utils.nms import multiclass_nms
+from asone.detectors.utils.onnx_engine import OnnxEngine
+from asone.detectors.utils.onnx_utils import (run_batch, has_dynamic_shape,
+                                              is_end2end, end2end_detections)
+from asone.detectors.utils.letterbox import rect_shape
+from asone.detectors.utils.detections import as_detections, filter_class_ids
+from asone.detectors.utils.inference_prep import load_prepared
 
 
 class YOLOxDetector:
@@ -19,11 +23,19 @@ class YOLOxDetector:
                  exp_file=None,
                  weights=None,
                  use_onnx=False,
-                 use_cuda=False
+                 use_cuda=False,
+                 channels_last=False,
+                 script=False,
+                 engine_cfg=None
                  ):
 
         self.use_onnx = use_onnx
         self.device = 'cuda' if use_cuda else 'cpu'
+        # TorchScript traces are only valid for the input shape they were traced with
+        self.script = script and not use_onnx
+        self.channels_last = channels_last
+        # OnnxEngine options, e.g. {'intra_op_threads': 4}
+        self.engine_cfg = engine_cfg or {}
 
         if not os.path.exists(weights):
             utils.download_weights(weights)
@@ -40,22 +52,28 @@ class YOLOxDetector:
             self.model = self.load_onnx_model(use_cuda, weights)
         else:
             self.model = self.load_torch_model(weights, exp_file, model_name)
+        # exported with NMS in the graph by export_end2end
+        self.end2end = self.use_onnx and is_end2end(self.model)
 
     def load_onnx_model(self, use_cuda, weights):
         # Load onnx
-        if use_cuda:
-            providers = ['CUDAExecutionProvider', 'CPUExecutionProvider']
-        else:
-            providers = ['CPUExecutionProvider']
-        model = onnxruntime.InferenceSession(weights, providers=providers)
+        model = OnnxEngine(weights, use_cuda, **self.engine_cfg)
         return model
 
     def load_torch_model(self, weights,
                          exp_file, model_name,
-                         fp16=True, fuse=False):
+                         fp16=True, fuse=True):
         # Device: CUDA and if fp16=True only then half precision floating point works
         self.fp16 = bool(fp16) & (
             (not self.use_onnx or self.use_onnx) and self.device != 'cpu')
+        model = load_prepared(
+            weights, lambda: self.build_model(weights, exp_file, model_name, fuse),
+            self.device, self.channels_last, self.script)
+        if self.fp16:  # to FP16
+            model.half()
+        return model
+
+    def build_model(self, weights, exp_file, model_name, fuse=True):
         exp = get_exp(exp_file, model_name)
 
         ckpt = torch.load(weights, map_location="cpu")
@@ -63,12 +81,8 @@ class YOLOxDetector:
         # get number of classes from weights
         # head.cls_preds.0.weight weights contains number of classes so simply extract it and with in exp file.
         exp.num_classes = ckpt['model']['head.cls_preds.0.weight'].size()[0]
-        self.classes = exp.num_classes
         model = exp.get_model()
-        if self.device == "cuda":
-            model.cuda()
-            if self.fp16:  # to FP16
-                model.half()
+        model.to(self.device)
         model.eval()
 
         # load the model state dict
@@ -85,91 +99,107 @@ class YOLOxDetector:
                max_det: int = 1000,
                filter_classes: bool = None,
                agnostic_nms: bool = True,
-               with_p6: bool = False
+               with_p6: bool = False,
+               rect: bool = False
                ) -> list:
 
+        return self.detect_batch([image], input_shape, conf_thres, iou_thres,
+                                 max_det, filter_classes, agnostic_nms,
+                                 with_p6, rect)[0]
+
+    def detect_batch(self,
+                     images: list,
+                     input_shape: tuple = (640, 640),
+                     conf_thres: float = 0.25,
+                     iou_thres: float = 0.45,
+                     max_det: int = 1000,
+                     filter_classes: bool = None,
+                     agnostic_nms: bool = True,
+                     with_p6: bool = False,
+                     rect: bool = False
+                     ) -> list:
+
         if self.weights_name in ['yolox_tiny.onnx', 'yolox_nano.onnx']:
             input_shape = (416, 416)
 
+        # Rectangular inference letterboxes into the smallest stride aligned
+        # shape instead of padding to the full input_shape
+        if rect and (not self.use_onnx or has_dynamic_shape(self.model)) and not self.script:
+            input_shape = rect_shape([image.shape[:2] for image in images],
+                                     input_shape, 64 if with_p6 else 32)
+
         self.input_shape = input_shape
 
-        # Image Preprocess for onnx models
-        if self.use_onnx:
-            processed_image, ratio = preprocess(image, self.input_shape)
-        else:
-            processed_image, ratio = preprocess(image, self.input_shape)
-            processed_image = torch.from_numpy(processed_image).unsqueeze(0)
+        # Image Preprocess, all images are letterboxed into one batch
+        preprocessed = [preprocess(image, self.input_shape) for image in images]
+        processed_image = np.stack([image for image, _ in preprocessed])
+        ratios = [ratio for _, ratio in preprocessed]
+        if not self.use_onnx:
+            processed_image = torch.from_numpy(processed_image)
             processed_image = processed_image.float()
             if self.device == "cuda":
                 processed_image = processed_image.cuda()
                 if self.fp16:
                     processed_image = processed_image.half()
 
-        detection = []
+        # Only the filtered classes are NMS candidates
+        classes = filter_class_ids(filter_classes)
+
         # Inference
         if self.use_onnx:  # Run ONNX model
             # Model Input and Output
-            model_inputs = {self.model.get_inputs(
-            )[0].name: processed_image[None, :, :, :]}
-            detection = self.model.run(None, model_inputs)[0]
-            # Postprrocessing
-            detection = demo_postprocess(
-                detection, self.input_shape, p6=with_p6)[0]
-            boxes = detection[:, :4]
-            scores = detection[:, 4:5] * detection[:, 5:]
-            boxes_xyxy = np.ones_like(boxes)
-            boxes_xyxy[:, 0] = boxes[:, 0] - boxes[:, 2]/2.
-            boxes_xyxy[:, 1] = boxes[:, 1] - boxes[:, 3]/2.
-            boxes_xyxy[:, 2] = boxes[:, 0] + boxes[:, 2]/2.
-            boxes_xyxy[:, 3] = boxes[:, 1] + boxes[:, 3]/2.
-            boxes_xyxy /= ratio
-            detection = multiclass_nms(
-                boxes_xyxy, scores, nms_thr=iou_thres, score_thr=conf_thres)
-
+            outputs = run_batch(self.model, None,
+                                self.model.input_names[0], processed_image)
+            if self.end2end:
+                # decoded and NMS ran in the graph
+                prediction = end2end_detections(outputs, len(images), conf_thres,
+                                                max_det, classes)
+            else:
+                prediction = np.concatenate([output[0] for output in outputs])
+                # Postprrocessing
+                prediction = demo_postprocess(
+                    prediction, self.input_shape, p6=with_p6)
         # Run Pytorch model
         else:
             with torch.no_grad():
                 prediction = self.model(processed_image)
+                # rows are box, objectness and one score per class
                 prediction = postprocess(prediction,
-                                         self.classes,
+                                         prediction.shape[2] - 5,
                                          conf_thres,
                                          iou_thres,
-                                         class_agnostic=agnostic_nms
-                                         )[0]
-                if prediction is not None:
-                    prediction = prediction.detach().cpu().numpy()
-                    bboxes = prediction[:, 0:4]
-                    # Postprocessing
-                    bboxes /= ratio
-                    cls = prediction[:, 6]
-                    scores = prediction[:, 4] * prediction[:, 5]
-                    for box in range(len(bboxes)):
-                        pred = np.append(bboxes[box], scores[box])
-                        pred = np.append(pred, cls[box])
-                        detection.append(pred)
-                    detection = np.array(detection)
-                else:
-                    detection = prediction
-
-        if filter_classes:
-            class_names = get_names()
-
-            filter_class_idx = []
-            if filter_classes:
-                for _class in filter_classes:
-                    if _class.lower() in class_names:
-                        filter_class_idx.append(
-                            class_names.index(_class.lower()))
-                    else:
-                        warnings.warn(
-                            f"class {_class} not found in model classes list.")
-
-            detection = detection[np.in1d(
-                detection[:, 5].astype(int), filter_class_idx)]
-
-        image_info = {
-            'width': image.shape[1],
-            'height': image.shape[0],
-        }
-
-        return detection, image_info
+                                         class_agnostic=agnostic_nms,
+                                         classes=classes
+                                         )
+
+        results = []
+        for image, image_pred, ratio in zip(images, prediction, ratios):
+            if self.end2end:
+                detection = image_pred
+            elif self.use_onnx:
+                # xywh to xyxy
+                boxes = np.concatenate([image_pred[:, :2] - image_pred[:, 2:4] / 2,
+                                        image_pred[:, :2] + image_pred[:, 2:4] / 2], 1)
+                scores = image_pred[:, 4:5] * image_pred[:, 5:]
+                detection = multiclass_nms(
+                    boxes, scores, iou_thres=iou_thres, score_thres=conf_thres,
+                    class_agnostic=agnostic_nms, classes=classes)[:max_det]
+            elif image_pred is not None:
+                # rows are xyxy, objectness, class score and class
+                image_pred = image_pred.detach().cpu().numpy()
+                detection = np.concatenate(
+                    [image_pred[:, :4], image_pred[:, 4:5] * image_pred[:, 5:6],
+                     image_pred[:, 6:7]], 1)[:max_det]
+            else:
+                detection = None
+            detection = as_detections(detection)
+            detection[:, :4] /= ratio
+
+            image_info = {
+                'width': image.shape[1],
+                'height': image.shape[0],
+            }
+
+            results.append((detection, image_info))
+
+        return results
@@ -1,7 +1,17 @@
-from asone.trackers.byte_track.bytetracker import ByteTrack
-from asone.trackers.deep_sort.deepsort import DeepSort
-from asone.trackers.nor_fair.norfair import NorFair
+import importlib
+
+from asone.trackers.tracker import Tracker, TRACKER_REGISTRY
+
+
+# the trackers are imported on first access, see TRACKER_REGISTRY
+_LAZY_TRACKERS = dict(reversed(path.rsplit('.', 1))
+                      for path in TRACKER_REGISTRY.values())
+
+
+def __getattr__(name):
+    if name in _LAZY_TRACKERS:
+        return getattr(importlib.import_module(_LAZY_TRACKERS[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-from asone.trackers.tracker import Tracker
 
 __all__ = ['Tracker', 'ByteTrack', 'DeepSort', 'NorFair']
@@ -4,7 +4,8 @@ from asone import utils
 
 
 class ByteTrack(object):
-    def __init__(self, detector, min_box_area: int = 10, aspect_ratio_thresh:float= 1.6) -> None:
+    def __init__(self, detector, min_box_area: int = 10, aspect_ratio_thresh:float= 1.6, cfg: dict = None) -> None:
+        cfg = cfg or {}
 
         self.min_box_area = min_box_area
         self.aspect_ratio_thresh = aspect_ratio_thresh
@@ -18,7 +19,7 @@ class ByteTrack(object):
         except AttributeError as e:
             self.input_shape = (640, 640)
 
-        self.tracker = BYTETracker(frame_rate=30)
+        self.tracker = BYTETracker(frame_rate=30, assignment=cfg.get('ASSIGNMENT', 'lapjv'))
 
     def detect_and_track(self, image: np.ndarray, config: dict) -> tuple:
         dets_xyxy, image_info = self.detector.detect(image, **config)
@@ -29,13 +30,17 @@ class ByteTrack(object):
         scores = []
 
         if isinstance(dets_xyxy, np.ndarray) and len(dets_xyxy) > 0:
-            class_ids = [int(i) for i in dets_xyxy[:, -1].tolist()]
-            bboxes_xyxy, ids, scores = self._tracker_update(
+            bboxes_xyxy, ids, scores, class_ids = self._tracker_update(
                 dets_xyxy,
                 image_info,
             )
         return bboxes_xyxy, ids, scores, class_ids
 
+    def predict(self, image: np.ndarray) -> tuple:
+        """Return Kalman predicted tracks for a frame skipped by the detector."""
+        online_targets = self.tracker.predict()
+        return self._format_targets(online_targets)
+
     def _tracker_update(self, dets: np.ndarray, image_info: dict):
         online_targets = []
         if dets is not None:
@@ -43,11 +48,16 @@ class ByteTrack(object):
                 dets[:, :-1],
                 [image_info['height'], image_info['width']],
                 [image_info['height'], image_info['width']],
+                class_ids=dets[:, -1],
             )
 
+        return self._format_targets(online_targets)
+
+    def _format_targets(self, online_targets: list):
         online_xyxys = []
         online_ids = []
         online_scores = []
+        online_class_ids = []
         for online_target in online_targets:
             tlwh = online_target.tlwh
             track_id = online_target.track_id
@@ -56,5 +66,6 @@ class ByteTrack(object):
                 online_xyxys.append(utils.tlwh_to_xyxy(tlwh))
                 online_ids.append(track_id)
                 online_scores.append(online_target.score)
+                online_class_ids.append(int(online_target.cls))
 
-        return online_xyxys, online_ids, online_scores
+        return online_xyxys, online_ids, online_scores, online_class_ids
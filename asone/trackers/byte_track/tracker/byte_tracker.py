@@ -5,15 +5,16 @@ from .basetrack import BaseTrack, TrackState
 
 class STrack(BaseTrack):
     shared_kalman = KalmanFilter()
-    def __init__(self, tlwh, score):
+    def __init__(self, tlwh, score, cls=None):
 
         # wait activate
-        self._tlwh = np.asarray(tlwh, dtype=np.float)
+        self._tlwh = np.asarray(tlwh, dtype=np.float64)
         self.kalman_filter = None
         self.mean, self.covariance = None, None
         self.is_activated = False
 
         self.score = score
+        self.cls = cls
         self.tracklet_len = 0
 
     def predict(self):
@@ -60,6 +61,7 @@ class STrack(BaseTrack):
         if new_id:
             self.track_id = self.next_id()
         self.score = new_track.score
+        self.cls = new_track.cls
 
     def update(self, new_track, frame_id):
         """
@@ -79,6 +81,7 @@ class STrack(BaseTrack):
         self.is_activated = True
 
         self.score = new_track.score
+        self.cls = new_track.cls
 
     @property
     # @jit(nopython=True)
@@ -136,7 +139,7 @@ class STrack(BaseTrack):
 
 
 class BYTETracker(object):
-    def __init__(self, track_thresh=0.5,match_thresh=0.8, track_buffer=30, mot20=False, frame_rate=30):
+    def __init__(self, track_thresh=0.5,match_thresh=0.8, track_buffer=30, mot20=False, frame_rate=30, assignment='lapjv'):
         self.tracked_stracks = []  # type: list[STrack]
         self.lost_stracks = []  # type: list[STrack]
         self.removed_stracks = []  # type: list[STrack]
@@ -145,6 +148,7 @@ class BYTETracker(object):
         self.track_buffer = track_buffer
         self.mot20 = mot20
         self.match_thresh = match_thresh
+        self.assignment = assignment
 
         self.frame_id = 0
         self.det_thresh = track_thresh + 0.1
@@ -152,7 +156,7 @@ class BYTETracker(object):
         self.max_time_lost = self.buffer_size
         self.kalman_filter = KalmanFilter()
 
-    def update(self, output_results, img_info, img_size):
+    def update(self, output_results, img_info, img_size, class_ids=None):
         self.frame_id += 1
         activated_starcks = []
         refind_stracks = []
@@ -169,6 +173,9 @@ class BYTETracker(object):
         img_h, img_w = img_info[0], img_info[1]
         scale = min(img_size[0] / float(img_h), img_size[1] / float(img_w))
         bboxes /= scale
+        if class_ids is None:
+            class_ids = np.full(len(scores), None)
+        class_ids = np.asarray(class_ids)
 
         remain_inds = scores > self.track_thresh
         inds_low = scores > 0.1
@@ -179,11 +186,13 @@ class BYTETracker(object):
         dets = bboxes[remain_inds]
         scores_keep = scores[remain_inds]
         scores_second = scores[inds_second]
+        classes_keep = class_ids[remain_inds]
+        classes_second = class_ids[inds_second]
 
         if len(dets) > 0:
             '''Detections'''
-            detections = [STrack(STrack.tlbr_to_tlwh(tlbr), s) for
-                          (tlbr, s) in zip(dets, scores_keep)]
+            detections = [STrack(STrack.tlbr_to_tlwh(tlbr), s, c) for
+                          (tlbr, s, c) in zip(dets, scores_keep, classes_keep)]
         else:
             detections = []
 
@@ -203,7 +212,7 @@ class BYTETracker(object):
         dists = matching.iou_distance(strack_pool, detections)
         if not self.mot20:
             dists = matching.fuse_score(dists, detections)
-        matches, u_track, u_detection = matching.linear_assignment(dists, thresh=self.match_thresh)
+        matches, u_track, u_detection = matching.linear_assignment(dists, thresh=self.match_thresh, solver=self.assignment)
 
         for itracked, idet in matches:
             track = strack_pool[itracked]
@@ -219,13 +228,13 @@ class BYTETracker(object):
         # association the untrack to the low score detections
         if len(dets_second) > 0:
             '''Detections'''
-            detections_second = [STrack(STrack.tlbr_to_tlwh(tlbr), s) for
-                          (tlbr, s) in zip(dets_second, scores_second)]
+            detections_second = [STrack(STrack.tlbr_to_tlwh(tlbr), s, c) for
+                          (tlbr, s, c) in zip(dets_second, scores_second, classes_second)]
         else:
             detections_second = []
         r_tracked_stracks = [strack_pool[i] for i in u_track if strack_pool[i].state == TrackState.Tracked]
         dists = matching.iou_distance(r_tracked_stracks, detections_second)
-        matches, u_track, u_detection_second = matching.linear_assignment(dists, thresh=0.5)
+        matches, u_track, u_detection_second = matching.linear_assignment(dists, thresh=0.5, solver=self.assignment)
         for itracked, idet in matches:
             track = r_tracked_stracks[itracked]
             det = detections_second[idet]
@@ -247,7 +256,7 @@ class BYTETracker(object):
         dists = matching.iou_distance(unconfirmed, detections)
         if not self.mot20:
             dists = matching.fuse_score(dists, detections)
-        matches, u_unconfirmed, u_detection = matching.linear_assignment(dists, thresh=0.7)
+        matches, u_unconfirmed, u_detection = matching.linear_assignment(dists, thresh=0.7, solver=self.assignment)
         for itracked, idet in matches:
             unconfirmed[itracked].update(detections[idet], self.frame_id)
             activated_starcks.append(unconfirmed[itracked])
@@ -284,6 +293,17 @@ class BYTETracker(object):
 
         return output_stracks
 
+    def predict(self):
+        """Advance tracks one frame with the Kalman filter only, for frames
+        where the detector was skipped. Returns the activated tracks.
+
+        `frame_id` only counts the frames the detector ran on, so predicted
+        frames do not age lost tracks towards `max_time_lost`."""
+        tracked_stracks = [t for t in self.tracked_stracks if t.is_activated]
+        STrack.multi_predict(joint_stracks(tracked_stracks, self.lost_stracks))
+
+        return [track for track in self.tracked_stracks if track.is_activated]
+
 
 def joint_stracks(tlista, tlistb):
     exists = {}
@@ -0,0 +1,5 @@
+import os
+
+# ReID checkpoint DeepSort loads, downloaded on first use
+REID_WEIGHTS = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            'tracker', 'deep', 'checkpoint', 'ckpt.t7')
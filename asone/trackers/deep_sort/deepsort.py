@@ -2,29 +2,37 @@ from .tracker import build_tracker
 import numpy as np
 import os
 from asone import utils
+from asone.trackers.deep_sort import REID_WEIGHTS
 
 
 class DeepSort:
-    def __init__(self, detector, weights=None, use_cuda=True):
+    def __init__(self, detector, weights=None, use_cuda=True, cfg=None):
 
         if weights is None:
-            weights = os.path.join(os.path.dirname(
-                os.path.abspath(__file__)), "tracker/deep/checkpoint/ckpt.t7")
+            weights = REID_WEIGHTS
 
         if not os.path.exists(weights):
             utils.download_weights(weights)
 
-        cfg = {
+        tracker_cfg = {
             'MAX_DIST': 0.2,
             'MIN_CONFIDENCE': 0.3,
             'NMS_MAX_OVERLAP': 0.5,
             'MAX_IOU_DISTANCE': 0.7,
             'MAX_AGE': 70,
             'N_INIT': 3,
-            'NN_BUDGET': 100
+            'NN_BUDGET': 100,
+            'NN_FP16': False,
+            'ASSIGNMENT': 'scipy',
+            'LAZY_REID': False,
+            'REID_REFRESH': 10,
+            'REID_BACKEND': 'torch',
+            'REID_THREADS': None
         }
+        # user overrides, e.g. {'ASSIGNMENT': 'lapjv'}
+        tracker_cfg.update(cfg or {})
 
-        self.tracker = build_tracker(weights, cfg, use_cuda=use_cuda)
+        self.tracker = build_tracker(weights, tracker_cfg, use_cuda=use_cuda)
         self.detector = detector
         try:
             self.input_shape = tuple(detector.model.get_inputs()[0].shape[2:])
@@ -53,6 +61,20 @@ class DeepSort:
 
         return bboxes_xyxy, ids, [], class_ids
 
+    def predict(self, image: np.ndarray) -> tuple:
+        """Return Kalman predicted tracks for a frame skipped by the detector."""
+        bboxes_xyxy = []
+        ids = []
+        class_ids = []
+
+        outputs = self.tracker.predict(image)
+        if len(outputs) > 0:
+            bboxes_xyxy = outputs[:, :4]
+            ids = outputs[:, -2]
+            class_ids = outputs[:, -1]
+
+        return bboxes_xyxy, ids, [], class_ids
+
     def _tracker_update(self, dets_xyxy: np.ndarray, image_info: dict):
 
         bbox_xyxy = []
@@ -11,4 +11,9 @@ def build_tracker(weights, cfg, use_cuda=True):
     return DeepSORT(weights,
         max_dist=cfg['MAX_DIST'], min_confidence=cfg['MIN_CONFIDENCE'],
         nms_max_overlap=cfg['NMS_MAX_OVERLAP'], max_iou_distance=cfg['MAX_IOU_DISTANCE'],
-        max_age=cfg['MAX_AGE'], n_init=cfg['N_INIT'], nn_budget=cfg['NN_BUDGET'], use_cuda=use_cuda)
+        max_age=cfg['MAX_AGE'], n_init=cfg['N_INIT'], nn_budget=cfg['NN_BUDGET'],
+        nn_fp16=cfg.get('NN_FP16', False),
+        assignment=cfg.get('ASSIGNMENT', 'scipy'), lazy_reid=cfg.get('LAZY_REID', False),
+        reid_refresh=cfg.get('REID_REFRESH', 10),
+        reid_backend=cfg.get('REID_BACKEND', 'torch'), reid_threads=cfg.get('REID_THREADS'),
+        use_cuda=use_cuda)
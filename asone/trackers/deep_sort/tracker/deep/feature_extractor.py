@@ -1,51 +1,125 @@
+import os
+
 import torch
-import torchvision.transforms as transforms
 import numpy as np
 import cv2
 import logging
 
+from asone.utils.quantize import calibration_images, quantize_onnx
 from .model import Net
+from .onnx_export import export_onnx
 
 
 class Extractor(object):
-    def __init__(self, model_path, use_cuda=True):
-        self.net = Net(reid=True)
-        self.device = "cuda" if torch.cuda.is_available() and use_cuda else "cpu"
-        state_dict = torch.load(model_path, map_location=torch.device(self.device))[
-            'net_dict']
-        self.net.load_state_dict(state_dict)
+    def __init__(self, model_path, use_cuda=True, backend='torch', num_threads=None,
+                 calib_dir=os.path.join('data', 'images')):
+        self.backend = backend
         logger = logging.getLogger("root.tracker")
-        logger.info("Loading weights from {}... Done!".format(model_path))
-        self.net.to(self.device)
+        if backend not in ('torch', 'onnx', 'onnx_int8'):
+            raise ValueError(f'Invalid ReID backend: {backend}, '
+                             'valid backends: torch, onnx, onnx_int8')
+        if backend == 'torch':
+            self.device = "cuda" if torch.cuda.is_available() and use_cuda else "cpu"
+        else:
+            # preprocessing stays on the host, onnxruntime takes numpy inputs
+            self.device = "cpu"
         self.size = (64, 128)
-        self.norm = transforms.Compose([
-            transforms.ToTensor(),
-            transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225]),
-        ])
+        # Normalize on the 0-255 scale, applied once to the whole batch
+        self._mean = torch.tensor([0.485, 0.456, 0.406], device=self.device).view(1, 3, 1, 1) * 255.
+        self._std = torch.tensor([0.229, 0.224, 0.225], device=self.device).view(1, 3, 1, 1) * 255.
+        # crops are resized into a uint8 (N, 128, 64, 3) batch, both buffers
+        # are reused between frames and only grow
+        self._batch = np.zeros((0, self.size[1], self.size[0], 3), dtype=np.uint8)
+        self._input = torch.zeros((0, 3, self.size[1], self.size[0]), device=self.device)
+
+        if backend == 'torch':
+            self.net = Net(reid=True)
+            state_dict = torch.load(model_path, map_location=torch.device(self.device))[
+                'net_dict']
+            self.net.load_state_dict(state_dict)
+            # inference mode, BatchNorm must use the running statistics
+            self.net.eval()
+            self.net.to(self.device)
+        else:
+            self.net = None
+            onnx_model = export_onnx(model_path)
+            if backend == 'onnx_int8':
+                # int8 runs on the CPU
+                use_cuda = False
+                # calibrated once, the generator is not consumed if cached
+                onnx_model = quantize_onnx(
+                    onnx_model, self._calibration_batches(calib_dir))
+            self.session = self._load_onnx(onnx_model, use_cuda, num_threads)
+        logger.info("Loading weights from {}... Done!".format(model_path))
+
+    @staticmethod
+    def _load_onnx(onnx_model, use_cuda, num_threads):
+        from asone.detectors.utils.onnx_engine import OnnxEngine
+
+        return OnnxEngine(onnx_model, use_cuda, intra_op_threads=num_threads)
+
+    def _calibration_batches(self, calib_dir, crops_per_image=16):
+        """Person shaped crops at random places and scales of the frames of
+        `calib_dir`, preprocessed like at inference."""
+        rng = np.random.default_rng(0)
+        for image in calibration_images(calib_dir):
+            height, width = image.shape[:2]
+            crop_h = rng.uniform(0.1, 0.6, crops_per_image) * height
+            crop_w = np.minimum(crop_h * rng.uniform(0.3, 0.6, crops_per_image), width)
+            x1 = rng.uniform(0, 1, crops_per_image) * (width - crop_w)
+            y1 = rng.uniform(0, 1, crops_per_image) * (height - crop_h)
+            boxes = np.stack([x1, y1, x1 + crop_w, y1 + crop_h], axis=1).astype(int)
+            # the input buffer is reused, the calibrator gets its own copy
+            yield self._crop_and_preprocess(image, boxes).numpy().copy()
+
+    def _reserve(self, num_crops):
+        if len(self._batch) < num_crops:
+            capacity = max(num_crops, 2 * len(self._batch), 32)
+            self._batch = np.zeros((capacity,) + self._batch.shape[1:], dtype=np.uint8)
+            self._input = torch.zeros((capacity,) + self._input.shape[1:], device=self.device)
 
     def _preprocess(self, im_crops):
         """
-        TODO:
-            1. to float with scale from 0 to 1
-            2. resize to (64, 128) as Market1501 dataset did
-            3. concatenate to a numpy array
-            3. to torch Tensor
-            4. normalize
+        Resize every crop to (64, 128) as Market1501 dataset did into the
+        uint8 batch buffer, then convert and normalize the batch at once.
         """
-        def _resize(im, size):
-            return cv2.resize(im.astype(np.float32)/255., size)
+        self._reserve(len(im_crops))
+        batch = self._batch[:len(im_crops)]
+        for im, out in zip(im_crops, batch):
+            if im.size == 0:
+                out[:] = 0
+                continue
+            cv2.resize(im, self.size, dst=out)
+        return self._normalize(batch)
 
-        im_batch = torch.cat([self.norm(_resize(im, self.size)).unsqueeze(
-            0) for im in im_crops], dim=0).float()
-        return im_batch
+    def _crop_and_preprocess(self, image, boxes_xyxy):
+        """Same as `_preprocess` for the (N, 4) integer xyxy boxes of `image`,
+        crops are views of the frame so nothing is copied before resizing."""
+        return self._preprocess([image[y1:y2, x1:x2] for x1, y1, x2, y2 in boxes_xyxy])
 
-    def __call__(self, im_crops):
-        im_batch = self._preprocess(im_crops)
+    def _normalize(self, batch):
+        im_batch = self._input[:len(batch)]
+        # the uint8 batch goes to the device, 4x less than float32
+        im_batch.copy_(torch.from_numpy(batch).to(self.device).permute(0, 3, 1, 2))
+        return im_batch.sub_(self._mean).div_(self._std)
+
+    def extract(self, image, boxes_xyxy):
+        """Features of the (N, 4) integer xyxy boxes of `image`."""
+        if len(boxes_xyxy) == 0:
+            return np.array([])
+        return self._forward(self._crop_and_preprocess(image, boxes_xyxy))
+
+    def _forward(self, im_batch):
+        if self.net is None:
+            # the engine reuses its output buffer, features outlive the frame
+            return self.session.run(None, {'input': im_batch.numpy()})[0].copy()
         with torch.no_grad():
-            im_batch = im_batch.to(self.device)
             features = self.net(im_batch)
         return features.cpu().numpy()
 
+    def __call__(self, im_crops):
+        return self._forward(self._preprocess(im_crops))
+
 
 if __name__ == '__main__':
     img = cv2.imread("demo.jpg")[:, :, (2, 1, 0)]
@@ -0,0 +1,42 @@
+import os
+
+import torch
+
+from asone.utils.track_cache import file_hash
+from .model import Net
+
+
+def onnx_path(model_path):
+    """Where the ONNX export of `model_path` is cached, next to the checkpoint
+    and keyed by its content, so a replaced checkpoint is exported again."""
+    root, _ = os.path.splitext(model_path)
+    return f'{root}.{file_hash(model_path)[:16]}.onnx'
+
+
+def export_onnx(model_path, opset=12):
+    """Export the ReID `Net` of a `ckpt.t7` checkpoint to ONNX.
+
+    The batch axis is dynamic, the input is a normalized (N, 3, 128, 64)
+    float32 batch named `input` and the output the (N, 512) L2 normalized
+    `features`. Nothing is exported if the cached file exists.
+
+    Returns:
+        str: path of the ONNX model
+    """
+    path = onnx_path(model_path)
+    if os.path.isfile(path):
+        return path
+
+    net = Net(reid=True)
+    state_dict = torch.load(model_path, map_location='cpu')['net_dict']
+    net.load_state_dict(state_dict)
+    net.eval()
+
+    tmp_path = path + '.tmp'
+    torch.onnx.export(net, torch.zeros(1, 3, 128, 64), tmp_path,
+                      opset_version=opset,
+                      input_names=['input'],
+                      output_names=['features'],
+                      dynamic_axes={'input': {0: 'batch'}, 'features': {0: 'batch'}})
+    os.replace(tmp_path, path)
+    return path
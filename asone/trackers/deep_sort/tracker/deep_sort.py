@@ -11,35 +11,75 @@ __all__ = ['DeepSORT']
 
 
 class DeepSORT(object):
-    def __init__(self, model_path, max_dist=0.2, min_confidence=0.3, nms_max_overlap=1.0, max_iou_distance=0.7, max_age=70, n_init=3, nn_budget=100, use_cuda=True):
+    def __init__(self, model_path, max_dist=0.2, min_confidence=0.3, nms_max_overlap=1.0, max_iou_distance=0.7, max_age=70, n_init=3, nn_budget=100, nn_fp16=False, assignment='scipy', lazy_reid=False, reid_refresh=10, reid_backend='torch', reid_threads=None, use_cuda=True):
         self.min_confidence = min_confidence
         self.nms_max_overlap = nms_max_overlap
+        # lazy ReID: detections paired with a track by IoU alone skip the
+        # feature extraction, see Tracker.pre_associate
+        self.lazy_reid = lazy_reid
+        self.reid_refresh = reid_refresh
+        self.reid_extracted = 0
+        self.reid_skipped = 0
 
-        self.extractor = Extractor(model_path, use_cuda=use_cuda)
+        self.extractor = Extractor(model_path, use_cuda=use_cuda,
+                                   backend=reid_backend, num_threads=reid_threads)
 
         max_cosine_distance = max_dist
         metric = NearestNeighborDistanceMetric(
-            "cosine", max_cosine_distance, nn_budget)
+            "cosine", max_cosine_distance, nn_budget,
+            dtype=np.float16 if nn_fp16 else np.float32)
         self.tracker = Tracker(
-            metric, max_iou_distance=max_iou_distance, max_age=max_age, n_init=n_init)
+            metric, max_iou_distance=max_iou_distance, max_age=max_age, n_init=n_init,
+            assignment=assignment)
 
     def update(self, bbox_xywh, confidences, oids, ori_img):
         self.height, self.width = ori_img.shape[:2]
-        # generate detections
-        features = self._get_features(bbox_xywh, ori_img)
+        if not self.lazy_reid:
+            # generate detections
+            features = self._get_features(bbox_xywh, ori_img)
+            self.reid_extracted += len(features)
+            bbox_tlwh = self._xywh_to_tlwh(bbox_xywh)
+            detections = [Detection(bbox_tlwh[i], conf, features[i], oid) for i, (conf,oid) in enumerate(zip(confidences,oids)) if conf > self.min_confidence]
+
+            # update tracker
+            self.tracker.predict()
+            self.tracker.update(detections)
+            return self._get_outputs()
+
+        if isinstance(bbox_xywh, torch.Tensor):
+            bbox_xywh = bbox_xywh.cpu().numpy()
+        keep = [i for i, conf in enumerate(confidences) if conf > self.min_confidence]
+        bbox_xywh = np.asarray(bbox_xywh).reshape(-1, 4)[keep]
         bbox_tlwh = self._xywh_to_tlwh(bbox_xywh)
-        detections = [Detection(bbox_tlwh[i], conf, features[i], oid) for i, (conf,oid) in enumerate(zip(confidences,oids)) if conf > self.min_confidence]
 
-        # print(detections)
-        # run on non-maximum supression
-        boxes = np.array([d.tlwh for d in detections])
-        scores = np.array([d.confidence for d in detections])
-
-        # update tracker
+        # pair the unambiguous detections by IoU, only the others need features
         self.tracker.predict()
-        self.tracker.update(detections)
+        pre_matches = self.tracker.pre_associate(
+            np.c_[bbox_tlwh[:, :2], bbox_tlwh[:, :2] + bbox_tlwh[:, 2:]],
+            refresh_every=self.reid_refresh)
+        pre_matched = set(j for _, j in pre_matches)
+        contested = [j for j in range(len(keep)) if j not in pre_matched]
+        features = [None] * len(keep)
+        if contested:
+            for j, feature in zip(contested, self._get_features(bbox_xywh[contested], ori_img)):
+                features[j] = feature
+        self.reid_extracted += len(contested)
+        self.reid_skipped += len(pre_matches)
+
+        detections = [Detection(bbox_tlwh[j], confidences[i], features[j], oids[i])
+                      for j, i in enumerate(keep)]
+        self.tracker.update(detections, pre_matches)
         # print("len(scores):", len(scores))
         # print("self.tracker.tracks",len(self.tracker.tracks))
+        return self._get_outputs()
+
+    def predict(self, ori_img):
+        """Advance all tracks one frame with the Kalman filter only."""
+        self.height, self.width = ori_img.shape[:2]
+        self.tracker.coast()
+        return self._get_outputs()
+
+    def _get_outputs(self):
         # output bbox identities
         outputs = []
         for track in self.tracker.tracks:
@@ -102,14 +142,17 @@ class DeepSORT(object):
         h = int(y2 - y1)
         return t, l, w, h
 
+    def _xywh_to_xyxy_batch(self, bbox_xywh):
+        """`_xywh_to_xyxy` of all boxes at once."""
+        bbox_xywh = np.asarray(bbox_xywh, dtype=np.float64).reshape(-1, 4)
+        x, y, w, h = bbox_xywh.T
+        x1 = np.maximum(np.trunc(x - w / 2), 0)
+        x2 = np.minimum(np.trunc(x + w / 2), self.width - 1)
+        y1 = np.maximum(np.trunc(y - h / 2), 0)
+        y2 = np.minimum(np.trunc(y + h / 2), self.height - 1)
+        return np.stack([x1, y1, x2, y2], axis=1).astype(int)
+
     def _get_features(self, bbox_xywh, ori_img):
-        im_crops = []
-        for box in bbox_xywh:
-            x1, y1, x2, y2 = self._xywh_to_xyxy(box)
-            im = ori_img[y1:y2, x1:x2]
-            im_crops.append(im)
-        if im_crops:
-            features = self.extractor(im_crops)
-        else:
-            features = np.array([])
-        return features
+        if isinstance(bbox_xywh, torch.Tensor):
+            bbox_xywh = bbox_xywh.cpu().numpy()
+        return self.extractor.extract(ori_img, self._xywh_to_xyxy_batch(bbox_xywh))
@@ -12,8 +12,9 @@ class Detection(object):
         Bounding box in format `(x, y, w, h)`.
     confidence : float
         Detector confidence score.
-    feature : array_like
-        A feature vector that describes the object contained in this image.
+    feature : Optional[array_like]
+        A feature vector that describes the object contained in this image,
+        None if it was not computed (lazy ReID).
 
     Attributes
     ----------
@@ -27,9 +28,9 @@ class Detection(object):
     """
 
     def __init__(self, tlwh, confidence, feature, oid):
-        self.tlwh = np.asarray(tlwh, dtype=np.float)
+        self.tlwh = np.asarray(tlwh, dtype=np.float64)
         self.confidence = float(confidence)
-        self.feature = np.asarray(feature, dtype=np.float32)
+        self.feature = None if feature is None else np.asarray(feature, dtype=np.float32)
         self.oid = oid
 
     def to_tlbr(self):
@@ -1,6 +1,7 @@
 # vim: expandtab:ts=4:sw=4
 from __future__ import absolute_import
 import numpy as np
+from asone.utils.iou import box_iou
 from . import linear_assignment
 
 
@@ -23,20 +24,10 @@ def iou(bbox, candidates):
         occluded by the candidate.
 
     """
-    bbox_tl, bbox_br = bbox[:2], bbox[:2] + bbox[2:]
-    candidates_tl = candidates[:, :2]
-    candidates_br = candidates[:, :2] + candidates[:, 2:]
-
-    tl = np.c_[np.maximum(bbox_tl[0], candidates_tl[:, 0])[:, np.newaxis],
-               np.maximum(bbox_tl[1], candidates_tl[:, 1])[:, np.newaxis]]
-    br = np.c_[np.minimum(bbox_br[0], candidates_br[:, 0])[:, np.newaxis],
-               np.minimum(bbox_br[1], candidates_br[:, 1])[:, np.newaxis]]
-    wh = np.maximum(0., br - tl)
-
-    area_intersection = wh.prod(axis=1)
-    area_bbox = bbox[2:].prod()
-    area_candidates = candidates[:, 2:].prod(axis=1)
-    return area_intersection / (area_bbox + area_candidates - area_intersection)
+    bbox = np.r_[bbox[:2], bbox[:2] + bbox[2:]]
+    candidates = np.asarray(candidates).reshape(-1, 4)
+    candidates = np.c_[candidates[:, :2], candidates[:, :2] + candidates[:, 2:]]
+    return box_iou(bbox, candidates)[0]
 
 
 def iou_cost(tracks, detections, track_indices=None,
@@ -69,14 +60,15 @@ def iou_cost(tracks, detections, track_indices=None,
     if detection_indices is None:
         detection_indices = np.arange(len(detections))
 
-    cost_matrix = np.zeros((len(track_indices), len(detection_indices)))
-    for row, track_idx in enumerate(track_indices):
-        if tracks[track_idx].time_since_update > 1:
-            cost_matrix[row, :] = linear_assignment.INFTY_COST
-            continue
+    cost_matrix = np.full(
+        (len(track_indices), len(detection_indices)),
+        linear_assignment.INFTY_COST)
+    rows = [row for row, track_idx in enumerate(track_indices)
+            if tracks[track_idx].time_since_update <= 1]
+    if len(rows) == 0 or len(detection_indices) == 0:
+        return cost_matrix
 
-        bbox = tracks[track_idx].to_tlwh()
-        candidates = np.asarray(
-            [detections[i].tlwh for i in detection_indices])
-        cost_matrix[row, :] = 1. - iou(bbox, candidates)
+    bboxes = np.asarray([tracks[track_indices[row]].to_tlbr() for row in rows])
+    candidates = np.asarray([detections[i].to_tlbr() for i in detection_indices])
+    cost_matrix[rows] = 1. - box_iou(bboxes, candidates)
     return cost_matrix
@@ -227,3 +227,194 @@ class KalmanFilter(object):
             overwrite_b=True)
         squared_maha = np.sum(z * z, axis=0)
         return squared_maha
+
+    def multi_predict(self, mean, covariance):
+        """Run Kalman filter prediction step for several tracks at once.
+
+        Parameters
+        ----------
+        mean : ndarray
+            The Nx8 dimensional mean matrix of the object states at the
+            previous time step.
+        covariance : ndarray
+            The Nx8x8 dimensional covariance matrices of the object states at
+            the previous time step.
+
+        Returns
+        -------
+        (ndarray, ndarray)
+            Returns the mean matrix and covariance matrices of the predicted
+            states.
+
+        """
+        std_pos = self._std_weight_position * mean[:, 3]
+        std_vel = self._std_weight_velocity * mean[:, 3]
+        std = np.stack([
+            std_pos, std_pos, np.full_like(std_pos, 1e-2), std_pos,
+            std_vel, std_vel, np.full_like(std_vel, 1e-5), std_vel], axis=1)
+        motion_cov = np.zeros_like(covariance)
+        motion_cov[:, np.arange(8), np.arange(8)] = np.square(std)
+
+        mean = np.dot(mean, self._motion_mat.T)
+        covariance = np.matmul(np.matmul(
+            self._motion_mat, covariance), self._motion_mat.T) + motion_cov
+
+        return mean, covariance
+
+    def multi_project(self, mean, covariance):
+        """Project several state distributions to measurement space.
+
+        Parameters
+        ----------
+        mean : ndarray
+            The Nx8 dimensional mean matrix.
+        covariance : ndarray
+            The Nx8x8 dimensional covariance matrices.
+
+        Returns
+        -------
+        (ndarray, ndarray)
+            Returns the Nx4 projected means and Nx4x4 covariance matrices.
+
+        """
+        std_pos = self._std_weight_position * mean[:, 3]
+        std = np.stack(
+            [std_pos, std_pos, np.full_like(std_pos, 1e-1), std_pos], axis=1)
+
+        mean = np.dot(mean, self._update_mat.T)
+        covariance = np.matmul(np.matmul(
+            self._update_mat, covariance), self._update_mat.T)
+        covariance[:, np.arange(4), np.arange(4)] += np.square(std)
+        return mean, covariance
+
+    def multi_update(self, mean, covariance, measurements):
+        """Run Kalman filter correction step for several tracks at once.
+
+        Parameters
+        ----------
+        mean : ndarray
+            The Nx8 dimensional predicted means.
+        covariance : ndarray
+            The Nx8x8 dimensional covariance matrices.
+        measurements : ndarray
+            The Nx4 dimensional measurements (x, y, a, h), row i is the
+            measurement of track i.
+
+        Returns
+        -------
+        (ndarray, ndarray)
+            Returns the measurement-corrected state distributions.
+
+        """
+        projected_mean, projected_cov = self.multi_project(mean, covariance)
+
+        # K = P H^T S^-1, solved through the Cholesky factor of S
+        chol_factor = np.linalg.cholesky(projected_cov)
+        cov_ht = np.matmul(covariance, self._update_mat.T)
+        kalman_gain = np.swapaxes(_cho_solve(
+            chol_factor, np.swapaxes(cov_ht, 1, 2)), 1, 2)
+        innovation = measurements - projected_mean
+
+        new_mean = mean + np.einsum('nij,nj->ni', kalman_gain, innovation)
+        new_covariance = covariance - np.matmul(np.matmul(
+            kalman_gain, projected_cov), np.swapaxes(kalman_gain, 1, 2))
+        return new_mean, new_covariance
+
+    def gating_factors(self, mean, covariance):
+        """Project several state distributions to measurement space and
+        factorize the projected covariances for `factored_gating_distance`.
+
+        Parameters
+        ----------
+        mean : ndarray
+            The Nx8 dimensional means.
+        covariance : ndarray
+            The Nx8x8 dimensional covariance matrices.
+
+        Returns
+        -------
+        (ndarray, ndarray)
+            Returns the Nx4 projected means and the Nx4x4 lower Cholesky
+            factors of the projected covariances.
+
+        """
+        mean, covariance = self.multi_project(mean, covariance)
+        return mean, np.linalg.cholesky(covariance)
+
+    def factored_gating_distance(self, projected_mean, cholesky_factor,
+                                 measurements, only_position=False):
+        """Compute gating distances from the output of `gating_factors`.
+
+        Parameters
+        ----------
+        projected_mean : ndarray
+            The Nx4 dimensional projected means.
+        cholesky_factor : ndarray
+            The Nx4x4 lower Cholesky factors of the projected covariances.
+        measurements : ndarray
+            An Mx4 dimensional matrix of M measurements (x, y, a, h).
+        only_position : Optional[bool]
+            If True, distance computation is done with respect to the bounding
+            box center position only. The leading 2x2 block of a Cholesky
+            factor is the factor of the position covariance, so the same
+            factors serve both cases.
+
+        Returns
+        -------
+        ndarray
+            Returns an NxM matrix, element (i, j) is the squared Mahalanobis
+            distance between track i and `measurements[j]`.
+
+        """
+        if only_position:
+            projected_mean = projected_mean[:, :2]
+            cholesky_factor = cholesky_factor[:, :2, :2]
+            measurements = measurements[:, :2]
+
+        # Forward substitution L z = d, unrolled over the (at most 4)
+        # measurement dimensions and vectorized over all track/measurement
+        # pairs.
+        squared_maha = np.zeros((len(projected_mean), len(measurements)))
+        z = []
+        for i in range(measurements.shape[1]):
+            z_i = measurements[None, :, i] - projected_mean[:, i, None]
+            for j in range(i):
+                z_i -= cholesky_factor[:, i, j, None] * z[j]
+            z_i /= cholesky_factor[:, i, i, None]
+            squared_maha += z_i * z_i
+            z.append(z_i)
+        return squared_maha
+
+    def multi_gating_distance(self, mean, covariance, measurements,
+                              only_position=False):
+        """Compute gating distances between several state distributions and
+        measurements.
+
+        Parameters
+        ----------
+        mean : ndarray
+            The Nx8 dimensional means.
+        covariance : ndarray
+            The Nx8x8 dimensional covariance matrices.
+        measurements : ndarray
+            An Mx4 dimensional matrix of M measurements (x, y, a, h).
+        only_position : Optional[bool]
+            If True, distance computation is done with respect to the bounding
+            box center position only.
+
+        Returns
+        -------
+        ndarray
+            Returns an NxM matrix, element (i, j) is the squared Mahalanobis
+            distance between track i and `measurements[j]`.
+
+        """
+        projected_mean, cholesky_factor = self.gating_factors(mean, covariance)
+        return self.factored_gating_distance(
+            projected_mean, cholesky_factor, measurements, only_position)
+
+
+def _cho_solve(chol_factor, b):
+    """Solve A x = b for stacked A = L L^T given the lower factors L."""
+    y = np.linalg.solve(chol_factor, b)
+    return np.linalg.solve(np.swapaxes(chol_factor, 1, 2), y)
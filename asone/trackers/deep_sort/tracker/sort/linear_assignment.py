@@ -1,8 +1,7 @@
 # vim: expandtab:ts=4:sw=4
 from __future__ import absolute_import
 import numpy as np
-# from sklearn.utils.linear_assignment_ import linear_assignment
-from scipy.optimize import linear_sum_assignment as linear_assignment
+from asone.utils.assignment import solve_assignment
 from . import kalman_filter
 
 
@@ -11,7 +10,7 @@ INFTY_COST = 1e+5
 
 def min_cost_matching(
         distance_metric, max_distance, tracks, detections, track_indices=None,
-        detection_indices=None):
+        detection_indices=None, solver='scipy'):
     """Solve linear assignment problem.
 
     Parameters
@@ -35,6 +34,9 @@ def min_cost_matching(
     detection_indices : List[int]
         List of detection indices that maps columns in `cost_matrix` to
         detections in `detections` (see description above).
+    solver : Optional[str]
+        The assignment solver, one of `asone.utils.assignment.ASSIGNMENT_SOLVERS`
+        ('scipy', 'lapjv' or 'greedy'). Defaults to 'scipy'.
 
     Returns
     -------
@@ -55,31 +57,21 @@ def min_cost_matching(
 
     cost_matrix = distance_metric(
         tracks, detections, track_indices, detection_indices)
-    cost_matrix[cost_matrix > max_distance] = max_distance + 1e-5
-
-    row_indices, col_indices = linear_assignment(cost_matrix)
-
-    matches, unmatched_tracks, unmatched_detections = [], [], []
-    for col, detection_idx in enumerate(detection_indices):
-        if col not in col_indices:
-            unmatched_detections.append(detection_idx)
-    for row, track_idx in enumerate(track_indices):
-        if row not in row_indices:
-            unmatched_tracks.append(track_idx)
-    for row, col in zip(row_indices, col_indices):
-        track_idx = track_indices[row]
-        detection_idx = detection_indices[col]
-        if cost_matrix[row, col] > max_distance:
-            unmatched_tracks.append(track_idx)
-            unmatched_detections.append(detection_idx)
-        else:
-            matches.append((track_idx, detection_idx))
+    pairs, unmatched_rows, unmatched_cols = solve_assignment(
+        cost_matrix, max_distance, solver=solver)
+
+    track_indices = np.asarray(track_indices)
+    detection_indices = np.asarray(detection_indices)
+    matches = list(zip(track_indices[pairs[:, 0]].tolist(),
+                       detection_indices[pairs[:, 1]].tolist()))
+    unmatched_tracks = track_indices[unmatched_rows].tolist()
+    unmatched_detections = detection_indices[unmatched_cols].tolist()
     return matches, unmatched_tracks, unmatched_detections
 
 
 def matching_cascade(
         distance_metric, max_distance, cascade_depth, tracks, detections,
-        track_indices=None, detection_indices=None):
+        track_indices=None, detection_indices=None, solver='scipy'):
     """Run matching cascade.
 
     Parameters
@@ -106,6 +98,8 @@ def matching_cascade(
         List of detection indices that maps columns in `cost_matrix` to
         detections in `detections` (see description above). Defaults to all
         detections.
+    solver : Optional[str]
+        The assignment solver passed to `min_cost_matching`.
 
     Returns
     -------
@@ -137,7 +131,7 @@ def matching_cascade(
         matches_l, _, unmatched_detections = \
             min_cost_matching(
                 distance_metric, max_distance, tracks, detections,
-                track_indices_l, unmatched_detections)
+                track_indices_l, unmatched_detections, solver=solver)
         matches += matches_l
     unmatched_tracks = list(set(track_indices) - set(k for k, _ in matches))
     return matches, unmatched_tracks, unmatched_detections
@@ -145,7 +139,7 @@ def matching_cascade(
 
 def gate_cost_matrix(
         kf, cost_matrix, tracks, detections, track_indices, detection_indices,
-        gated_cost=INFTY_COST, only_position=False):
+        gated_cost=INFTY_COST, only_position=False, measurements=None):
     """Invalidate infeasible entries in cost matrix based on the state
     distributions obtained by Kalman filtering.
 
@@ -173,6 +167,10 @@ def gate_cost_matrix(
     only_position : Optional[bool]
         If True, only the x, y position of the state distribution is considered
         during gating. Defaults to False.
+    measurements : Optional[ndarray]
+        The Kx4 dimensional `(x, y, a, h)` measurements of all `detections`,
+        so the array is built once per frame rather than once per call.
+        Computed from `detections` if None.
 
     Returns
     -------
@@ -182,8 +180,21 @@ def gate_cost_matrix(
     """
     gating_dim = 2 if only_position else 4
     gating_threshold = kalman_filter.chi2inv95[gating_dim]
-    measurements = np.asarray(
-        [detections[i].to_xyah() for i in detection_indices])
+    if measurements is None:
+        measurements = np.asarray(
+            [detections[i].to_xyah() for i in detection_indices])
+    else:
+        measurements = measurements[detection_indices]
+
+    store = tracks[track_indices[0]].store
+    if all(tracks[i].store is store for i in track_indices):
+        # One batched pass over the cached Cholesky factors of the tracks.
+        slots = np.array([tracks[i].slot for i in track_indices])
+        gating_distance = kf.factored_gating_distance(
+            *store.gating_factors(kf, slots), measurements, only_position)
+        cost_matrix[gating_distance > gating_threshold] = gated_cost
+        return cost_matrix
+
     for row, track_idx in enumerate(track_indices):
         track = tracks[track_idx]
         gating_distance = kf.gating_distance(
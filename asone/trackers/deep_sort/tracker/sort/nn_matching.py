@@ -54,53 +54,15 @@ def _cosine_distance(a, b, data_is_normalized=False):
     return 1. - np.dot(a, b.T)
 
 
-def _nn_euclidean_distance(x, y):
-    """ Helper function for nearest neighbor distance metric (Euclidean).
-
-    Parameters
-    ----------
-    x : ndarray
-        A matrix of N row-vectors (sample points).
-    y : ndarray
-        A matrix of M row-vectors (query points).
-
-    Returns
-    -------
-    ndarray
-        A vector of length M that contains for each entry in `y` the
-        smallest Euclidean distance to a sample in `x`.
-
-    """
-    distances = _pdist(x, y)
-    return np.maximum(0.0, distances.min(axis=0))
-
-
-def _nn_cosine_distance(x, y):
-    """ Helper function for nearest neighbor distance metric (cosine).
-
-    Parameters
-    ----------
-    x : ndarray
-        A matrix of N row-vectors (sample points).
-    y : ndarray
-        A matrix of M row-vectors (query points).
-
-    Returns
-    -------
-    ndarray
-        A vector of length M that contains for each entry in `y` the
-        smallest cosine distance to a sample in `x`.
-
-    """
-    distances = _cosine_distance(x, y)
-    return distances.min(axis=0)
-
-
 class NearestNeighborDistanceMetric(object):
     """
     A nearest neighbor distance metric that, for each target, returns
     the closest distance to any sample that has been observed so far.
 
+    Samples live in a ring buffer gallery: one row of `budget` slots per
+    target plus a validity mask, so the cost matrix of all targets is one
+    matrix product followed by a min over each target's slots.
+
     Parameters
     ----------
     metric : str
@@ -111,27 +73,83 @@ class NearestNeighborDistanceMetric(object):
     budget : Optional[int]
         If not None, fix samples per class to at most this number. Removes
         the oldest samples when the budget is reached.
+    dtype : Optional[dtype]
+        Storage type of the gallery, np.float16 halves its memory. Distances
+        are always computed in float32.
 
     Attributes
     ----------
-    samples : Dict[int -> List[ndarray]]
-        A dictionary that maps from target identities to the list of samples
-        that have been observed so far.
+    samples : Dict[int -> ndarray]
+        A dictionary that maps from target identities to the samples that
+        have been observed so far, oldest first.
 
     """
 
-    def __init__(self, metric, matching_threshold, budget=None):
+    def __init__(self, metric, matching_threshold, budget=None,
+                 dtype=np.float32):
 
-        if metric == "euclidean":
-            self._metric = _nn_euclidean_distance
-        elif metric == "cosine":
-            self._metric = _nn_cosine_distance
-        else:
+        if metric not in ("euclidean", "cosine"):
             raise ValueError(
                 "Invalid metric; must be either 'euclidean' or 'cosine'")
+        self.metric = metric
         self.matching_threshold = matching_threshold
         self.budget = budget
-        self.samples = {}
+        self.dtype = dtype
+
+        self._gallery = None  # rows x slots x feature dim
+        self._valid = None  # rows x slots
+        self._head = None  # next slot to write, per row
+        self._rows = {}  # target -> row
+        self._free_rows = []
+
+    @property
+    def samples(self):
+        samples = {}
+        for target, row in self._rows.items():
+            order = np.arange(self._valid.shape[1])
+            if self.budget is not None:
+                order = np.roll(order, -self._head[row])
+            order = order[self._valid[row, order]]
+            samples[target] = self._gallery[row, order].astype(np.float32)
+        return samples
+
+    def _allocate(self, num_rows, num_slots, dim):
+        gallery = np.zeros((num_rows, num_slots, dim), dtype=self.dtype)
+        valid = np.zeros((num_rows, num_slots), dtype=bool)
+        head = np.zeros(num_rows, dtype=np.int64)
+        if self._gallery is not None:
+            rows, slots = self._valid.shape
+            gallery[:rows, :slots] = self._gallery
+            valid[:rows, :slots] = self._valid
+            head[:rows] = self._head
+            self._free_rows += list(range(rows, num_rows))
+        else:
+            self._free_rows = list(range(num_rows))
+        self._gallery, self._valid, self._head = gallery, valid, head
+
+    def _row(self, target, dim):
+        row = self._rows.get(target)
+        if row is not None:
+            return row
+        if self._gallery is None:
+            self._allocate(32, self.budget or 16, dim)
+        elif not self._free_rows:
+            self._allocate(2 * self._valid.shape[0], self._valid.shape[1], dim)
+        row = self._free_rows.pop()
+        self._rows[target] = row
+        return row
+
+    def _insert(self, rows, features):
+        slots = self._head[rows]
+        if self.budget is None and (slots == self._valid.shape[1]).any():
+            # unbounded gallery, grow instead of overwriting
+            self._allocate(self._valid.shape[0], 2 * self._valid.shape[1],
+                           features.shape[1])
+        self._gallery[rows, slots] = features
+        self._valid[rows, slots] = True
+        self._head[rows] = slots + 1
+        if self.budget is not None:
+            self._head[rows] %= self.budget
 
     def partial_fit(self, features, targets, active_targets):
         """Update the distance metric with new data.
@@ -146,11 +164,27 @@ class NearestNeighborDistanceMetric(object):
             A list of targets that are currently present in the scene.
 
         """
-        for feature, target in zip(features, targets):
-            self.samples.setdefault(target, []).append(feature)
-            if self.budget is not None:
-                self.samples[target] = self.samples[target][-self.budget:]
-        self.samples = {k: self.samples[k] for k in active_targets}
+        features = np.asarray(features, dtype=np.float32)
+        if len(features) and self.metric == "cosine":
+            # normalize once on insertion instead of on every distance call
+            features = features / np.linalg.norm(features, axis=1, keepdims=True)
+
+        rows = np.array([self._row(target, features.shape[1]) for target in targets],
+                        dtype=np.int64)
+        # one vectorized write per round, a target with several new samples
+        # gets them over several rounds in their original order
+        pending = np.arange(len(rows))
+        while len(pending):
+            _, first = np.unique(rows[pending], return_index=True)
+            self._insert(rows[pending[first]], features[pending[first]])
+            pending = np.delete(pending, first)
+
+        active_targets = set(active_targets)
+        for target in [t for t in self._rows if t not in active_targets]:
+            row = self._rows.pop(target)
+            self._valid[row] = False
+            self._head[row] = 0
+            self._free_rows.append(row)
 
     def distance(self, features, targets):
         """Compute distance between features and targets.
@@ -170,7 +204,30 @@ class NearestNeighborDistanceMetric(object):
             `targets[i]` and `features[j]`.
 
         """
-        cost_matrix = np.zeros((len(targets), len(features)))
-        for i, target in enumerate(targets):
-            cost_matrix[i, :] = self._metric(self.samples[target], features)
+        if len(targets) == 0 or len(features) == 0:
+            return np.zeros((len(targets), len(features)))
+
+        rows = np.array([self._rows[target] for target in targets])
+        # gather the valid samples of all targets, target by target
+        valid = self._valid[rows]
+        target_idx, slot_idx = np.nonzero(valid)
+        samples = self._gallery[rows[target_idx], slot_idx].astype(np.float32, copy=False)
+        features = np.asarray(features, dtype=np.float32)
+
+        if self.metric == "cosine":
+            features = features / np.linalg.norm(features, axis=1, keepdims=True)
+            distances = _cosine_distance(samples, features, data_is_normalized=True)
+        else:
+            distances = _pdist(samples, features)
+
+        # segmented min over the samples of every target
+        counts = valid.sum(axis=1)
+        starts = np.cumsum(counts) - counts
+        cost_matrix = np.full((len(targets), len(features)), np.inf, dtype=np.float32)
+        has_samples = counts > 0
+        if has_samples.any():
+            cost_matrix[has_samples] = np.minimum.reduceat(
+                distances, starts[has_samples], axis=0)
+        if self.metric == "euclidean":
+            cost_matrix = np.maximum(0.0, cost_matrix)
         return cost_matrix
@@ -1,4 +1,5 @@
 # vim: expandtab:ts=4:sw=4
+import numpy as np
 
 
 class TrackState:
@@ -16,6 +17,101 @@ class TrackState:
     Deleted = 3
 
 
+class TrackStore:
+    """
+    Struct-of-arrays storage of the Kalman filter states of all tracks, so
+    that the filter can run over every track with one batched operation.
+
+    Each track owns one slot (row) of `mean` and `covariance`. Slots of
+    deleted tracks are recycled, the arrays double in size when full.
+
+    Parameters
+    ----------
+    capacity : int
+        Number of slots allocated up front.
+
+    Attributes
+    ----------
+    mean : ndarray
+        The Cx8 dimensional state means, one row per slot.
+    covariance : ndarray
+        The Cx8x8 dimensional state covariances, one matrix per slot.
+    projected_mean : ndarray
+        The Cx4 dimensional cached projections of `mean` to measurement space.
+    cholesky_factor : ndarray
+        The Cx4x4 dimensional cached Cholesky factors of the projected
+        covariances, used for gating.
+    factor_valid : ndarray
+        True for slots whose cached gating factors match their state.
+
+    """
+
+    def __init__(self, capacity=32):
+        capacity = max(int(capacity), 1)
+        self.mean = np.zeros((capacity, 8))
+        self.covariance = np.zeros((capacity, 8, 8))
+        self.projected_mean = np.zeros((capacity, 4))
+        self.cholesky_factor = np.zeros((capacity, 4, 4))
+        self.factor_valid = np.zeros(capacity, dtype=bool)
+        self._free = list(range(capacity - 1, -1, -1))
+
+    def add(self, mean, covariance):
+        """Store a state distribution and return its slot."""
+        if not self._free:
+            capacity = len(self.mean)
+            self.mean = np.concatenate([self.mean, np.zeros_like(self.mean)])
+            self.covariance = np.concatenate(
+                [self.covariance, np.zeros_like(self.covariance)])
+            self.projected_mean = np.concatenate(
+                [self.projected_mean, np.zeros_like(self.projected_mean)])
+            self.cholesky_factor = np.concatenate(
+                [self.cholesky_factor, np.zeros_like(self.cholesky_factor)])
+            self.factor_valid = np.concatenate(
+                [self.factor_valid, np.zeros_like(self.factor_valid)])
+            self._free = list(range(2 * capacity - 1, capacity - 1, -1))
+        slot = self._free.pop()
+        self.set(slot, mean, covariance)
+        return slot
+
+    def set(self, slots, mean, covariance):
+        """Write the state distributions of `slots`, which invalidates their
+        cached gating factors."""
+        self.mean[slots] = mean
+        self.covariance[slots] = covariance
+        self.factor_valid[slots] = False
+
+    def gating_factors(self, kf, slots):
+        """Return the projected means and Cholesky factors of `slots`.
+
+        Factors are computed in one batch for the slots whose state changed
+        since they were last factorized (after the predict step), and reused
+        by every later gating call until the next state change.
+
+        Parameters
+        ----------
+        kf : kalman_filter.KalmanFilter
+            The Kalman filter.
+        slots : ndarray
+            The slots to return the factors of.
+
+        Returns
+        -------
+        (ndarray, ndarray)
+            Returns the Nx4 projected means and Nx4x4 Cholesky factors.
+
+        """
+        stale = slots[~self.factor_valid[slots]]
+        if len(stale):
+            self.projected_mean[stale], self.cholesky_factor[stale] = \
+                kf.gating_factors(self.mean[stale], self.covariance[stale])
+            self.factor_valid[stale] = True
+        return self.projected_mean[slots], self.cholesky_factor[slots]
+
+    def release(self, slot):
+        """Return the slot of a deleted track to the free list."""
+        self._free.append(slot)
+
+
 class Track:
     """
     A single target track with state space `(x, y, a, h)` and associated
@@ -40,13 +136,19 @@ class Track:
     feature : Optional[ndarray]
         Feature vector of the detection this track originates from. If not None,
         this feature is added to the `features` cache.
+    store : Optional[TrackStore]
+        Storage of the state distribution, shared by the tracks of a tracker.
+        A private store is created if None.
 
     Attributes
     ----------
     mean : ndarray
-        Mean vector of the initial state distribution.
+        Mean vector of the current state distribution, a view into the store.
     covariance : ndarray
-        Covariance matrix of the initial state distribution.
+        Covariance matrix of the current state distribution, a view into the
+        store.
+    slot : int
+        Row of this track in the store.
     track_id : int
         A unique track identifier.
     hits : int
@@ -60,18 +162,22 @@ class Track:
     features : List[ndarray]
         A cache of features. On each measurement update, the associated feature
         vector is added to this list.
+    time_since_feature : int
+        Number of measurement updates since the last one that came with a
+        feature (see `Tracker.pre_associate`).
 
     """
 
     def __init__(self, mean, covariance, track_id, n_init, max_age, oid,
-                 feature=None):
-        self.mean = mean
-        self.covariance = covariance
+                 feature=None, store=None):
+        self._store = store if store is not None else TrackStore(1)
+        self.slot = self._store.add(mean, covariance)
         self.track_id = track_id
         self.oid = oid
         self.hits = 1
         self.age = 1
         self.time_since_update = 0
+        self.time_since_feature = 0
 
         self.state = TrackState.Tentative
         self.features = []
@@ -81,6 +187,28 @@ class Track:
         self._n_init = n_init
         self._max_age = max_age
 
+    @property
+    def mean(self):
+        return self._store.mean[self.slot]
+
+    @mean.setter
+    def mean(self, value):
+        self._store.mean[self.slot] = value
+        self._store.factor_valid[self.slot] = False
+
+    @property
+    def covariance(self):
+        return self._store.covariance[self.slot]
+
+    @covariance.setter
+    def covariance(self, value):
+        self._store.covariance[self.slot] = value
+        self._store.factor_valid[self.slot] = False
+
+    @property
+    def store(self):
+        return self._store
+
     def to_tlwh(self):
         """Get current position in bounding box format `(top left x, top left y,
         width, height)`.
@@ -127,6 +255,20 @@ class Track:
         self.mean, self.covariance = kf.predict(self.mean, self.covariance)
         self.increment_age()
 
+    def coast(self, kf):
+        """Propagate the state distribution to the current time step on a
+        frame where no detections were computed. Unlike `predict`, the step is
+        not counted towards `time_since_update`.
+
+        Parameters
+        ----------
+        kf : kalman_filter.KalmanFilter
+            The Kalman filter.
+
+        """
+        self.mean, self.covariance = kf.predict(self.mean, self.covariance)
+        self.age += 1
+
     def update(self, kf, detection):
         """Perform Kalman filter measurement update step and update the feature
         cache.
@@ -141,7 +283,24 @@ class Track:
         """
         self.mean, self.covariance = kf.update(
             self.mean, self.covariance, detection.to_xyah())
-        self.features.append(detection.feature)
+        self.mark_hit(detection)
+
+    def mark_hit(self, detection):
+        """Record a measurement update whose Kalman correction step was
+        already applied to the state (see `Tracker.update`).
+
+        Parameters
+        ----------
+        detection : Detection
+            The associated detection. Its feature may be None if it was
+            associated without appearance information.
+
+        """
+        if detection.feature is not None:
+            self.features.append(detection.feature)
+            self.time_since_feature = 0
+        else:
+            self.time_since_feature += 1
 
         self.hits += 1
         self.time_since_update = 0
@@ -1,10 +1,11 @@
 # vim: expandtab:ts=4:sw=4
 from __future__ import absolute_import
 import numpy as np
+from asone.utils.iou import box_iou
 from . import kalman_filter
 from . import linear_assignment
 from . import iou_matching
-from .track import Track
+from .track import Track, TrackStore
 
 
 class Tracker:
@@ -21,6 +22,9 @@ class Tracker:
         Number of consecutive detections before the track is confirmed. The
         track state is set to `Deleted` if a miss occurs within the first
         `n_init` frames.
+    assignment : str
+        The assignment solver used by the matching ('scipy', 'lapjv' or
+        'greedy').
 
     Attributes
     ----------
@@ -34,52 +38,146 @@ class Tracker:
         A Kalman filter to filter target trajectories in image space.
     tracks : List[Track]
         The list of active tracks at the current time step.
+    store : TrackStore
+        The state distributions of `tracks`.
 
     """
 
-    def __init__(self, metric, max_iou_distance=0.7, max_age=70, n_init=3):
+    def __init__(self, metric, max_iou_distance=0.7, max_age=70, n_init=3,
+                 assignment='scipy'):
         self.metric = metric
         self.max_iou_distance = max_iou_distance
         self.max_age = max_age
         self.n_init = n_init
+        self.assignment = assignment
 
         self.kf = kalman_filter.KalmanFilter()
         self.tracks = []
+        self.store = TrackStore()
         self._next_id = 1
 
+    def _multi_predict(self):
+        if not self.tracks:
+            return
+        slots = np.array([t.slot for t in self.tracks])
+        store = self.store
+        store.set(slots, *self.kf.multi_predict(
+            store.mean[slots], store.covariance[slots]))
+
     def predict(self):
         """Propagate track state distributions one time step forward.
 
         This function should be called once every time step, before `update`.
         """
+        self._multi_predict()
+        for track in self.tracks:
+            track.increment_age()
+
+    def coast(self):
+        """Propagate track state distributions one time step forward on a
+        frame that was not passed through the detector.
+
+        Tracks are not marked as missed, so skipped frames do not count
+        towards `max_age`.
+        """
+        self._multi_predict()
         for track in self.tracks:
-            track.predict(self.kf)
+            track.age += 1
 
     def increment_ages(self):
         for track in self.tracks:
             track.increment_age()
             track.mark_missed()
 
-    def update(self, detections):
+    def pre_associate(self, boxes_tlbr, min_iou=0.6, max_competitor_iou=0.1,
+                      refresh_every=10):
+        """Find the detections whose track is unambiguous from IoU alone, so
+        their appearance features do not need to be computed.
+
+        A confirmed track that was updated on the previous frame is paired with
+        a detection if their IoU is at least `min_iou` and neither of them
+        overlaps any other track or detection by more than
+        `max_competitor_iou`. Tracks that went `refresh_every` updates without
+        a feature are not paired, so their galleries stay current.
+
+        This function should be called after `predict`.
+
+        Parameters
+        ----------
+        boxes_tlbr : ndarray
+            The Nx4 dimensional `(min x, min y, max x, max y)` boxes of the
+            detections at the current time step.
+        min_iou : float
+            Minimum IoU between a track and its detection.
+        max_competitor_iou : float
+            Maximum IoU of either side with any other track or detection.
+        refresh_every : int
+            Number of feature-less updates after which a track is always
+            matched on appearance again.
+
+        Returns
+        -------
+        List[(int, int)]
+            A list of (track index, detection index) pairs, to be passed to
+            `update`.
+
+        """
+        if not self.tracks or len(boxes_tlbr) == 0:
+            return []
+        tracks_tlbr = np.array([t.to_tlbr() for t in self.tracks])
+        ious = box_iou(tracks_tlbr, boxes_tlbr)
+        overlaps = ious > max_competitor_iou
+        eligible = np.array([
+            t.is_confirmed() and t.time_since_update == 1 and
+            t.time_since_feature < refresh_every for t in self.tracks])
+        # tracks and detections overlapping another one of their own kind,
+        # e.g. a second detection on the paired one that no track covers
+        contested_tracks = _overlaps_another(tracks_tlbr, max_competitor_iou)
+        contested_detections = _overlaps_another(boxes_tlbr, max_competitor_iou)
+
+        unambiguous = (ious >= min_iou) & eligible[:, None] & \
+            (overlaps.sum(axis=1) == 1)[:, None] & \
+            (overlaps.sum(axis=0) == 1)[None, :] & \
+            ~contested_tracks[:, None] & ~contested_detections[None, :]
+        track_indices, detection_indices = np.nonzero(unambiguous)
+        return list(zip(track_indices.tolist(), detection_indices.tolist()))
+
+    def update(self, detections, pre_matches=()):
         """Perform measurement update and track management.
 
         Parameters
         ----------
         detections : List[deep_sort.detection.Detection]
             A list of detections at the current time step.
+        pre_matches : List[(int, int)]
+            (track index, detection index) pairs already associated by
+            `pre_associate`, they skip the matching cascade. These detections
+            may come without a feature.
 
         """
+        measurements = np.array(
+            [d.to_xyah() for d in detections]).reshape(-1, 4)
+
         # Run matching cascade.
         matches, unmatched_tracks, unmatched_detections = \
-            self._match(detections)
+            self._match(detections, measurements, pre_matches)
 
         # Update track set.
+        if matches:
+            slots = np.array([self.tracks[i].slot for i, _ in matches])
+            store = self.store
+            store.set(slots, *self.kf.multi_update(
+                store.mean[slots], store.covariance[slots],
+                measurements[[j for _, j in matches]]))
         for track_idx, detection_idx in matches:
-            self.tracks[track_idx].update(self.kf, detections[detection_idx])
+            self.tracks[track_idx].mark_hit(detections[detection_idx])
         for track_idx in unmatched_tracks:
             self.tracks[track_idx].mark_missed()
         for detection_idx in unmatched_detections:
             self._initiate_track(detections[detection_idx])
+        for track in self.tracks:
+            if track.is_deleted():
+                self.store.release(track.slot)
         self.tracks = [t for t in self.tracks if not t.is_deleted()]
         # print("LEN self.tracks", len(self.tracks))
         # for t in self.tracks:
@@ -100,7 +198,7 @@ class Tracker:
         self.metric.partial_fit(
             np.asarray(features), np.asarray(targets), active_targets)
 
-    def _match(self, detections):
+    def _match(self, detections, measurements=None, pre_matches=()):
 
         def gated_metric(tracks, dets, track_indices, detection_indices):
             features = np.array([dets[i].feature for i in detection_indices])
@@ -108,18 +206,26 @@ class Tracker:
             cost_matrix = self.metric.distance(features, targets)
             cost_matrix = linear_assignment.gate_cost_matrix(
                 self.kf, cost_matrix, tracks, dets, track_indices,
-                detection_indices)
+                detection_indices, measurements=measurements)
 
             return cost_matrix
 
+        # Pairs resolved by `pre_associate` skip the matching.
+        pre_matched_tracks = set(i for i, _ in pre_matches)
+        pre_matched_detections = set(j for _, j in pre_matches)
+        detection_indices = [
+            j for j in range(len(detections)) if j not in pre_matched_detections]
+
         # Split track set into confirmed and unconfirmed tracks.
         confirmed_tracks = [
-            i for i, t in enumerate(self.tracks) if t.is_confirmed()]
+            i for i, t in enumerate(self.tracks)
+            if t.is_confirmed() and i not in pre_matched_tracks]
         unconfirmed_tracks = [
-            i for i, t in enumerate(self.tracks) if not t.is_confirmed()]
+            i for i, t in enumerate(self.tracks)
+            if not t.is_confirmed() and i not in pre_matched_tracks]
 
         # Associate confirmed tracks using appearance features.
-        matches_a, unmatched_tracks_a, unmatched_detections = linear_assignment.matching_cascade(gated_metric, self.metric.matching_threshold, self.max_age, self.tracks, detections, confirmed_tracks)
+        matches_a, unmatched_tracks_a, unmatched_detections = linear_assignment.matching_cascade(gated_metric, self.metric.matching_threshold, self.max_age, self.tracks, detections, confirmed_tracks, detection_indices, solver=self.assignment)
 
         # Associate remaining tracks together with unconfirmed tracks using IOU.
         iou_track_candidates = unconfirmed_tracks + [
@@ -131,9 +237,10 @@ class Tracker:
         matches_b, unmatched_tracks_b, unmatched_detections = \
             linear_assignment.min_cost_matching(
                 iou_matching.iou_cost, self.max_iou_distance, self.tracks,
-                detections, iou_track_candidates, unmatched_detections)
+                detections, iou_track_candidates, unmatched_detections,
+                solver=self.assignment)
 
-        matches = matches_a + matches_b
+        matches = list(pre_matches) + matches_a + matches_b
         unmatched_tracks = list(set(unmatched_tracks_a + unmatched_tracks_b))
         return matches, unmatched_tracks, unmatched_detections
 
@@ -141,5 +248,12 @@ class Tracker:
         mean, covariance = self.kf.initiate(detection.to_xyah())
         self.tracks.append(Track(
             mean, covariance, self._next_id, self.n_init, self.max_age, detection.oid,
-            detection.feature))
+            detection.feature, self.store))
         self._next_id += 1
+
+
+def _overlaps_another(boxes_tlbr, max_iou):
+    """True for the boxes overlapping any other box by more than `max_iou`."""
+    ious = box_iou(boxes_tlbr, boxes_tlbr)
+    np.fill_diagonal(ious, 0)
+    return (ious > max_iou).any(axis=1)
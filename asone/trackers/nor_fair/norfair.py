@@ -10,6 +10,9 @@ class NorFair:
             distance_threshold=max_distance_between_points,
         )
         self.detector = detector
+        # frames predicted since the last detection, the hit counters of the
+        # tracks are credited for them on the next detection
+        self._predicted = 0
         try:
             self.input_shape = tuple(detector.model.get_inputs()[0].shape[2:])
         except AttributeError as e:
@@ -43,18 +46,33 @@ class NorFair:
 
         return bboxes_xyxy, ids,  scores, class_ids
 
+    def predict(self, image: np.ndarray) -> tuple:
+        """Return Kalman predicted tracks for a frame skipped by the detector."""
+        self._predicted += 1
+        tracked_objects = self.tracker.update(detections=None)
+        return self._format_objects(tracked_objects, predicted=True)
+
     def _tracker_update(self, dets_xyxy: list, image_info: dict):
+        # norfair takes the detector period to not age tracks on the
+        # frames that were only predicted
+        tracked_objects = self.tracker.update(detections=dets_xyxy,
+                                              period=self._predicted + 1)
+        self._predicted = 0
+        return self._format_objects(tracked_objects)
 
+    def _format_objects(self, tracked_objects: list, predicted: bool = False):
         bboxes_xyxy = []
         class_ids = []
         scores = []
         ids = []
 
-        tracked_objects = self.tracker.update(detections=dets_xyxy)
-
         for obj in tracked_objects:
             det = obj.last_detection.data
-            bboxes_xyxy.append(det[:4])
+            box = det[:4]
+            if predicted:
+                # box of the last detection moved to the estimated center
+                box = box + np.tile(obj.estimate[0] - obj.last_detection.points[0], 2)
+            bboxes_xyxy.append(box)
             class_ids.append(int(det[-1]))
             scores.append(int(det[-2]))
             ids.append(obj.id)
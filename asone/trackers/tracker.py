@@ -1,25 +1,32 @@
-from asone.trackers import ByteTrack
-from asone.trackers import NorFair
-from asone.trackers import DeepSort
+import importlib
+
+
+# tracker id -> import path, a tracker (and its dependencies) is only
+# imported once it is selected
+TRACKER_REGISTRY = {
+    '0': 'asone.trackers.byte_track.bytetracker.ByteTrack',
+    '1': 'asone.trackers.deep_sort.deepsort.DeepSort',
+    '2': 'asone.trackers.nor_fair.norfair.NorFair',
+}
 
 
 class Tracker:
-    def __init__(self, tracker: int, detector: object, use_cuda=True) -> None:
+    def __init__(self, tracker: int, detector: object, use_cuda=True, cfg: dict = None) -> None:
         
-        self.trackers = {
-            '0': ByteTrack,
-            '1': DeepSort,
-            '2': NorFair
-        }
+        self.trackers = TRACKER_REGISTRY
 
-        self.tracker = self._select_tracker(tracker, detector, use_cuda=use_cuda)
+        self.tracker = self._select_tracker(tracker, detector, use_cuda=use_cuda, cfg=cfg)
 
-    def _select_tracker(self, tracker, detector, use_cuda):
-        _tracker = self.trackers.get(str(tracker), None)
+    def _select_tracker(self, tracker, detector, use_cuda, cfg=None):
+        path = self.trackers.get(str(tracker), None)
 
-        if _tracker is not None:
-            if _tracker is DeepSort:
-                return _tracker(detector, use_cuda=use_cuda)
+        if path is not None:
+            module, name = path.rsplit('.', 1)
+            _tracker = getattr(importlib.import_module(module), name)
+            if name == 'DeepSort':
+                return _tracker(detector, use_cuda=use_cuda, cfg=cfg)
+            elif name == 'ByteTrack':
+                return _tracker(detector, cfg=cfg)
             else:
                 return _tracker(detector)
         else:
@@ -29,5 +36,9 @@ class Tracker:
         
         return self.tracker.detect_and_track(image, config)
 
+    def predict(self, image):
+        
+        return self.tracker.predict(image)
+
     def get_tracker(self):
         return self.tracker
\ No newline at end of file
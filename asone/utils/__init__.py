@@ -1,7 +1,27 @@
 from asone.utils.classes import get_names
-from asone.utils.download import download_weights
 from asone.utils.colors import compute_color_for_labels
 from asone.utils.counting import estimateSpeed, intersect
 from asone.utils.ponits_conversion import xyxy_to_tlwh, xyxy_to_xywh, tlwh_to_xyxy
 from asone.utils.temp_loader import get_detector, get_tracker
 from asone.utils.draw import draw_boxes
+from asone.utils.video_reader import VideoReader
+from asone.utils.motion_gate import MotionGate
+from asone.utils.iou import box_iou
+from asone.utils.assignment import solve_assignment
+from asone.utils.quantize import quantize_onnx
+
+# imported on first access, they are not needed by `import asone`
+_LAZY = {
+    'download_weights': 'asone.utils.download',
+    'VideoWriter': 'asone.utils.video_writer',
+    'TrackCache': 'asone.utils.track_cache',
+    'copy_frame': 'asone.utils.frame_copy',
+    'readonly': 'asone.utils.frame_copy',
+}
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        import importlib
+        return getattr(importlib.import_module(_LAZY[name]), name)
+    raise AttributeError(f"module 'asone.utils' has no attribute {name!r}")
@@ -0,0 +1,81 @@
+import numpy as np
+
+
+def _scipy(cost_matrix, max_cost):
+    from scipy.optimize import linear_sum_assignment
+
+    # gated entries are clipped so the Hungarian solver never prefers them
+    cost_matrix = np.minimum(cost_matrix, max_cost + 1e-5)
+    rows, cols = linear_sum_assignment(cost_matrix)
+    return rows, cols
+
+
+def _lapjv(cost_matrix, max_cost):
+    import lap
+
+    _, x, _ = lap.lapjv(np.asarray(cost_matrix, dtype=np.float64),
+                        extend_cost=True, cost_limit=max_cost)
+    rows = np.flatnonzero(x >= 0)
+    return rows, x[rows]
+
+
+def _greedy(cost_matrix, max_cost):
+    # cheapest feasible pairs first, a pair is taken if neither side is used
+    rows, cols = np.nonzero(cost_matrix <= max_cost)
+    order = np.argsort(cost_matrix[rows, cols], kind='stable')
+    used_rows = np.zeros(cost_matrix.shape[0], dtype=bool)
+    used_cols = np.zeros(cost_matrix.shape[1], dtype=bool)
+    matched_rows, matched_cols = [], []
+    for row, col in zip(rows[order].tolist(), cols[order].tolist()):
+        if used_rows[row] or used_cols[col]:
+            continue
+        used_rows[row] = used_cols[col] = True
+        matched_rows.append(row)
+        matched_cols.append(col)
+    return np.array(matched_rows, dtype=int), np.array(matched_cols, dtype=int)
+
+
+# solver name -> fn(cost_matrix, max_cost) -> (rows, cols)
+ASSIGNMENT_SOLVERS = {
+    'scipy': _scipy,
+    'lapjv': _lapjv,
+    'greedy': _greedy,
+}
+
+
+def solve_assignment(cost_matrix, max_cost, solver='scipy'):
+    """Match rows to columns of a cost matrix.
+
+    Args:
+        cost_matrix (np.ndarray): (N, M) association costs
+        max_cost (float): pairs costing more than this are never matched
+        solver (str): 'scipy' (Hungarian, optimal), 'lapjv' (Jonker-Volgenant,
+            optimal, what ByteTrack was tuned with) or 'greedy' (cheapest
+            pair first, fastest on large crowded frames)
+
+    Returns:
+        tuple: (K, 2) matched (row, col) pairs, unmatched rows, unmatched cols.
+            Unmatched indices list the ones the solver left unassigned first,
+            in order, then the assigned pairs rejected by `max_cost`.
+    """
+    if solver not in ASSIGNMENT_SOLVERS:
+        raise ValueError(f'Invalid assignment solver: {solver}, '
+                         f'valid solvers: {list(ASSIGNMENT_SOLVERS)}')
+    cost_matrix = np.asarray(cost_matrix)
+    num_rows, num_cols = cost_matrix.shape
+    if cost_matrix.size == 0:
+        return np.empty((0, 2), dtype=int), np.arange(num_rows), np.arange(num_cols)
+
+    rows, cols = ASSIGNMENT_SOLVERS[solver](cost_matrix, max_cost)
+    row_assigned = np.zeros(num_rows, dtype=bool)
+    col_assigned = np.zeros(num_cols, dtype=bool)
+    row_assigned[rows] = True
+    col_assigned[cols] = True
+
+    feasible = cost_matrix[rows, cols] <= max_cost
+    unmatched_rows = np.concatenate(
+        [np.flatnonzero(~row_assigned), rows[~feasible]])
+    unmatched_cols = np.concatenate(
+        [np.flatnonzero(~col_assigned), cols[~feasible]])
+    matches = np.stack([rows[feasible], cols[feasible]], axis=1).astype(int)
+    return matches, unmatched_rows.astype(int), unmatched_cols.astype(int)
@@ -7,10 +7,20 @@ config = {
     "draw_trails": False,
     "filter_classes": None,
     "class_names": None,
+    "prefetch_size": 4,
+    "drop_stale": False,
+    "detect_every": 1,
+    "motion_thres": None,
+    "cache_dir": None,
+    "debug_copies": False,
     "input_shape" : (640, 640),
     "conf_thres": 0.01,
     "iou_thres" : 0.25,
     "max_det" : 100,
     "agnostic_nms" : False,
-    "with_p6" : False
+    "with_p6" : False,
+    "rect" : False,
+    "tile_size" : None,
+    "tile_overlap" : 0.2,
+    "tile_full_frame" : True
 }
@@ -0,0 +1,95 @@
+import os
+from collections import defaultdict
+
+import numpy as np
+from loguru import logger
+
+
+class CopyCounter:
+    """Counts the bytes of the frame copies taken with `copy_frame`.
+
+    Disabled by default, enable it with `debug_copies=True` of the track
+    functions or the `ASONE_DEBUG_COPIES=1` environment variable. The counts
+    are kept per stage (e.g. 'display', 'writer') and per frame, `next_frame`
+    closes the current frame.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.reset()
+
+    def reset(self):
+        self.frames = 0
+        self.total_bytes = 0
+        self.max_frame_bytes = 0
+        self.stage_bytes = defaultdict(int)
+        self._frame_bytes = 0
+
+    def add(self, nbytes: int, stage: str = 'other'):
+        if not self.enabled:
+            return
+        self.total_bytes += nbytes
+        self.stage_bytes[stage] += nbytes
+        self._frame_bytes += nbytes
+
+    def next_frame(self):
+        if not self.enabled:
+            return
+        self.frames += 1
+        self.max_frame_bytes = max(self.max_frame_bytes, self._frame_bytes)
+        self._frame_bytes = 0
+
+    @property
+    def bytes_per_frame(self) -> float:
+        return self.total_bytes / self.frames if self.frames else 0.
+
+    def log(self):
+        if not self.enabled or not self.frames:
+            return
+        stages = ', '.join(f'{stage} {nbytes / self.frames / 2**20:.2f}'
+                           for stage, nbytes in self.stage_bytes.items())
+        logger.info(f"frame copies: {self.bytes_per_frame / 2**20:.2f} MB per frame "
+                    f"(max {self.max_frame_bytes / 2**20:.2f}) over {self.frames} frames"
+                    + (f", per stage MB: {stages}" if stages else ""))
+
+
+copy_counter = CopyCounter(enabled=os.environ.get('ASONE_DEBUG_COPIES') == '1')
+
+
+def readonly(frame: np.ndarray) -> np.ndarray:
+    """Read-only view of `frame`, no data is copied.
+
+    The frames read by the tracking loop are passed to the detector and the
+    tracker as read-only views, a stage writing into them raises instead of
+    changing what the next stage sees.
+
+    Args:
+        frame (np.ndarray): frame
+
+    Returns:
+        np.ndarray: view of `frame` that cannot be written
+    """
+    view = frame.view()
+    view.flags.writeable = False
+    return view
+
+
+def copy_frame(frame: np.ndarray, out: np.ndarray = None,
+               stage: str = 'other') -> np.ndarray:
+    """The one copy a stage takes of a frame it draws on or keeps.
+
+    Args:
+        frame (np.ndarray): frame to copy
+        out (np.ndarray): reused buffer, written if it has the shape and
+            dtype of `frame`, a new array is allocated otherwise
+        stage (str): name the copy is counted under in debug mode
+
+    Returns:
+        np.ndarray: writable copy of `frame`, `out` if it was reused
+    """
+    copy_counter.add(frame.nbytes, stage)
+    if out is not None and out.shape == frame.shape and out.dtype == frame.dtype \
+            and out.flags.writeable:
+        np.copyto(out, frame)
+        return out
+    return frame.copy()
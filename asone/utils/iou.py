@@ -0,0 +1,54 @@
+import numpy as np
+
+
+def box_iou(boxes_a, boxes_b, offset: float = 0.0, block_size: int = None):
+    """IoU of every pair of boxes, broadcast over (N, 4) x (M, 4) arrays.
+
+    Shared by the IoU costs of DeepSORT and ByteTrack.
+
+    Args:
+        boxes_a (np.ndarray): (N, 4) xyxy boxes
+        boxes_b (np.ndarray): (M, 4) xyxy boxes
+        offset (float): added to every width and height, 1 gives the pixel
+            inclusive areas ByteTrack was tuned with
+        block_size (int): if set, `boxes_a` is processed this many rows at a
+            time so the N x M temporaries stay small for large inputs
+
+    Returns:
+        np.ndarray: (N, M) float32 IoU matrix
+    """
+    boxes_a = np.ascontiguousarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    boxes_b = np.ascontiguousarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+    ious = np.zeros((len(boxes_a), len(boxes_b)), dtype=np.float32)
+    if ious.size == 0:
+        return ious
+
+    ax1, ay1, ax2, ay2 = boxes_a.T[:, :, None]
+    bx1, by1, bx2, by2 = boxes_b.T
+    if offset:
+        ax2, ay2, bx2, by2 = ax2 + offset, ay2 + offset, bx2 + offset, by2 + offset
+    area_a = (ax2 - ax1) * (ay2 - ay1)
+    area_b = (bx2 - bx1) * (by2 - by1)
+
+    # scratch buffers reused by every block
+    step = min(block_size or len(boxes_a), len(boxes_a))
+    iw = np.empty((step, len(boxes_b)), dtype=np.float32)
+    ih = np.empty_like(iw)
+    tmp = np.empty_like(iw)
+    for start in range(0, len(boxes_a), step):
+        rows = slice(start, start + step)
+        n = len(ious[rows])
+        w, h, t = iw[:n], ih[:n], tmp[:n]
+
+        np.minimum(ax2[rows], bx2, out=w)
+        w -= np.maximum(ax1[rows], bx1, out=t)
+        np.minimum(ay2[rows], by2, out=h)
+        h -= np.maximum(ay1[rows], by1, out=t)
+        np.maximum(w, 0, out=w)
+        np.maximum(h, 0, out=h)
+        inter = np.multiply(w, h, out=w)
+
+        union = np.add(area_a[rows], area_b, out=t)
+        union -= inter
+        np.divide(inter, union, out=ious[rows], where=inter > 0)
+    return ious
@@ -0,0 +1,50 @@
+import time
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """Cheap scene change test used to skip the detector on static frames.
+
+    Every frame is downscaled to grayscale and compared against a running
+    average background. The score is the fraction of pixels that differ from
+    the background by more than `pixel_thres`, the frame counts as moving when
+    the score reaches `threshold`. The first frame is always moving.
+    """
+
+    def __init__(self,
+                 threshold: float = 0.002,
+                 width: int = 160,
+                 pixel_thres: int = 25,
+                 alpha: float = 0.05):
+        self.threshold = threshold
+        self.width = width
+        self.pixel_thres = pixel_thres
+        self.alpha = alpha
+        self._background = None
+
+    def __call__(self, frame: np.ndarray) -> dict:
+        """Score `frame` and update the background.
+
+        Returns:
+            dict: `moving` decision, change `score` and `cost_ms` of the test
+        """
+        tic = time.perf_counter()
+        height = max(int(frame.shape[0] * self.width / frame.shape[1]), 1)
+        small = cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+        if self._background is None or self._background.shape != gray.shape:
+            self._background = gray.astype(np.float32)
+            score = 1.0
+        else:
+            diff = cv2.absdiff(gray, cv2.convertScaleAbs(self._background))
+            score = np.count_nonzero(diff > self.pixel_thres) / diff.size
+            cv2.accumulateWeighted(gray, self._background, self.alpha)
+
+        return {
+            'moving': score >= self.threshold,
+            'score': score,
+            'cost_ms': (time.perf_counter() - tic) * 1000,
+        }
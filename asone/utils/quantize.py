@@ -0,0 +1,84 @@
+import os
+
+import cv2
+
+from asone.utils.track_cache import file_hash
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def calibration_images(image_dir: str, limit: int = 100):
+    """Yield up to `limit` evenly spaced BGR frames of `image_dir`."""
+    files = sorted(name for name in os.listdir(image_dir)
+                   if name.lower().endswith(IMAGE_EXTENSIONS)) \
+        if os.path.isdir(image_dir) else []
+    if not files:
+        raise FileNotFoundError(f'no calibration images found in {image_dir}')
+    step = max(len(files) // limit, 1)
+    for name in files[::step][:limit]:
+        image = cv2.imread(os.path.join(image_dir, name))
+        if image is not None:
+            yield image
+
+
+def int8_path(model_path: str) -> str:
+    """Where the int8 version of an ONNX model is cached, next to it and keyed
+    by its content. Delete the file to calibrate again."""
+    root, _ = os.path.splitext(model_path)
+    return f'{root}.int8.{file_hash(model_path)[:16]}.onnx'
+
+
+def quantize_onnx(model_path: str, calibration_batches,
+                  op_types=('Conv', 'MatMul')) -> str:
+    """Static int8 quantization of an ONNX model for CPU inference.
+
+    Weights are quantized per channel to int8, activations to uint8 with
+    ranges calibrated on `calibration_batches`. Only `op_types` are
+    quantized, decoding and NMS stay in float. Nothing is done if the cached
+    file exists.
+
+    Args:
+        model_path (str): float32 ONNX model
+        calibration_batches (iterable): preprocessed inputs of the model's
+            first input, exactly as fed at inference
+        op_types (tuple): operator types to quantize
+
+    Returns:
+        str: path of the int8 model
+    """
+    path = int8_path(model_path)
+    if os.path.isfile(path):
+        return path
+
+    import onnx
+    from onnx import version_converter
+    import onnxruntime
+    from onnxruntime.quantization import (CalibrationDataReader, QuantFormat,
+                                          QuantType, quantize_static)
+
+    input_name = onnxruntime.InferenceSession(
+        model_path, providers=['CPUExecutionProvider']).get_inputs()[0].name
+
+    # per channel QDQ needs opset 13, YOLOv7 and ReID exports are opset 12
+    model = onnx.load(model_path)
+    opset = next(op.version for op in model.opset_import if op.domain in ('', 'ai.onnx'))
+    if opset < 13:
+        model = version_converter.convert_version(model, 13)
+
+    class Reader(CalibrationDataReader):
+        def __init__(self):
+            self.batches = iter(calibration_batches)
+
+        def get_next(self):
+            batch = next(self.batches, None)
+            return None if batch is None else {input_name: batch}
+
+    tmp_path = path + '.tmp'
+    quantize_static(model, tmp_path, Reader(),
+                    quant_format=QuantFormat.QDQ,
+                    activation_type=QuantType.QUInt8,
+                    weight_type=QuantType.QInt8,
+                    per_channel=True,
+                    op_types_to_quantize=list(op_types))
+    os.replace(tmp_path, path)
+    return path
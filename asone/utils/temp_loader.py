@@ -1,18 +1,16 @@
-from asone.detectors import YOLOv5Detector
-from asone.detectors import YOLOv7Detector
-from asone.trackers import ByteTrack
-from asone.trackers import NorFair
-from asone.trackers import DeepSort
+import asone.detectors
+import asone.trackers
 
+# class names, resolved lazily so the models are only imported when used
 detectors = {
-    'yolov5s': YOLOv5Detector,
-    'yolov7': YOLOv7Detector
+    'yolov5s': 'YOLOv5Detector',
+    'yolov7': 'YOLOv7Detector'
 }
 
 trackers = {
-    'byte_track': ByteTrack,
-    'norfair': NorFair,
-    'deepsort': DeepSort
+    'byte_track': 'ByteTrack',
+    'norfair': 'NorFair',
+    'deepsort': 'DeepSort'
 }
 
 
@@ -20,6 +18,7 @@ def get_detector(detector, use_cuda=True, use_onnx=False):
     detector = detectors.get(detector, None)
 
     if detector is not None:
+        detector = getattr(asone.detectors, detector)
         return detector(use_cuda=use_cuda, use_onnx=use_onnx)
     else:
         return None
@@ -29,6 +28,7 @@ def get_tracker(tracker, detector, use_cuda=True, use_onnx=False):
     tracker = trackers.get(tracker, None)
 
     if tracker is not None:
+        tracker = getattr(asone.trackers, tracker)
         return tracker(detector)
     else:
         return None
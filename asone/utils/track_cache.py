@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+
+def file_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    """sha1 of the content of a file."""
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+class TrackCache:
+    """Per video cache of the detection and tracking outputs of every frame.
+
+    Entries are keyed by the video content, the model weights (detector and
+    ReID network) and the config the video was processed with, so replacing
+    a weights file (e.g. after `update_weights`) or changing a threshold or a
+    tracker or detector option starts a new entry.
+    Frames are stored columnar in one `.npz` file: the rows of all frames are
+    concatenated and `offsets[i]:offsets[i + 1]` selects the rows of frame i.
+
+    An entry is written when the tracking loop ends, also when it is stopped
+    before the end of the video. Such an entry is not `complete`: its frames
+    are replayed and the models only run from the first frame it misses.
+    """
+
+    def __init__(self, cache_dir: str, video_path: str, weights_path,
+                 config: dict):
+        key = hashlib.sha1()
+        key.update(file_hash(video_path).encode())
+        weights_paths = [weights_path] if isinstance(weights_path, str) or \
+            weights_path is None else weights_path
+        for path in weights_paths:
+            if path and os.path.isfile(path):
+                key.update(file_hash(path).encode())
+            else:
+                # weights are downloaded on model load, there is nothing cached yet
+                key.update(str(path).encode())
+        key.update(json.dumps(config, sort_keys=True, default=str).encode())
+
+        self.cache_dir = cache_dir
+        self.path = os.path.join(
+            cache_dir, f'{os.path.basename(video_path)}.{key.hexdigest()[:16]}.npz')
+        self._frames = []
+        # set by `load`, False if the run that wrote the entry stopped early
+        self.complete = False
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def exists(self) -> bool:
+        return os.path.isfile(self.path)
+
+    def load(self) -> list:
+        """Return the `(bboxes_xyxy, ids, scores, class_ids, predicted)` of every
+        frame the entry holds, `complete` tells if that is the whole video."""
+        with np.load(self.path) as data:
+            data = dict(data)
+        # entries written before partial runs were kept are complete
+        self.complete = bool(data.get('complete', True))
+
+        frames = []
+        offsets, score_offsets = data['offsets'], data['score_offsets']
+        for i, predicted in enumerate(data['predicted']):
+            rows = slice(offsets[i], offsets[i + 1])
+            frames.append((data['bboxes'][rows],
+                           data['ids'][rows],
+                           data['scores'][score_offsets[i]:score_offsets[i + 1]],
+                           data['class_ids'][rows],
+                           bool(predicted)))
+        return frames
+
+    def append(self, bboxes_xyxy, ids, scores, class_ids, predicted: bool):
+        """Record the tracker outputs of the next frame."""
+        self._frames.append((
+            np.asarray(bboxes_xyxy, dtype=np.float32).reshape(-1, 4),
+            np.asarray(ids, dtype=np.int64).reshape(-1),
+            np.asarray(scores, dtype=np.float32).reshape(-1),
+            np.asarray(class_ids, dtype=np.int64).reshape(-1),
+            predicted))
+
+    def save(self, complete: bool = True):
+        """Write the recorded frames, the file appears atomically.
+
+        Args:
+            complete (bool): the frames cover the whole video
+        """
+        bboxes, ids, scores, class_ids, predicted = zip(*self._frames) \
+            if self._frames else ([], [], [], [], [])
+        offsets = np.cumsum([0] + [len(rows) for rows in bboxes])
+        score_offsets = np.cumsum([0] + [len(rows) for rows in scores])
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = self.path + '.tmp.npz'
+        np.savez_compressed(
+            tmp_path,
+            bboxes=np.concatenate(bboxes) if bboxes else np.zeros((0, 4), np.float32),
+            ids=np.concatenate(ids) if ids else np.zeros(0, np.int64),
+            scores=np.concatenate(scores) if scores else np.zeros(0, np.float32),
+            class_ids=np.concatenate(class_ids) if class_ids else np.zeros(0, np.int64),
+            offsets=offsets,
+            score_offsets=score_offsets,
+            predicted=np.array(predicted, dtype=bool),
+            complete=np.array(complete))
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,139 @@
+import queue
+import threading
+
+import cv2
+import numpy as np
+
+
+class VideoReader:
+    """Decodes frames of a video source on a background thread.
+
+    Frames are decoded into a fixed pool of preallocated buffers and handed
+    to the consumer through a queue, so decoding overlaps with detection and
+    tracking. When every buffer is in flight the decoder blocks until the
+    consumer gives one back (backpressure).
+
+    The array returned by `read` is recycled on the next `read` call, copy it
+    if it has to outlive the current iteration.
+
+    An optional `motion_gate` (see `MotionGate`) is evaluated on the decoder
+    thread, its result for the last frame returned by `read` is in `motion`.
+
+    With `drop_stale` (live sources such as a webcam) the decoder never
+    waits for the consumer, it overwrites the oldest queued frame instead,
+    and `read` skips to the newest decoded frame.
+    """
+
+    def __init__(self, source, queue_size: int = 4, motion_gate=None,
+                 drop_stale: bool = False):
+        self.cap = cv2.VideoCapture(source)
+        self.motion_gate = motion_gate
+        self.drop_stale = drop_stale
+        self.dropped = 0
+        self.motion = None
+        self.width = self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)
+        self.height = self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.frame_count = self.cap.get(cv2.CAP_PROP_FRAME_COUNT)
+
+        # queued frames + one held by the consumer + one being decoded
+        num_buffers = max(queue_size, 1) + 2
+        if self.width > 0 and self.height > 0:
+            shape = (int(self.height), int(self.width), 3)
+            self._buffers = [np.empty(shape, dtype=np.uint8)
+                             for _ in range(num_buffers)]
+        else:
+            # frame size unknown until the first decode, let opencv allocate
+            self._buffers = [None] * num_buffers
+
+        self._motion = [None] * num_buffers
+        self._free = queue.Queue()
+        for idx in range(num_buffers):
+            self._free.put(idx)
+        self._filled = queue.Queue()
+        self._held = None
+        self._finished = False
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._decode, daemon=True)
+        self._thread.start()
+
+    def _decode(self):
+        while not self._stop.is_set():
+            idx = self._next_buffer()
+            if idx is None:
+                continue
+
+            buffer = self._buffers[idx]
+            if buffer is None:
+                ret, frame = self.cap.read()
+            else:
+                ret, frame = self.cap.read(buffer)
+            if not ret:
+                self._filled.put(None)
+                return
+            # opencv reallocates if the stream changes resolution
+            self._buffers[idx] = frame
+            if self.motion_gate is not None:
+                self._motion[idx] = self.motion_gate(frame)
+            self._filled.put(idx)
+
+    def _next_buffer(self):
+        """Index of the buffer to decode into, None if none is free yet."""
+        if self.drop_stale:
+            try:
+                return self._free.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                # the consumer is behind, reuse the oldest queued frame
+                idx = self._filled.get_nowait()
+                self.dropped += 1
+                return idx
+            except queue.Empty:
+                pass
+        try:
+            return self._free.get(timeout=0.1)
+        except queue.Empty:
+            return None
+
+    def read(self) -> tuple:
+        """Return `(ret, frame)` like `cv2.VideoCapture.read`."""
+        if self._held is not None:
+            self._free.put(self._held)
+            self._held = None
+        if self._finished:
+            return False, None
+
+        idx = self._filled.get()
+        # frames decoded in the meantime replace the older ones
+        while self.drop_stale and idx is not None:
+            try:
+                newer = self._filled.get_nowait()
+            except queue.Empty:
+                break
+            if newer is None:
+                # keep the last frame, the end is reported on the next read
+                self._filled.put(None)
+                break
+            self._free.put(idx)
+            self.dropped += 1
+            idx = newer
+        if idx is None:
+            self._finished = True
+            return False, None
+        self._held = idx
+        self.motion = self._motion[idx]
+        return True, self._buffers[idx]
+
+    def release(self):
+        """Stop the decoder thread and release the capture."""
+        self._stop.set()
+        self._thread.join()
+        self.cap.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.release()
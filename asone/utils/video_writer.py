@@ -0,0 +1,107 @@
+import queue
+import threading
+import time
+
+import cv2
+from loguru import logger
+
+from asone.utils.draw import draw_boxes
+from asone.utils.frame_copy import copy_frame
+
+
+def draw_tracks(img, fps, bbox_xyxy, class_ids, identities=None,
+                draw_trails=False, class_names=None):
+    """Draw the fps counter and the tracked boxes on `img` in place."""
+    cv2.line(img, (20, 25), (127, 25), [85, 45, 255], 30)
+    cv2.putText(img, f'FPS: {int(fps)}', (11, 35), 0, 1, [
+        225, 255, 255], thickness=2, lineType=cv2.LINE_AA)
+    return draw_boxes(img,
+                      bbox_xyxy,
+                      class_ids,
+                      identities=identities,
+                      draw_trails=draw_trails,
+                      class_names=class_names)
+
+
+class VideoWriter:
+    """Draws and encodes result frames on a background thread.
+
+    Frames go through a bounded queue so encoding never stalls the tracking
+    loop. When the writer falls behind and the queue is full, new frames are
+    dropped (or the caller waits if `drop_frames` is False). Dropped frames and
+    the worst queueing delay are reported by `close`, which also flushes the
+    queue and releases the file.
+    """
+
+    def __init__(self, path, fps, size, queue_size: int = 64,
+                 drop_frames: bool = True, draw_trails: bool = False,
+                 class_names=None):
+        self.writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"),
+                                      fps, size)
+        self.path = path
+        self.drop_frames = drop_frames
+        self.draw_trails = draw_trails
+        self.class_names = class_names
+
+        self.written = 0
+        self.dropped = 0
+        self.max_lag = 0.0
+
+        self._queue = queue.Queue(maxsize=max(queue_size, 1))
+        self._thread = threading.Thread(target=self._write, daemon=True)
+        self._thread.start()
+
+    def _write(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            queued_at, frame, tracks = item
+            if tracks is not None:
+                frame = draw_tracks(frame, *tracks, draw_trails=self.draw_trails,
+                                    class_names=self.class_names)
+            self.writer.write(frame)
+            self.written += 1
+            self.max_lag = max(self.max_lag, time.perf_counter() - queued_at)
+
+    def write(self, frame, tracks=None, copy: bool = True) -> bool:
+        """Queue a frame, the writer keeps its own copy.
+
+        Args:
+            frame (np.ndarray): frame to encode
+            tracks (tuple): optional `(fps, bbox_xyxy, class_ids, identities)`
+                drawn on the frame by the writer thread
+            copy (bool): False hands `frame` over to the writer without a
+                copy, the caller must not modify it afterwards
+
+        Returns:
+            bool: False if the frame was dropped
+        """
+        if copy:
+            frame = copy_frame(frame, stage='writer')
+        item = (time.perf_counter(), frame, tracks)
+        if not self.drop_frames:
+            self._queue.put(item)
+            return True
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            if self.dropped == 0:
+                logger.warning(f"video writer is lagging, dropping frames of {self.path}")
+            self.dropped += 1
+            return False
+        return True
+
+    def close(self):
+        """Write the queued frames and release the file."""
+        self._queue.put(None)
+        self._thread.join()
+        self.writer.release()
+        logger.info(f"video writer: {self.written} frames written, "
+                    f"{self.dropped} dropped, max lag {self.max_lag * 1000:.0f} ms")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,96 @@
+"""Benchmark the assignment solvers against the former DeepSORT matching.
+
+The cost matrices are IoU costs between tracks and noisy detections of the
+same objects, some tracks lost and some detections new, gated like the IoU
+stage of DeepSORT.
+
+Usage:
+    python -m benchmarks.bench_assignment --sizes 10 50 100 250 500
+"""
+import argparse
+import time
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from tabulate import tabulate
+
+from asone.utils.assignment import ASSIGNMENT_SOLVERS, solve_assignment
+from asone.utils.iou import box_iou
+
+
+def loop_matching(cost_matrix, max_distance):
+    """Former `deep_sort.linear_assignment.min_cost_matching` bookkeeping."""
+    cost_matrix = cost_matrix.copy()
+    cost_matrix[cost_matrix > max_distance] = max_distance + 1e-5
+    row_indices, col_indices = linear_sum_assignment(cost_matrix)
+
+    matches, unmatched_tracks, unmatched_detections = [], [], []
+    for col in range(cost_matrix.shape[1]):
+        if col not in col_indices:
+            unmatched_detections.append(col)
+    for row in range(cost_matrix.shape[0]):
+        if row not in row_indices:
+            unmatched_tracks.append(row)
+    for row, col in zip(row_indices, col_indices):
+        if cost_matrix[row, col] > max_distance:
+            unmatched_tracks.append(row)
+            unmatched_detections.append(col)
+        else:
+            matches.append((row, col))
+    return matches, unmatched_tracks, unmatched_detections
+
+
+def make_costs(num_tracks, rng):
+    """IoU cost of `num_tracks` tracks against their detections in a crowd."""
+    xy = rng.uniform(0, 1920, (num_tracks, 2))
+    wh = rng.uniform(40, 160, (num_tracks, 2))
+    tracks = np.concatenate([xy, xy + wh], 1)
+
+    seen = rng.random(num_tracks) > 0.1
+    detections = tracks[seen] + rng.normal(0, 6, (seen.sum(), 4))
+    new = rng.uniform(0, 1920, (num_tracks // 10, 2))
+    new = np.concatenate([new, new + rng.uniform(40, 160, new.shape)], 1)
+    detections = rng.permutation(np.concatenate([detections, new]))
+    return 1. - box_iou(tracks, detections)
+
+
+def timeit(fn, *args, repeat=5, **kwargs):
+    best = float('inf')
+    for _ in range(repeat):
+        tic = time.perf_counter()
+        result = fn(*args, **kwargs)
+        best = min(best, time.perf_counter() - tic)
+    return result, best * 1000
+
+
+def main(sizes, max_distance, repeat):
+    rng = np.random.default_rng(0)
+    rows = []
+    for size in sizes:
+        cost_matrix = make_costs(size, rng)
+        (ref, _, _), ref_ms = timeit(loop_matching, cost_matrix,
+                                     max_distance, repeat=repeat)
+        ref_cost = sum(cost_matrix[r, c] for r, c in ref)
+        row = [size, len(ref), f'{ref_ms:.2f}']
+        for solver in ASSIGNMENT_SOLVERS:
+            (matches, _, _), ms = timeit(solve_assignment, cost_matrix,
+                                         max_distance, solver=solver,
+                                         repeat=repeat)
+            cost = cost_matrix[matches[:, 0], matches[:, 1]].sum()
+            row += [f'{ms:.2f}', f'{len(matches)} / {cost - ref_cost:+.3f}']
+        rows.append(row)
+
+    headers = ['tracks', 'matches', 'former ms']
+    for solver in ASSIGNMENT_SOLVERS:
+        headers += [f'{solver} ms', f'{solver} matches / cost diff']
+    print(tabulate(rows, headers=headers))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[10, 50, 100, 250, 500])
+    parser.add_argument('--max-distance', type=float, default=0.7)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    main(args.sizes, args.max_distance, args.repeat)
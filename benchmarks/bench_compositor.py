@@ -0,0 +1,100 @@
+"""Benchmark the annotation window redraw while a box is dragged.
+
+Replays a drag over a frame with a growing number of boxes, once the way
+`annotation.mouse_click` redrew it before (two frame copies and every box
+redrawn per mouse move) and once with `FrameCompositor`, and checks that
+both show the same pixels on every move. `cv2.imshow` is not called.
+
+Usage (from the repository root, the class colors come from config_files):
+    python -m benchmarks.bench_compositor --boxes 10 40 80 --moves 200
+"""
+import argparse
+import copy
+import sys
+import time
+
+import cv2
+import numpy as np
+from tabulate import tabulate
+
+import cfg
+
+cfg.init_config()
+
+import anno  # noqa: E402
+from anno import BBox, FrameCompositor, init_frame, show_frame  # noqa: E402
+
+
+def random_boxes(num_boxes, width, height, rng):
+    class_ids = list(cfg.id_to_class)
+    boxes = []
+    for _ in range(num_boxes):
+        x1, y1 = rng.integers(0, [width - 200, height - 200])
+        w, h = rng.integers(20, 200, 2)
+        class_id = class_ids[rng.integers(len(class_ids))]
+        boxes.append(BBox(coords=[int(x1), int(y1), int(x1 + w), int(y1 + h)],
+                          color=cfg.id_to_color[class_id], class_id=class_id,
+                          frame_width=width, frame_height=height))
+    return boxes
+
+
+def drag_path(moves, width, height):
+    """Rectangles of a box dragged diagonally across the frame."""
+    steps = np.linspace(0, 1, moves)
+    x1 = (steps * (width - 300)).astype(int)
+    y1 = (steps * (height - 200)).astype(int)
+    return [(int(x), int(y), int(x) + 250, int(y) + 150) for x, y in zip(x1, y1)]
+
+
+def main(args):
+    shown = []
+    # keep what would be displayed instead of opening a window
+    cv2.imshow = lambda window, frame: shown.append(frame.copy()) if args.check else None
+
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 255, (args.height, args.width, 3), dtype=np.uint8)
+    path = drag_path(args.moves, args.width, args.height)
+    rows = []
+    for num_boxes in args.boxes:
+        boxes = random_boxes(num_boxes, args.width, args.height, rng)
+
+        # redraw of annotation.mouse_click before the compositor
+        shown.clear()
+        tic = time.perf_counter()
+        boxed_frame = copy.deepcopy(frame)
+        init_frame(boxed_frame, boxes)
+        frame_cache = copy.deepcopy(boxed_frame)
+        for x1, y1, x2, y2 in path:
+            cv2.rectangle(frame_cache, (x1, y1), (x2, y2), anno.RED_RGB, 2)
+            show_frame(frame_cache, "window", mode="annotate")
+            boxed_frame = copy.deepcopy(frame)
+            init_frame(boxed_frame, boxes)
+            frame_cache = copy.deepcopy(boxed_frame)
+        full_ms = (time.perf_counter() - tic) * 1000 / len(path)
+        reference = list(shown)
+
+        shown.clear()
+        tic = time.perf_counter()
+        compositor = FrameCompositor(frame)
+        compositor.render(boxes)
+        for rect in path:
+            show_frame(compositor.render(boxes, rect), "window", mode="annotate")
+        layered_ms = (time.perf_counter() - tic) * 1000 / len(path)
+
+        if args.check and not all(np.array_equal(a, b) for a, b in zip(reference, shown)):
+            sys.exit(f'compositor frames differ from the full redraw with {num_boxes} boxes')
+        rows.append([num_boxes, f'{full_ms:.2f}', f'{layered_ms:.2f}',
+                     f'{full_ms / layered_ms:.1f}x'])
+    print(tabulate(rows, headers=['boxes', 'full redraw ms/move',
+                                  'compositor ms/move', 'speedup']))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--boxes', type=int, nargs='+', default=[10, 40, 80])
+    parser.add_argument('--moves', type=int, default=200)
+    parser.add_argument('--width', type=int, default=1920)
+    parser.add_argument('--height', type=int, default=1080)
+    parser.add_argument('--no-check', dest='check', action='store_false',
+                        help='skip the pixel comparison, time only')
+    main(parser.parse_args())
@@ -0,0 +1,123 @@
+"""Compare an end-to-end ONNX detector (NMS in the graph) with its PyTorch model.
+
+Exports the PyTorch weights with `export_end2end` on first use (cached next
+to them), runs both detectors on the same frames and fails if they do not
+keep the same boxes. Optionally times a plain ONNX export of the same model
+(`--onnx`, raw outputs and Python NMS) too. The detect time includes the
+pre and post processing, the forward time is the onnxruntime call only.
+
+Usage:
+    python -m benchmarks.bench_end2end --model YOLOV5S_PYTORCH --weights yolov5s.pt \
+        --onnx yolov5s.onnx --images data/images --batch 1 4
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+from tabulate import tabulate
+
+import asone
+from asone.detectors import Detector
+from asone.detectors.utils.export_end2end import end2end_path, export_end2end
+from asone.utils.quantize import calibration_images
+
+
+def load_frames(image_dir, limit, rng):
+    """Frames of `image_dir`, random 720p scenes of rectangles if empty."""
+    if os.path.isdir(image_dir) and os.listdir(image_dir):
+        return list(calibration_images(image_dir, limit))
+    frames = []
+    for _ in range(limit):
+        frame = np.full((720, 1280, 3), 114, np.uint8)
+        for _ in range(30):
+            x1, y1 = rng.integers(0, [1260, 700])
+            x2, y2 = [x1, y1] + rng.integers(10, [320, 180])
+            cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)),
+                          rng.integers(0, 255, 3).tolist(), -1)
+        frames.append(frame)
+    return frames
+
+
+def same_boxes(reference, detections, atol):
+    """True if both keep the same boxes, up to `atol` pixels."""
+    reference = np.asarray(reference, dtype=np.float64).reshape(-1, 6)
+    detections = np.asarray(detections, dtype=np.float64).reshape(-1, 6)
+    if len(reference) != len(detections):
+        return False
+    if len(reference) == 0:
+        return True
+    # distance of every reference box to its closest detection
+    distance = np.abs(reference[:, None] - detections[None]).max(2)
+    return distance.min(1).max() <= atol
+
+
+def timeit(fns, repeat):
+    """Best time of every function, run in turns so that they all see the
+    same machine load."""
+    results = [fn() for fn in fns]  # warm up
+    best = [float('inf')] * len(fns)
+    for _ in range(repeat):
+        for i, fn in enumerate(fns):
+            tic = time.perf_counter()
+            fn()
+            best[i] = min(best[i], time.perf_counter() - tic)
+    return results, [ms * 1000 for ms in best]
+
+
+def main(args):
+    flag = getattr(asone, args.model.upper())
+    path = end2end_path(args.weights)
+    if not os.path.isfile(path):
+        export_end2end(flag, args.weights, conf_thres=args.conf_thres,
+                       agnostic=not args.class_nms)
+
+    kwargs = dict(conf_thres=args.conf_thres, agnostic_nms=not args.class_nms,
+                  rect=args.rect)
+    torch_detector = Detector(flag, args.weights, use_cuda=False).get_detector()
+    detectors = [('end2end onnx', Detector(flag + 1, path, use_cuda=False).get_detector())]
+    if args.onnx:
+        detectors.append(('onnx + python nms',
+                          Detector(flag + 1, args.onnx, use_cuda=False).get_detector()))
+
+    frames = load_frames(args.images, max(args.batch), np.random.default_rng(0))
+    rows = []
+    for batch in args.batch:
+        images = frames[:batch]
+        reference = [detection for detection, _ in torch_detector.detect_batch(images, **kwargs)]
+        for name, detector in detectors:
+            engine = detector.model
+            forward_ms = []
+
+            def run():
+                results = detector.detect_batch(images, **kwargs)
+                forward_ms.append(engine.last_ms)
+                return results
+
+            (results,), (detect_ms,) = timeit([run], args.repeat)
+            if name.startswith('end2end') and not all(
+                    same_boxes(ref, detection, args.atol)
+                    for ref, (detection, _) in zip(reference, results)):
+                sys.exit(f'{name} boxes differ from PyTorch at batch {batch}')
+            rows.append([batch, name, sum(len(d) for d, _ in results),
+                         f'{detect_ms:.2f}', f'{min(forward_ms):.2f}',
+                         f'{detect_ms - min(forward_ms):.2f}'])
+    print(tabulate(rows, headers=['batch', 'model', 'boxes', 'detect ms',
+                                  'forward ms', 'pre + post ms']))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', required=True, help='PyTorch model flag, e.g. YOLOV5S_PYTORCH')
+    parser.add_argument('--weights', required=True, help='PyTorch weights')
+    parser.add_argument('--onnx', default=None, help='plain ONNX export of the same weights')
+    parser.add_argument('--images', default=os.path.join('data', 'images'))
+    parser.add_argument('--batch', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--conf-thres', type=float, default=0.25)
+    parser.add_argument('--class-nms', action='store_true')
+    parser.add_argument('--rect', action='store_true')
+    parser.add_argument('--atol', type=float, default=0.01, help='pixels')
+    parser.add_argument('--repeat', type=int, default=5)
+    main(parser.parse_args())
@@ -0,0 +1,185 @@
+"""Compare the int8 quantized YOLOv7 and ReID models with their float versions.
+
+Runs both versions of the detector on a labeled set in YOLO txt format
+(`class xc yc w h`, normalized, as saved by the annotation tool) and reports
+AP@0.5, precision, recall and latency. The ReID networks get the labeled
+boxes as crops and are compared by the cosine similarity of their features
+and latency. Both int8 models are calibrated on `--calib-dir` the first time
+and cached next to the float weights.
+
+The app's class ids (id_to_class.yaml) are not COCO's, use `--agnostic` to
+match boxes regardless of class.
+
+Usage:
+    python -m benchmarks.bench_int8 --model yolov7_tiny --agnostic
+"""
+import argparse
+import os
+import time
+
+import cv2
+import numpy as np
+from tabulate import tabulate
+
+import asone
+from asone.detectors import Detector
+from asone.utils.iou import box_iou
+from asone.utils.quantize import IMAGE_EXTENSIONS
+
+DEFAULT_REID_WEIGHTS = os.path.join(
+    'asone', 'trackers', 'deep_sort', 'tracker', 'deep', 'checkpoint', 'ckpt.t7')
+
+
+def load_labeled_set(image_dir, label_dir, limit):
+    """(image, (N, 5) class + xyxy pixel boxes) pairs of the labeled images."""
+    samples = []
+    for name in sorted(os.listdir(image_dir)):
+        root, ext = os.path.splitext(name)
+        label_file = os.path.join(label_dir, root + '.txt')
+        if ext.lower() not in IMAGE_EXTENSIONS or not os.path.isfile(label_file):
+            continue
+        image = cv2.imread(os.path.join(image_dir, name))
+        if image is None:
+            continue
+        height, width = image.shape[:2]
+        labels = np.loadtxt(label_file, ndmin=2).reshape(-1, 5)
+        xc, yc, w, h = labels[:, 1:].T * [[width], [height], [width], [height]]
+        boxes = np.stack([labels[:, 0], xc - w / 2, yc - h / 2,
+                          xc + w / 2, yc + h / 2], axis=1)
+        samples.append((image, boxes))
+        if len(samples) == limit:
+            break
+    if not samples:
+        raise FileNotFoundError(f'no labeled images in {image_dir} / {label_dir}')
+    return samples
+
+
+def match(detections, labels, iou_thres, agnostic):
+    """True positive flag of every detection, highest score first."""
+    order = np.argsort(-detections[:, 4], kind='stable')
+    detections = detections[order]
+    tp = np.zeros(len(detections), dtype=bool)
+    if len(detections) == 0 or len(labels) == 0:
+        return detections[:, 4], tp
+    ious = box_iou(detections[:, :4], labels[:, 1:])
+    if not agnostic:
+        ious[detections[:, 5:6].astype(int) != labels[:, 0].astype(int)] = 0
+    taken = np.zeros(len(labels), dtype=bool)
+    for i, row in enumerate(ious):
+        row = np.where(taken, 0, row)
+        best = row.argmax()
+        if row[best] >= iou_thres:
+            tp[i] = taken[best] = True
+    return detections[:, 4], tp
+
+
+def average_precision(scores, tp, num_labels):
+    """All point interpolated AP of the pooled detections."""
+    order = np.argsort(-scores, kind='stable')
+    tp = tp[order]
+    recall = np.cumsum(tp) / max(num_labels, 1)
+    precision = np.cumsum(tp) / np.arange(1, len(tp) + 1)
+    recall = np.r_[0., recall, 1.]
+    precision = np.maximum.accumulate(np.r_[1., precision, 0.][::-1])[::-1]
+    return np.sum(np.diff(recall) * precision[1:])
+
+
+def evaluate_detector(detector, samples, conf_thres, iou_thres, agnostic):
+    scores, tps, times = [], [], []
+    num_labels = sum(len(labels) for _, labels in samples)
+    for image, labels in samples:
+        tic = time.perf_counter()
+        detections, _ = detector.detect(image, conf_thres=0.01)
+        times.append(time.perf_counter() - tic)
+        score, tp = match(np.asarray(detections, dtype=np.float64).reshape(-1, 6),
+                          labels, iou_thres, agnostic)
+        scores.append(score)
+        tps.append(tp)
+    scores, tps = np.concatenate(scores), np.concatenate(tps)
+    kept = scores >= conf_thres
+    precision = tps[kept].mean() if kept.any() else 0.
+    recall = tps[kept].sum() / max(num_labels, 1)
+    # the first frame pays for the session warm up
+    latency = np.median(times[1:] if len(times) > 1 else times) * 1000
+    return average_precision(scores, tps, num_labels), precision, recall, latency
+
+
+def compare_detectors(model, samples, conf_thres, iou_thres, agnostic):
+    name = model.upper()
+    rows = []
+    for label, flag in [('fp32', f'{name}_ONNX'), ('int8', f'{name}_INT8')]:
+        detector = Detector(getattr(asone, flag), use_cuda=False)
+        ap, precision, recall, latency = evaluate_detector(
+            detector, samples, conf_thres, iou_thres, agnostic)
+        rows.append([f'{model} {label}', f'{ap:.4f}', f'{precision:.4f}',
+                     f'{recall:.4f}', f'{latency:.1f}'])
+    print(tabulate(rows, headers=['model', 'AP@0.5', 'precision', 'recall',
+                                  'median ms']))
+
+
+def compare_reid(weights, samples, calib_dir, threads, repeat):
+    from asone.trackers.deep_sort.tracker.deep.feature_extractor import Extractor
+
+    fp32 = Extractor(weights, use_cuda=False, backend='onnx', num_threads=threads)
+    int8 = Extractor(weights, use_cuda=False, backend='onnx_int8',
+                     num_threads=threads, calib_dir=calib_dir)
+    cosines, times = [], {'fp32': 0., 'int8': 0.}
+    for image, labels in samples:
+        height, width = image.shape[:2]
+        boxes = np.clip(labels[:, 1:], 0, [width, height, width, height]).astype(int)
+        boxes = boxes[(boxes[:, 2] > boxes[:, 0]) & (boxes[:, 3] > boxes[:, 1])]
+        if len(boxes) == 0:
+            continue
+        features = {}
+        for label, extractor in [('fp32', fp32), ('int8', int8)]:
+            best = float('inf')
+            for _ in range(repeat):
+                tic = time.perf_counter()
+                features[label] = extractor.extract(image, boxes)
+                best = min(best, time.perf_counter() - tic)
+            times[label] += best
+        # features are L2 normalized
+        cosines.append((features['fp32'] * features['int8']).sum(1))
+    if not cosines:
+        print('no ReID crops in the labeled set')
+        return
+    cosines = np.concatenate(cosines)
+    print(tabulate([[len(cosines), f"{times['fp32'] * 1000:.1f}",
+                     f"{times['int8'] * 1000:.1f}",
+                     f"{times['fp32'] / times['int8']:.1f}x",
+                     f'{cosines.mean():.6f}', f'{cosines.min():.6f}']],
+                   headers=['crops', 'fp32 ms', 'int8 ms', 'speedup',
+                            'mean cosine', 'min cosine']))
+
+
+def main(args):
+    samples = load_labeled_set(args.images, args.labels, args.limit)
+    if not args.skip_detector:
+        compare_detectors(args.model, samples, args.conf_thres,
+                          args.iou_thres, args.agnostic)
+    if not args.skip_reid:
+        compare_reid(args.reid_weights, samples, args.calib_dir,
+                     args.threads, args.repeat)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--images', default=os.path.join('send_data', 'images'))
+    parser.add_argument('--labels', default=os.path.join('send_data', 'labels'))
+    parser.add_argument('--limit', type=int, default=200, help='labeled images to use')
+    parser.add_argument('--model', default='yolov7',
+                        choices=['yolov7_tiny', 'yolov7', 'yolov7_x', 'yolov7_w6',
+                                 'yolov7_e6', 'yolov7_d6', 'yolov7_e6e'])
+    parser.add_argument('--agnostic', action='store_true',
+                        help='match boxes regardless of their class')
+    parser.add_argument('--conf-thres', type=float, default=0.25,
+                        help='score threshold of precision and recall')
+    parser.add_argument('--iou-thres', type=float, default=0.5)
+    parser.add_argument('--reid-weights', default=DEFAULT_REID_WEIGHTS)
+    parser.add_argument('--calib-dir', default=os.path.join('data', 'images'),
+                        help='ReID calibration frames, the detector uses data/images')
+    parser.add_argument('--threads', type=int, default=None, help='ReID intra-op threads')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--skip-detector', action='store_true')
+    parser.add_argument('--skip-reid', action='store_true')
+    main(parser.parse_args())
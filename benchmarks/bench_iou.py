@@ -0,0 +1,104 @@
+"""Benchmark the shared IoU kernel against the tracker paths it replaced.
+
+Compares the former per-row DeepSORT `iou_cost` loop and, if it is still
+installed, ByteTrack's `cython_bbox.bbox_overlaps` with `box_iou`.
+
+Usage:
+    python -m benchmarks.bench_iou --sizes 10 100 500 2000
+"""
+import argparse
+import time
+
+import numpy as np
+from tabulate import tabulate
+
+from asone.utils.iou import box_iou
+
+try:
+    from cython_bbox import bbox_overlaps
+except ImportError:
+    bbox_overlaps = None
+
+
+def loop_iou(bbox, candidates):
+    """Former `deep_sort.iou_matching.iou`, on tlwh boxes."""
+    bbox_tl, bbox_br = bbox[:2], bbox[:2] + bbox[2:]
+    candidates_tl = candidates[:, :2]
+    candidates_br = candidates[:, :2] + candidates[:, 2:]
+
+    tl = np.c_[np.maximum(bbox_tl[0], candidates_tl[:, 0])[:, np.newaxis],
+               np.maximum(bbox_tl[1], candidates_tl[:, 1])[:, np.newaxis]]
+    br = np.c_[np.minimum(bbox_br[0], candidates_br[:, 0])[:, np.newaxis],
+               np.minimum(bbox_br[1], candidates_br[:, 1])[:, np.newaxis]]
+    wh = np.maximum(0., br - tl)
+
+    area_intersection = wh.prod(axis=1)
+    area_bbox = bbox[2:].prod()
+    area_candidates = candidates[:, 2:].prod(axis=1)
+    return area_intersection / (area_bbox + area_candidates - area_intersection)
+
+
+def loop_iou_cost(tracks_tlwh, detections_tlwh):
+    """Former `deep_sort.iou_matching.iou_cost` row loop, the candidates
+    array is rebuilt for every row as it was from the Detection objects."""
+    detections = list(detections_tlwh)
+    cost_matrix = np.zeros((len(tracks_tlwh), len(detections)))
+    for row, bbox in enumerate(tracks_tlwh):
+        candidates = np.asarray([tlwh for tlwh in detections])
+        cost_matrix[row, :] = 1. - loop_iou(bbox, candidates)
+    return cost_matrix
+
+
+def make_boxes(num_boxes, rng):
+    xy = rng.uniform(0, 1920, (num_boxes, 2))
+    wh = rng.uniform(20, 300, (num_boxes, 2))
+    return np.concatenate([xy, xy + wh], 1)
+
+
+def timeit(fn, *args, repeat=5, **kwargs):
+    best = float('inf')
+    for _ in range(repeat):
+        tic = time.perf_counter()
+        result = fn(*args, **kwargs)
+        best = min(best, time.perf_counter() - tic)
+    return result, best * 1000
+
+
+def main(sizes, block_size, repeat):
+    rng = np.random.default_rng(0)
+    rows = []
+    for size in sizes:
+        a, b = make_boxes(size, rng), make_boxes(size, rng)
+        a_tlwh = np.c_[a[:, :2], a[:, 2:] - a[:, :2]]
+        b_tlwh = np.c_[b[:, :2], b[:, 2:] - b[:, :2]]
+
+        ref, loop_ms = timeit(loop_iou_cost, a_tlwh, b_tlwh, repeat=repeat)
+        cost, new_ms = timeit(lambda: 1. - box_iou(a, b), repeat=repeat)
+        _, block_ms = timeit(box_iou, a, b, block_size=block_size, repeat=repeat)
+        rows.append(['deep_sort iou_cost', size, f'{loop_ms:.2f}', f'{new_ms:.2f}',
+                     f'{block_ms:.2f}', f'{loop_ms / new_ms:.1f}x',
+                     np.allclose(ref, cost, atol=1e-5)])
+
+        if bbox_overlaps is not None:
+            ref, ref_ms = timeit(bbox_overlaps, a, b, repeat=repeat)
+            ious, new_ms = timeit(box_iou, a, b, offset=1.0, repeat=repeat)
+            _, block_ms = timeit(box_iou, a, b, offset=1.0,
+                                 block_size=block_size, repeat=repeat)
+            rows.append(['byte_track cython_bbox', size, f'{ref_ms:.2f}',
+                         f'{new_ms:.2f}', f'{block_ms:.2f}',
+                         f'{ref_ms / new_ms:.1f}x',
+                         np.allclose(ref, ious, atol=1e-5)])
+
+    print(tabulate(rows, headers=['path', 'N = M', 'old ms', 'box_iou ms',
+                                  f'blocked ({block_size}) ms', 'speedup',
+                                  'same result']))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[10, 100, 500, 2000])
+    parser.add_argument('--block-size', type=int, default=256)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    main(args.sizes, args.block_size, args.repeat)
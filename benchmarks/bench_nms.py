@@ -0,0 +1,118 @@
+"""Benchmark the shared NMS against the per-family Python loops it replaced.
+
+Usage:
+    python -m benchmarks.bench_nms --sizes 1000 3000 10000
+"""
+import argparse
+import time
+
+import numpy as np
+from tabulate import tabulate
+
+from asone.detectors.utils.nms import nms, multiclass_nms
+
+
+def loop_nms(boxes, scores, iou_threshold):
+    """Former `yolov7_utils.nms` / `yolov6_utils.nms`."""
+    sorted_indices = np.argsort(scores)[::-1]
+
+    keep_boxes = []
+    while sorted_indices.size > 0:
+        box_id = sorted_indices[0]
+        keep_boxes.append(box_id)
+
+        box = boxes[box_id]
+        rest = boxes[sorted_indices[1:]]
+        xmin = np.maximum(box[0], rest[:, 0])
+        ymin = np.maximum(box[1], rest[:, 1])
+        xmax = np.minimum(box[2], rest[:, 2])
+        ymax = np.minimum(box[3], rest[:, 3])
+        intersection_area = np.maximum(0, xmax - xmin) * np.maximum(0, ymax - ymin)
+        box_area = (box[2] - box[0]) * (box[3] - box[1])
+        rest_area = (rest[:, 2] - rest[:, 0]) * (rest[:, 3] - rest[:, 1])
+        ious = intersection_area / (box_area + rest_area - intersection_area)
+
+        keep_indices = np.where(ious < iou_threshold)[0]
+        sorted_indices = sorted_indices[keep_indices + 1]
+
+    return keep_boxes
+
+
+def loop_multiclass_nms(boxes, scores, nms_thr, score_thr):
+    """Former `yolox_utils.multiclass_nms_class_aware`."""
+    final_dets = []
+    for cls_ind in range(scores.shape[1]):
+        cls_scores = scores[:, cls_ind]
+        valid_score_mask = cls_scores > score_thr
+        if valid_score_mask.sum() == 0:
+            continue
+        valid_scores = cls_scores[valid_score_mask]
+        valid_boxes = boxes[valid_score_mask]
+        keep = loop_nms(valid_boxes, valid_scores, nms_thr)
+        if len(keep) > 0:
+            cls_inds = np.ones((len(keep), 1)) * cls_ind
+            final_dets.append(np.concatenate(
+                [valid_boxes[keep], valid_scores[keep, None], cls_inds], 1))
+    if len(final_dets) == 0:
+        return None
+    return np.concatenate(final_dets, 0)
+
+
+def make_candidates(num_boxes, num_classes=80, seed=0):
+    """Clustered candidates around objects, like a detector run at low conf_thres."""
+    rng = np.random.default_rng(seed)
+    num_objects = max(num_boxes // 30, 1)
+    centers = rng.uniform(0, 1920, (num_objects, 2))
+    sizes = rng.uniform(20, 300, (num_objects, 2))
+
+    owner = rng.integers(0, num_objects, num_boxes)
+    xy = centers[owner] + rng.normal(0, 8, (num_boxes, 2))
+    wh = sizes[owner] * rng.normal(1, 0.08, (num_boxes, 2))
+    boxes = np.concatenate([xy - wh / 2, xy + wh / 2], 1).astype(np.float32)
+    # distinct scores so both implementations break ties the same way
+    scores = rng.permutation(num_boxes).astype(np.float32) / num_boxes
+    class_scores = rng.uniform(0, 0.05, (num_boxes, num_classes)).astype(np.float32)
+    class_scores[np.arange(num_boxes), owner % num_classes] = scores
+    return boxes, scores, class_scores
+
+
+def timeit(fn, *args, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        tic = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - tic)
+    return result, best * 1000
+
+
+def main(sizes, iou_thres, repeat):
+    rows = []
+    for size in sizes:
+        boxes, scores, class_scores = make_candidates(size)
+
+        ref, loop_ms = timeit(loop_nms, boxes, scores, iou_thres, repeat=repeat)
+        keep, new_ms = timeit(nms, boxes, scores, iou_thres, repeat=repeat)
+        rows.append(['nms', size, f'{loop_ms:.2f}', f'{new_ms:.2f}',
+                     f'{loop_ms / new_ms:.1f}x', set(ref) == set(keep)])
+
+        ref, loop_ms = timeit(loop_multiclass_nms, boxes, class_scores,
+                              iou_thres, 0.1, repeat=repeat)
+        dets, new_ms = timeit(multiclass_nms, boxes, class_scores,
+                              iou_thres, 0.1, False, repeat=repeat)
+        same = len(ref) == len(dets) and np.allclose(
+            ref[np.lexsort(ref.T)], dets[np.lexsort(dets.T)])
+        rows.append(['multiclass_nms', size, f'{loop_ms:.2f}',
+                     f'{new_ms:.2f}', f'{loop_ms / new_ms:.1f}x', same])
+
+    print(tabulate(rows, headers=['variant', 'boxes', 'loop ms',
+                                  'shared ms', 'speedup', 'same result']))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[100, 1000, 3000, 10000])
+    parser.add_argument('--iou-thres', type=float, default=0.45)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    main(args.sizes, args.iou_thres, args.repeat)
@@ -0,0 +1,96 @@
+"""Benchmark OnnxEngine against a bare onnxruntime session.
+
+Times the session creation without and with the cached optimized graph, and
+the forward pass of a bare `InferenceSession` (IO names looked up per call,
+like the detectors did) against the engine with and without IO binding.
+Outputs are checked to match.
+
+Usage:
+    python -m benchmarks.bench_onnx_engine --model yolov7.onnx --batch 1 4
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import onnxruntime
+from tabulate import tabulate
+
+from asone.detectors.utils.onnx_engine import OnnxEngine, optimized_path
+
+
+def input_batch(model, batch, height, width, rng):
+    """Random NCHW input, dynamic dims set from the arguments. Models with a
+    fixed batch keep it."""
+    shape = [dim if isinstance(dim, int) else size
+             for dim, size in zip(model.get_inputs()[0].shape, [batch, 3, height, width])]
+    return rng.random(shape, dtype=np.float32)
+
+
+def timeit(fns, repeat):
+    """Best time of every function, run in turns so that they all see the
+    same machine load."""
+    results = [fn() for fn in fns]  # warm up
+    best = [float('inf')] * len(fns)
+    for _ in range(repeat):
+        for i, fn in enumerate(fns):
+            tic = time.perf_counter()
+            fn()
+            best[i] = min(best[i], time.perf_counter() - tic)
+    return results, [ms * 1000 for ms in best]
+
+
+def main(model_path, batches, height, width, threads, repeat):
+    optimized = optimized_path(model_path, 'CPUExecutionProvider', 'all')
+    if os.path.isfile(optimized):
+        os.remove(optimized)
+
+    tic = time.perf_counter()
+    session = onnxruntime.InferenceSession(model_path, providers=['CPUExecutionProvider'])
+    bare_load = time.perf_counter() - tic
+    tic = time.perf_counter()
+    OnnxEngine(model_path, intra_op_threads=threads)
+    cold_load = time.perf_counter() - tic
+    tic = time.perf_counter()
+    engine = OnnxEngine(model_path, intra_op_threads=threads)
+    cached_load = time.perf_counter() - tic
+    unbound = OnnxEngine(model_path, intra_op_threads=threads, io_binding=False)
+    print(tabulate([[f'{bare_load * 1000:.0f}', f'{cold_load * 1000:.0f}',
+                     f'{cached_load * 1000:.0f}']],
+                   headers=['session ms', 'engine ms (optimize + save)',
+                            'engine ms (cached graph)']))
+
+    rng = np.random.default_rng(0)
+    rows = []
+    for batch in batches:
+        feeds = input_batch(session, batch, height, width, rng)
+
+        def bare():
+            return session.run([session.get_outputs()[0].name],
+                               {session.get_inputs()[0].name: feeds})
+
+        (ref, plain, bound), (bare_ms, plain_ms, bound_ms) = timeit([
+            bare,
+            lambda: unbound.run(unbound.output_names[:1], {unbound.input_names[0]: feeds}),
+            lambda: engine.run(engine.output_names[:1], {engine.input_names[0]: feeds}),
+        ], repeat)
+        diff = max(np.abs(ref[0] - plain[0]).max(), np.abs(ref[0] - bound[0]).max())
+        if diff > 1e-4:
+            sys.exit(f'engine outputs differ by {diff:.2e}')
+        rows.append([batch, f'{bare_ms:.2f}', f'{plain_ms:.2f}', f'{bound_ms:.2f}',
+                     f'{bare_ms / bound_ms:.2f}x'])
+    print(tabulate(rows, headers=['batch', 'session ms', 'engine ms',
+                                  'engine + IO binding ms', 'speedup']))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', required=True, help='ONNX model')
+    parser.add_argument('--batch', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--height', type=int, default=640, help='used if the input height is dynamic')
+    parser.add_argument('--width', type=int, default=640, help='used if the input width is dynamic')
+    parser.add_argument('--threads', type=int, default=None, help='intra-op threads')
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+    main(args.model, args.batch, args.height, args.width, args.threads, args.repeat)
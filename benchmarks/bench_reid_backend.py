@@ -0,0 +1,78 @@
+"""Check the ONNX Runtime ReID backend against PyTorch and time both.
+
+Exports the checkpoint on first use (cached next to it), extracts the
+features of the same crops with both backends and fails if they differ by
+more than `--atol`.
+
+Usage:
+    python -m benchmarks.bench_reid_backend --crops 1 10 30 60 --threads 4
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+from tabulate import tabulate
+
+from asone.trackers.deep_sort.tracker.deep.feature_extractor import Extractor
+
+DEFAULT_WEIGHTS = os.path.join(
+    'asone', 'trackers', 'deep_sort', 'tracker', 'deep', 'checkpoint', 'ckpt.t7')
+
+
+def make_crops(image, num_crops, rng):
+    height, width = image.shape[:2]
+    wh = rng.uniform(30, 200, (num_crops, 2))
+    xy = rng.uniform(0, 1, (num_crops, 2)) * ([width, height] - wh)
+    return np.c_[xy, xy + wh].astype(int)
+
+
+def timeit(fn, *args, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        tic = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - tic)
+    return result, best * 1000
+
+
+def main(weights, image_path, sizes, threads, atol, repeat):
+    rng = np.random.default_rng(0)
+    image = cv2.imread(image_path) if image_path else None
+    if image is None:
+        image = cv2.GaussianBlur(
+            rng.integers(0, 255, (1080, 1920, 3), dtype=np.uint8), (7, 7), 0)
+
+    torch_extractor = Extractor(weights, use_cuda=False, backend='torch')
+    onnx_extractor = Extractor(weights, use_cuda=False, backend='onnx',
+                               num_threads=threads)
+
+    rows, worst = [], 0.0
+    for size in sizes:
+        boxes = make_crops(image, size, rng)
+        ref, torch_ms = timeit(torch_extractor.extract, image, boxes, repeat=repeat)
+        features, onnx_ms = timeit(onnx_extractor.extract, image, boxes, repeat=repeat)
+        diff = np.abs(ref - features).max()
+        cosine = (ref * features).sum(1).min()
+        worst = max(worst, diff)
+        rows.append([size, f'{torch_ms:.2f}', f'{onnx_ms:.2f}',
+                     f'{torch_ms / onnx_ms:.1f}x', f'{diff:.2e}', f'{cosine:.6f}'])
+
+    print(tabulate(rows, headers=['crops', 'torch ms', 'onnx ms', 'speedup',
+                                  'max |diff|', 'min cosine']))
+    if worst > atol:
+        sys.exit(f'ONNX features differ from PyTorch by {worst:.2e} > {atol:.0e}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--weights', default=DEFAULT_WEIGHTS)
+    parser.add_argument('--image', default=None, help='frame to crop from, random if not set')
+    parser.add_argument('--crops', type=int, nargs='+', default=[1, 10, 30, 60])
+    parser.add_argument('--threads', type=int, default=None, help='intra-op threads')
+    parser.add_argument('--atol', type=float, default=1e-4)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    main(args.weights, args.image, args.crops, args.threads, args.atol, args.repeat)
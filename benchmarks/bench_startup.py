@@ -0,0 +1,65 @@
+"""Measure the startup of main.py up to its first tracked frame.
+
+Runs the same setup as `main.py` (`anno.setup_tracker`, YOLOv7 + DeepSORT)
+under `python -X importtime` in a fresh interpreter and reports the time to
+import, the time to the first frame and the slowest imports.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_startup --video videos/bilkent_test_1.MOV
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+from tabulate import tabulate
+
+FIRST_FRAME = '''
+import time
+tic = time.perf_counter()
+import cfg
+import annotation
+import anno
+imported = time.perf_counter()
+track_fn = anno.setup_tracker(real_time=False, video_path={video!r})
+next(track_fn)
+done = time.perf_counter()
+print(f"STARTUP {{imported - tic:.6f}} {{done - tic:.6f}}")
+'''
+
+IMPORTTIME = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)')
+
+
+def main(video, top):
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', FIRST_FRAME.format(video=video)],
+        capture_output=True, text=True, cwd=os.getcwd())
+    startup = [line for line in proc.stdout.splitlines() if line.startswith('STARTUP')]
+    if proc.returncode != 0 or not startup:
+        errors = [line for line in proc.stderr.splitlines()
+                  if not line.startswith('import time:')]
+        sys.exit('\n'.join(errors[-20:]))
+    import_s, first_frame_s = map(float, startup[-1].split()[1:])
+
+    imports = []
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME.match(line)
+        if match:
+            _, cumulative, indent, module = match.groups()
+            # top level imports only, nested ones are part of their parent
+            if len(indent) == 1:
+                imports.append((module, int(cumulative) / 1000))
+    imports.sort(key=lambda item: item[1], reverse=True)
+
+    print(f'imports      : {import_s * 1000:.0f} ms')
+    print(f'first frame  : {first_frame_s * 1000:.0f} ms')
+    print(tabulate(imports[:top], headers=['top level import', 'cumulative ms']))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--video', default=os.path.join('videos', 'bilkent_test_1.MOV'))
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+    main(args.video, args.top)
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from asone.trackers.deep_sort.tracker.sort.kalman_filter import KalmanFilter
+from asone.trackers.deep_sort.tracker.sort.track import TrackStore
+
+
+def random_measurements(rng, n):
+    """(n, 4) boxes in (x, y, a, h) format."""
+    return np.stack([rng.uniform(0, 1920, n), rng.uniform(0, 1080, n),
+                     rng.uniform(0.3, 1.5, n), rng.uniform(20, 300, n)], axis=1)
+
+
+@pytest.mark.parametrize('only_position', [False, True])
+def test_batched_filter_matches_per_track_filter(only_position):
+    rng = np.random.default_rng(0)
+    kf = KalmanFilter()
+    num_tracks = 20
+
+    states = [kf.initiate(measurement) for measurement in random_measurements(rng, num_tracks)]
+    # a small store so that it has to grow, and a released slot reused
+    store = TrackStore(capacity=4)
+    slots = [store.add(mean, covariance) for mean, covariance in states]
+    store.release(slots[3])
+    slots[3] = store.add(*states[3])
+    slots = np.array(slots)
+
+    for step in range(10):
+        # predict
+        states = [kf.predict(mean, covariance) for mean, covariance in states]
+        store.set(slots, *kf.multi_predict(store.mean[slots], store.covariance[slots]))
+        assert np.allclose(store.mean[slots], [mean for mean, _ in states])
+        assert np.allclose(store.covariance[slots], [cov for _, cov in states])
+
+        # gate against moved boxes and new ones
+        measurements = np.concatenate([
+            np.array([mean[:4] for mean, _ in states]) + rng.normal(0, 5, (num_tracks, 4)) * [1, 1, 0.01, 1],
+            random_measurements(rng, 5)])
+        expected = np.array([kf.gating_distance(mean, covariance, measurements, only_position)
+                             for mean, covariance in states])
+        cached = kf.factored_gating_distance(
+            *store.gating_factors(kf, slots), measurements, only_position)
+        assert np.allclose(cached, expected)
+        assert np.allclose(kf.multi_gating_distance(
+            store.mean[slots], store.covariance[slots], measurements, only_position), expected)
+
+        # update every other track with its own measurement
+        updated = np.arange(step % 2, num_tracks, 2)
+        for i in updated:
+            states[i] = kf.update(*states[i], measurements[i])
+        store.set(slots[updated], *kf.multi_update(
+            store.mean[slots[updated]], store.covariance[slots[updated]],
+            measurements[updated]))
+        assert np.allclose(store.mean[slots], [mean for mean, _ in states])
+        assert np.allclose(store.covariance[slots], [cov for _, cov in states])
+
+        # the cached gating factors follow the updated states
+        expected = np.array([kf.gating_distance(mean, covariance, measurements, only_position)
+                             for mean, covariance in states])
+        assert np.allclose(kf.factored_gating_distance(
+            *store.gating_factors(kf, slots), measurements, only_position), expected)
@@ -0,0 +1,40 @@
+import numpy as np
+
+from asone.trackers.deep_sort.tracker.sort.track import Track, TrackState
+from asone.trackers.deep_sort.tracker.sort.tracker import Tracker
+
+
+def confirmed_tracker(*boxes_tlbr):
+    """A tracker with one confirmed track, updated last frame, per box."""
+    tracker = Tracker(metric=None)
+    for x1, y1, x2, y2 in boxes_tlbr:
+        w, h = x2 - x1, y2 - y1
+        mean, covariance = tracker.kf.initiate(
+            np.array([x1 + w / 2, y1 + h / 2, w / h, h], dtype=float))
+        track = Track(mean, covariance, tracker._next_id, tracker.n_init,
+                      tracker.max_age, None, store=tracker.store)
+        track.state = TrackState.Confirmed
+        track.time_since_update = 1
+        tracker.tracks.append(track)
+        tracker._next_id += 1
+    return tracker
+
+
+def test_isolated_pair_is_pre_associated():
+    tracker = confirmed_tracker([100, 100, 150, 200], [400, 100, 450, 200])
+    boxes = np.array([[102, 101, 151, 203], [401, 98, 452, 199]], dtype=float)
+    assert tracker.pre_associate(boxes) == [(0, 0), (1, 1)]
+
+
+def test_detection_overlapping_another_detection_is_contested():
+    tracker = confirmed_tracker([100, 100, 150, 200])
+    # the second detection only grazes the track, but overlaps the first one
+    boxes = np.array([[110, 101, 160, 203], [148, 101, 198, 203]], dtype=float)
+    assert tracker.pre_associate(boxes) == []
+    assert tracker.pre_associate(boxes[:1]) == [(0, 0)]
+
+
+def test_track_overlapping_another_track_is_contested():
+    tracker = confirmed_tracker([100, 100, 150, 200], [138, 100, 188, 200])
+    boxes = np.array([[90, 101, 140, 203]], dtype=float)
+    assert tracker.pre_associate(boxes) == []
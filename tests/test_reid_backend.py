@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip('torch')
+pytest.importorskip('onnxruntime')
+
+from asone.trackers.deep_sort import REID_WEIGHTS  # noqa: E402
+from asone.trackers.deep_sort.tracker.deep.feature_extractor import Extractor  # noqa: E402
+from asone.trackers.deep_sort.tracker.deep.model import Net  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def checkpoint(tmp_path_factory):
+    """Path of a ReID checkpoint, the downloaded one if present, a randomly
+    initialized `Net` otherwise."""
+    path = tmp_path_factory.mktemp('reid') / 'ckpt.t7'
+    try:
+        state_dict = torch.load(REID_WEIGHTS, map_location='cpu')['net_dict']
+    except FileNotFoundError:
+        torch.manual_seed(0)
+        net = Net(reid=True)
+        # non trivial BatchNorm statistics, the defaults hide eval mode bugs
+        for module in net.modules():
+            if isinstance(module, torch.nn.BatchNorm2d):
+                module.running_mean.uniform_(-0.5, 0.5)
+                module.running_var.uniform_(0.5, 1.5)
+        state_dict = net.state_dict()
+    torch.save({'net_dict': state_dict}, path)
+    return str(path)
+
+
+@pytest.fixture(scope='module')
+def extractors(checkpoint):
+    return (Extractor(checkpoint, use_cuda=False, backend='torch'),
+            Extractor(checkpoint, use_cuda=False, backend='onnx'))
+
+
+@pytest.mark.parametrize('num_crops', [1, 8])
+def test_onnx_features_match_torch(extractors, num_crops):
+    rng = np.random.default_rng(num_crops)
+    image = rng.integers(0, 255, (480, 640, 3), dtype=np.uint8)
+    x1 = rng.integers(0, 500, num_crops)
+    y1 = rng.integers(0, 300, num_crops)
+    boxes = np.stack([x1, y1, x1 + rng.integers(20, 140, num_crops),
+                      y1 + rng.integers(40, 180, num_crops)], axis=1)
+
+    torch_extractor, onnx_extractor = extractors
+    expected = torch_extractor.extract(image, boxes)
+    features = onnx_extractor.extract(image, boxes)
+
+    assert features.shape == expected.shape == (num_crops, 512)
+    np.testing.assert_allclose(features, expected, rtol=0, atol=1e-4)
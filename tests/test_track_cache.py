@@ -0,0 +1,134 @@
+import sys
+from unittest import mock
+
+import cv2
+import numpy as np
+import pytest
+
+import asone
+from asone import ASOne
+from asone.utils.default_cfg import config as default_config
+
+
+@pytest.fixture
+def files(tmp_path, monkeypatch):
+    video = tmp_path / 'video.mp4'
+    video.write_bytes(b'video')
+    weights = tmp_path / 'weights.pt'
+    weights.write_bytes(b'weights')
+    reid = tmp_path / 'ckpt.t7'
+    reid.write_bytes(b'reid')
+    # `asone.asone` is shadowed by the package's own name
+    monkeypatch.setattr(sys.modules['asone.asone'], 'REID_WEIGHTS', str(reid))
+    return tmp_path, video, weights, reid
+
+
+def cache_path(files, **kwargs):
+    tmp_path, video, weights, _ = files
+    kwargs = dict(dict(detector=asone.YOLOV7_PYTORCH, tracker=asone.DEEPSORT,
+                       weights=str(weights)), **kwargs)
+    model = ASOne(**kwargs)
+    return model._track_cache(str(tmp_path / 'cache'), str(video), dict(default_config),
+                              detect_every=1, motion_thres=None).path
+
+
+@pytest.mark.parametrize('kwargs', [
+    dict(tracker_cfg={'ASSIGNMENT': 'greedy'}),
+    dict(tracker_cfg={'ASSIGNMENT': 'lapjv'}),
+    dict(tracker_cfg={'LAZY_REID': True}),
+    dict(tracker_cfg={'REID_BACKEND': 'onnx'}),
+    dict(tracker_cfg={'REID_BACKEND': 'onnx_int8'}),
+    dict(detector_cfg={'SCRIPT': True}),
+    dict(detector_cfg={'CHANNELS_LAST': True}),
+    dict(tracker=asone.BYTETRACK),
+])
+def test_options_miss_the_cache(files, kwargs):
+    assert cache_path(files, **kwargs) != cache_path(files)
+
+
+def test_same_options_hit_the_cache(files):
+    assert cache_path(files, tracker_cfg={'ASSIGNMENT': 'greedy'}) == \
+        cache_path(files, tracker_cfg={'ASSIGNMENT': 'greedy'})
+
+
+def test_reid_checkpoint_misses_the_cache(files):
+    before = cache_path(files)
+    files[3].write_bytes(b'new reid')
+    assert cache_path(files) != before
+
+
+def test_detector_weights_miss_the_cache(files):
+    before = cache_path(files)
+    files[2].write_bytes(b'new weights')
+    assert cache_path(files) != before
+
+
+class CountingTracker:
+    """Stands in for the models, one box per frame, ids from 1."""
+
+    def __init__(self):
+        self.frames = 0
+
+    def detect_and_track(self, image, config):
+        self.frames += 1
+        return [[self.frames, 0, self.frames + 10, 10]], [1], [0.9], [0]
+
+    def predict(self, image):
+        return self.detect_and_track(image, None)
+
+
+def cache_model(files):
+    _, _, weights, _ = files
+    model = ASOne(detector=asone.YOLOV7_PYTORCH, tracker=asone.BYTETRACK,
+                  weights=str(weights))
+    model._tracker = CountingTracker()
+    return model
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = str(tmp_path / 'video.avi')
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 10, (64, 48))
+    for i in range(10):
+        writer.write(np.full((48, 64, 3), i * 20, np.uint8))
+    writer.release()
+    return path
+
+
+def run(model, video, cache_dir, stop_after=None):
+    """Track `video`, pressing ESC after `stop_after` frames."""
+    frames = []
+    track_fn = model.track_video(video, cache_dir=cache_dir, display=False,
+                                 save_result=False)
+    try:
+        for (bboxes, ids, scores, class_ids, predicted), _, _ in track_fn:
+            frames.append((np.asarray(bboxes, np.float32).tolist(), np.asarray(ids).tolist()))
+            if len(frames) == stop_after:
+                cv2.waitKey.side_effect = lambda delay: asone.ESC_KEY
+    except RuntimeError:
+        pass  # end of the video
+    return frames
+
+
+def test_interrupted_run_resumes_from_the_cache(files, video, monkeypatch):
+    # headless opencv has no waitKey, no key is pressed unless the test says so
+    wait_key = mock.Mock(return_value=-1)
+    monkeypatch.setattr(cv2, 'waitKey', wait_key)
+    cache_dir = str(files[0] / 'cache')
+
+    model = cache_model(files)
+    first = run(model, video, cache_dir, stop_after=4)
+    assert len(first) == 4 and model._tracker.frames == 4
+
+    wait_key.side_effect = None
+    model = cache_model(files)
+    second = run(model, video, cache_dir)
+    # the 4 cached frames are replayed, the models run on the 6 others only
+    assert len(second) == 10 and model._tracker.frames == 6
+    assert second[:4] == first
+    # new tracks do not reuse the ids of the replayed frames
+    assert all(ids == [2] for _, ids in second[4:])
+
+    model = cache_model(files)
+    assert run(model, video, cache_dir) == second
+    assert model._tracker.frames == 0